@@ -2,15 +2,19 @@ import gzip
 import os
 import re
 import subprocess
-from typing import TypedDict, cast
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, TypedDict, cast
 
 import gi
 from lxml import etree
+from ruamel.yaml import YAML
+from ruamel.yaml.error import YAMLError
 
-from . import config
+from . import config, validationcache
 
 gi.require_version("AppStream", "1.0")
-from gi.repository import AppStream  # noqa: E402
+from gi.repository import AppStream, Gio  # noqa: E402
 
 
 class SubprocessResult(TypedDict):
@@ -43,6 +47,99 @@ def validate(path: str, *args: str) -> SubprocessResult:
     return ret
 
 
+class ValidationIssue(TypedDict):
+    tag: str
+    severity: str
+    line: int | None
+    explanation: str | None
+
+
+class ValidationReport(TypedDict):
+    passed: bool
+    filename: str
+    issues: list[ValidationIssue]
+    messages: list[str]
+
+
+def _validate_appstreamcli(path: str) -> ValidationReport:
+    result = validate(path, "--no-net", "--format", "yaml")
+    report: ValidationReport = {
+        "passed": result["returncode"] == 0,
+        "filename": os.path.basename(path),
+        "issues": [],
+        "messages": [line.strip() for line in result["stderr"].splitlines()],
+    }
+
+    try:
+        data = YAML().load(result["stdout"]) or {}
+    except YAMLError as e:
+        report["messages"].append(f"Failed to parse appstream validate YAML output: {e}")
+        return report
+
+    report["filename"] = data.get("File", report["filename"])
+    for issue in data.get("Issues") or []:
+        line = issue.get("line")
+        report["issues"].append(
+            {
+                "tag": str(issue.get("tag") or "").strip(),
+                "severity": str(issue.get("severity") or "").lower(),
+                "line": int(line) if line else None,
+                "explanation": issue.get("explanation"),
+            }
+        )
+
+    return report
+
+
+def _validate_in_process(path: str) -> ValidationReport:
+    # Same checks as appstreamcli validate --no-net without the fork and
+    # the YAML round trip. Warnings fail the validation like they do there.
+    validator = AppStream.Validator.new()
+    validator.set_check_urls(False)
+    passed = validator.validate_file(Gio.File.new_for_path(path))
+
+    issues: list[ValidationIssue] = []
+    for issue in validator.get_issues():
+        line = issue.get_line()
+        issues.append(
+            {
+                "tag": issue.get_tag() or "",
+                "severity": AppStream.issue_severity_to_string(issue.get_severity()),
+                "line": line if line > 0 else None,
+                "explanation": issue.get_explanation(),
+            }
+        )
+
+    return {
+        "passed": bool(passed)
+        and not any(issue["severity"] in ("warning", "error") for issue in issues),
+        "filename": os.path.basename(path),
+        "issues": issues,
+        "messages": [],
+    }
+
+
+def validate_metainfo(path: str) -> ValidationReport:
+    if not os.path.isfile(path):
+        raise FileNotFoundError("AppStream file not found")
+
+    if config.use_appstreamcli_validate() or not hasattr(AppStream, "Validator"):
+        return validationcache.cached(
+            "appstreamcli",
+            validationcache.tool_version("appstreamcli"),
+            ("--no-net",),
+            path,
+            lambda: _validate_appstreamcli(path),
+        )
+    return validationcache.cached(
+        "appstream",
+        AppStream.version_string(),
+        (),
+        path,
+        lambda: _validate_in_process(path),
+    )
+
+
 def parse_xml(path: str) -> etree._ElementTree:
     if not os.path.isfile(path):
         raise FileNotFoundError(f"XML file not found: {path}")
@@ -65,27 +162,124 @@ def is_present(path: str, query: str) -> bool:
     return bool(xpath_list(path, query))
 
 
+XPATH = {
+    "components": etree.XPath("/components/component"),
+    "metainfo_components": etree.XPath("/component"),
+    "component_types": etree.XPath("//component/@type"),
+    "ids": etree.XPath("//component/id/text()"),
+    "cached_icons": etree.XPath("//icon[@type='cached']/text()"),
+    "remote_icons": etree.XPath("//icon[@type='remote']/text()"),
+    "icons": etree.XPath("//icon"),
+    "untyped_icons": etree.XPath("//icon[not(@type)]"),
+    "categories": etree.XPath("//categories/category"),
+    "developer_names": etree.XPath("//developer[@id]/name/text()"),
+    "legacy_developer_names": etree.XPath("//developer_name/text()"),
+    "licenses": etree.XPath("//project_license/text()"),
+    "uncaptioned_screenshots": etree.XPath("//screenshot[not(caption/text()) or not(caption)]"),
+    "screenshot_images": etree.XPath("//screenshots/screenshot/image/text()"),
+    "release_timestamps": etree.XPath("//releases/release[@timestamp]/@timestamp"),
+    "release_versions": etree.XPath("//releases/release[@timestamp]/@version"),
+    "releases_without_timestamp": etree.XPath("//releases/release[not(@timestamp)]"),
+    "launchables": etree.XPath("//launchable[@type='desktop-id']/text()"),
+    "vcs_browser_urls": etree.XPath("//url[@type='vcs-browser']/text()"),
+    "manifest_keys": etree.XPath("//custom/value[@key='flathub::manifest']/text()"),
+}
+
+
+def _first(values: list[Any]) -> str | None:
+    return str(values[0]) if values else None
+
+
+def _strings(values: list[Any]) -> tuple[str, ...]:
+    # XPath string results keep their element, and so the whole tree,
+    # alive, only plain copies are kept in the cache
+    return tuple(str(value) for value in values)
+
+
+@dataclass(frozen=True)
+class AppstreamDocument:
+    # Everything the checks read from a MetaInfo or catalogue file,
+    # extracted with one parse of the file
+
+    component_count: int
+    has_metainfo_component: bool
+    component_type: str
+    ids: tuple[str, ...]
+    cached_icon: str | None
+    remote_icons: tuple[str, ...]
+    has_icon: bool
+    has_untyped_icon: bool
+    has_categories: bool
+    has_developer_name: bool
+    project_license: str | None
+    all_screenshots_captioned: bool
+    screenshot_images: tuple[str, ...]
+    release_timestamps: tuple[str, ...]
+    release_versions: tuple[str, ...]
+    all_releases_timestamped: bool
+    launchables: tuple[str, ...]
+    has_vcs_browser_url: bool
+    manifest_keys: tuple[str, ...]
+
+    @classmethod
+    def from_tree(cls, tree: etree._ElementTree) -> "AppstreamDocument":
+        found = {name: xpath(tree) for name, xpath in XPATH.items()}
+
+        return cls(
+            component_count=len(found["components"]),
+            has_metainfo_component=bool(found["metainfo_components"]),
+            component_type=_first(found["component_types"]) or "generic",
+            ids=_strings(found["ids"]),
+            cached_icon=_first(found["cached_icons"]),
+            remote_icons=_strings(found["remote_icons"]),
+            has_icon=bool(found["icons"]),
+            has_untyped_icon=bool(found["untyped_icons"]),
+            has_categories=bool(found["categories"]),
+            has_developer_name=bool(found["developer_names"] or found["legacy_developer_names"]),
+            project_license=_first(found["licenses"]),
+            all_screenshots_captioned=not found["uncaptioned_screenshots"],
+            screenshot_images=_strings(found["screenshot_images"]),
+            release_timestamps=_strings(found["release_timestamps"]),
+            release_versions=_strings(found["release_versions"]),
+            all_releases_timestamped=not found["releases_without_timestamp"],
+            launchables=_strings(found["launchables"]),
+            has_vcs_browser_url=bool(found["vcs_browser_urls"]),
+            manifest_keys=_strings(found["manifest_keys"]),
+        )
+
+
+# The modification time is part of the key so a rewritten file is
+# parsed again
+@lru_cache(maxsize=128)
+def _load_document(path: str, _mtime_ns: int, _size: int) -> AppstreamDocument:
+    return AppstreamDocument.from_tree(parse_xml(path))
+
+
+def get_document(path: str) -> AppstreamDocument:
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"XML file not found: {path}")
+
+    st = os.stat(path)
+    return _load_document(os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
 def component_type(path: str) -> str:
-    types = xpath_list(path, "//component/@type")
-    return types[0] if types else "generic"
+    return get_document(path).component_type
 
 
 def get_icon_filename(path: str) -> str | None:
-    icons = xpath_list(path, "//icon[@type='cached']/text()")
-    return icons[0] if icons else None
+    return get_document(path).cached_icon
 
 
 # Boolean returns
 
 
 def is_categories_present(path: str) -> bool:
-    return is_present(path, "//categories/category")
+    return get_document(path).has_categories
 
 
 def is_developer_name_present(path: str) -> bool:
-    return is_present(path, "//developer[@id]/name/text()") or is_present(
-        path, "//developer_name/text()"
-    )
+    return get_document(path).has_developer_name
 
 
 def is_project_license_present(path: str) -> bool:
@@ -93,25 +287,25 @@ def is_project_license_present(path: str) -> bool:
 
 
 def has_icon_key(path: str) -> bool:
-    return is_present(path, "//icon")
+    return get_document(path).has_icon
 
 
 def icon_no_type(path: str) -> bool:
-    return is_present(path, "//icon[not(@type)]")
+    return get_document(path).has_untyped_icon
 
 
 def check_caption(path: str) -> bool:
-    return not is_present(path, "//screenshot[not(caption/text()) or not(caption)]")
+    return get_document(path).all_screenshots_captioned
 
 
 def all_release_has_timestamp(path: str) -> bool:
-    return not is_present(path, "//releases/release[not(@timestamp)]")
+    return get_document(path).all_releases_timestamped
 
 
 def is_remote_icon_mirrored(path: str) -> bool:
     return all(
         icon.startswith(f"{config.FLATHUB_MEDIA_BASE_URL}/")
-        for icon in xpath_list(path, "//icon[@type='remote']/text()")
+        for icon in get_document(path).remote_icons
     )
 
 
@@ -138,7 +332,18 @@ def is_free_license(path: str) -> bool:
 
 
 def is_vcs_browser_url_present(path: str) -> bool:
-    return is_present(path, "//url[@type='vcs-browser']/text()")
+    return get_document(path).has_vcs_browser_url
+
+
+def is_metainfo_component(path: str) -> bool:
+    return get_document(path).has_metainfo_component
+
+
+# Integer returns
+
+
+def component_count(path: str) -> int:
+    return get_document(path).component_count
 
 
 # List returns
@@ -152,28 +357,57 @@ def metainfo_components(path: str) -> list[str]:
     return xpath_list(path, "/component")
 
 
-def appstream_id(path: str) -> list[str]:
-    return xpath_list(path, "//component/id/text()")
+def appstream_id(path: str) -> tuple[str, ...]:
+    return get_document(path).ids
+
+
+def get_launchable(path: str) -> tuple[str, ...]:
+    return get_document(path).launchables
 
 
-def get_launchable(path: str) -> list[str]:
-    return xpath_list(path, "//launchable[@type='desktop-id']/text()")
+def get_screenshot_images(path: str) -> tuple[str, ...]:
+    return get_document(path).screenshot_images
 
 
-def get_screenshot_images(path: str) -> list[str]:
-    return xpath_list(path, "//screenshots/screenshot/image/text()")
+def get_manifest_key(path: str) -> tuple[str, ...]:
+    return get_document(path).manifest_keys
 
 
-def get_manifest_key(path: str) -> list[str]:
-    return xpath_list(path, "//custom/value[@key='flathub::manifest']/text()")
+# Streams the file and stops at the first manifest key, so that large
+# catalogues are neither decompressed to disk nor parsed as a whole
+def find_manifest_key(path: str) -> str | None:
+    opener = gzip.open if path.endswith(".gz") else open
+    try:
+        with opener(path, "rb") as f:
+            for _, elem in etree.iterparse(f, events=("end",), tag=("value", "component")):
+                parent = elem.getparent()
+                if elem.tag == "component":
+                    # Drop finished components to keep memory flat
+                    elem.clear()
+                    while parent is not None and elem.getprevious() is not None:
+                        del parent[0]
+                    continue
+
+                if (
+                    elem.get("key") == "flathub::manifest"
+                    and parent is not None
+                    and parent.tag == "custom"
+                    and elem.text
+                ):
+                    return str(elem.text)
+    except etree.XMLSyntaxError as e:
+        raise RuntimeError(f"XML syntax error in {path}: {e}") from None
+
+    return None
 
 
 # String returns
 
 
 def get_latest_release_version(path: str) -> str | None:
-    timestamps = xpath_list(path, "//releases/release[@timestamp]/@timestamp")
-    versions = xpath_list(path, "//releases/release[@timestamp]/@version")
+    document = get_document(path)
+    timestamps = document.release_timestamps
+    versions = document.release_versions
 
     if not timestamps or not versions:
         return None
@@ -187,5 +421,4 @@ def get_latest_release_version(path: str) -> str | None:
 
 
 def get_project_license(path: str) -> str | None:
-    licenses = xpath_list(path, "//project_license/text()")
-    return licenses[0] if licenses else None
+    return get_document(path).project_license
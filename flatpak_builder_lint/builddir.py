@@ -22,6 +22,19 @@ def parse_metadata(builddir: str) -> MappingProxyType[str, str | dict[str, set[s
     key_file = GLib.KeyFile.new()
     key_file.load_from_file(metadata_path, GLib.KeyFileFlags.NONE)
 
+    return _parse_metadata_key_file(key_file)
+
+
+def parse_metadata_bytes(data: bytes) -> MappingProxyType[str, str | dict[str, set[str]]]:
+    key_file = GLib.KeyFile.new()
+    key_file.load_from_bytes(GLib.Bytes.new(data), GLib.KeyFileFlags.NONE)
+
+    return _parse_metadata_key_file(key_file)
+
+
+def _parse_metadata_key_file(
+    key_file: GLib.KeyFile,
+) -> MappingProxyType[str, str | dict[str, set[str]]]:
     metadata: dict[str, str | dict[str, set[str]]] = {}
 
     group = key_file.get_start_group()
@@ -1,4 +1,11 @@
-from typing import ClassVar
+import hashlib
+import json
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import ClassVar, TypeVar
 
 from .. import ostree
 
@@ -14,15 +21,180 @@ class CheckMeta(type):
         ALL.append(cls)
 
 
+class SharedFindings:
+    # Findings of refs with identical inputs, usually the arches of one
+    # app. Every key is only checked once per lint run, with load and
+    # store given persistent keys are also kept across runs.
+
+    def __init__(
+        self,
+        load: Callable[[str], "LintContext | None"] | None = None,
+        store: Callable[[str, "LintContext"], None] | None = None,
+    ) -> None:
+        self._load = load
+        self._store = store
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._findings: dict[str, LintContext] = {}
+
+    def run(self, key: str, persist: bool, compute: Callable[[], "LintContext"]) -> "LintContext":
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            if (findings := self._findings.get(key)) is None:
+                if persist and self._load is not None:
+                    findings = self._load(key)
+                if findings is None:
+                    findings = compute()
+                    if persist and self._store is not None:
+                        self._store(key, findings)
+                self._findings[key] = findings
+
+        return findings
+
+
+@dataclass
+class LintContext:
+    errors: set[str] = field(default_factory=set)
+    warnings: set[str] = field(default_factory=set)
+    jsonschema: set[str] = field(default_factory=set)
+    appstream: set[str] = field(default_factory=set)
+    desktopfile: set[str] = field(default_factory=set)
+    info: set[str] = field(default_factory=set)
+    repo_primary_refs: set[str] = field(default_factory=set)
+    jobs: int = 1
+    exceptions: frozenset[str] = frozenset()
+    workspace: ostree.CheckoutWorkspace | None = None
+    shared_findings: SharedFindings | None = None
+
+    def fork(self) -> "LintContext":
+        return LintContext(
+            repo_primary_refs=self.repo_primary_refs,
+            jobs=self.jobs,
+            exceptions=self.exceptions,
+            workspace=self.workspace,
+            shared_findings=self.shared_findings,
+        )
+
+    def is_excepted(self, *codes: str) -> bool:
+        return "*" in self.exceptions or self.exceptions.issuperset(codes)
+
+    def merge(self, other: "LintContext") -> None:
+        self.errors.update(other.errors)
+        self.warnings.update(other.warnings)
+        self.jsonschema.update(other.jsonschema)
+        self.appstream.update(other.appstream)
+        self.desktopfile.update(other.desktopfile)
+        self.info.update(other.info)
+
+
+CheckT = TypeVar("CheckT", bound="Check")
+
+
 class Check(metaclass=CheckMeta):
-    warnings: ClassVar[set[str]] = set()
-    errors: ClassVar[set[str]] = set()
-    jsonschema: ClassVar[set[str]] = set()
-    appstream: ClassVar[set[str]] = set()
-    desktopfile: ClassVar[set[str]] = set()
-    info: ClassVar[set[str]] = set()
-    repo_primary_refs: ClassVar[set[str]] = set()
+    # Every code the check can report, parts taken from the artifact are
+    # given as "*". Checks are not run at all when all of them are
+    # excepted, which a code with a "*" never is.
+    codes: ClassVar[frozenset[str] | None] = None
+    # Findings depend on the network or the date, the check runs again
+    # even when the result cache has the artifact
+    revalidate: ClassVar[bool] = False
+    # Paths inside a ref that the repo check reads from a checkout, each
+    # of them is checked out once per run and shared with other checks
+    repo_subpaths: ClassVar[tuple[str, ...]] = ()
+    # Paths inside a ref the repo check reads straight from the commit,
+    # together with repo_subpaths they are all a remote repo lint fetches
+    repo_reads: ClassVar[tuple[str, ...]] = ()
+    # Findings of a ref only depend on its type, its ID and the content
+    # of repo_subpaths. Refs where all of them match share the findings
+    # instead of being checked again.
+    share_ref_findings: ClassVar[bool] = False
+
+    def __init__(self, context: LintContext | None = None) -> None:
+        self.context = context if context is not None else LintContext()
+        self.errors = self.context.errors
+        self.warnings = self.context.warnings
+        self.jsonschema = self.context.jsonschema
+        self.appstream = self.context.appstream
+        self.desktopfile = self.context.desktopfile
+        self.info = self.context.info
+        self.repo_primary_refs = self.context.repo_primary_refs
+
+    def is_excepted(self, *codes: str) -> bool:
+        return self.context.is_excepted(*codes)
+
+    @contextmanager
+    def _checkout_ref(self, repo: str, ref: str) -> Iterator[str]:
+        if self.context.workspace is not None:
+            yield self.context.workspace.checkout(ref, self.repo_subpaths)
+            return
+
+        # Used on its own, outside of a lint run
+        with ostree.CheckoutWorkspace(repo) as workspace:
+            yield workspace.checkout(ref, self.repo_subpaths)
 
     def _populate_refs(self, repo: str) -> None:
-        if not Check.repo_primary_refs:
-            Check.repo_primary_refs.update(ostree.get_primary_refs(repo))
+        if not self.repo_primary_refs:
+            self.repo_primary_refs.update(ostree.get_primary_refs(repo))
+
+    def _shared_findings_key(self, ref: str) -> str | None:
+        workspace = self.context.workspace
+        if not self.share_ref_findings or workspace is None:
+            return None
+
+        tree = ostree.get_commit_tree(workspace.repo_path, ref)
+        subtrees: dict[str, str | None] = {}
+        for subpath in self.repo_subpaths:
+            try:
+                subtrees[subpath] = tree.checksum(subpath)
+            except OSError:
+                subtrees[subpath] = None
+
+        key = {
+            "check": f"{type(self).__module__}.{type(self).__qualname__}",
+            "ref": ref.split("/")[:2],
+            "exceptions": sorted(self.context.exceptions),
+            "subtrees": subtrees,
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def _check_ref_shared(self: CheckT, ref: str, func: Callable[[CheckT, str], None]) -> None:
+        shared = self.context.shared_findings
+        key = self._shared_findings_key(ref) if shared is not None else None
+        if shared is None or key is None:
+            func(self, ref)
+            return
+
+        def compute() -> LintContext:
+            func(self, ref)
+            return self.context
+
+        # Results that depend on the network or the date are only
+        # shared within a run
+        self.context.merge(shared.run(key, not self.revalidate, compute))
+
+    def _for_each_ref(
+        self: CheckT, refs: Iterable[str], func: Callable[[CheckT, str], None]
+    ) -> None:
+        # Every ref is checked by a copy of this check with its own
+        # context so refs can run on separate threads. Findings are
+        # merged back in ref order once all of them are done.
+        sorted_refs = sorted(refs)
+        forks = [type(self)(self.context.fork()) for _ in sorted_refs]
+        jobs = min(self.context.jobs, len(sorted_refs))
+
+        if jobs > 1:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = [
+                    executor.submit(fork._check_ref_shared, ref, func)
+                    for fork, ref in zip(forks, sorted_refs, strict=True)
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            for fork, ref in zip(forks, sorted_refs, strict=True):
+                fork._check_ref_shared(ref, func)
+
+        for fork in forks:
+            self.context.merge(fork.context)
@@ -8,6 +8,24 @@ from . import Check
 
 
 class AppIDCheck(Check):
+    revalidate = True
+    codes = frozenset(
+        {
+            "appid-code-hosting-too-few-components",
+            "appid-component-wrong-syntax",
+            "appid-ends-with-lowercase-desktop",
+            "appid-filename-mismatch",
+            "appid-length-more-than-255-chars",
+            "appid-less-than-3-components",
+            "appid-not-defined",
+            "appid-too-many-components-for-app",
+            "appid-url-check-internal-error",
+            "appid-url-not-reachable",
+            "appid-uses-code-hosting-domain",
+            "manifest-file-is-symlink",
+        }
+    )
+
     def _validate(self, appid: str | None, is_extension: bool) -> None:
         if not appid:
             self.errors.add("appid-not-defined")
@@ -58,6 +76,8 @@ class AppIDCheck(Check):
         if appid:
             if is_extension or is_baseapp:
                 return
+            if self.is_excepted("appid-url-not-reachable", "appid-url-check-internal-error"):
+                return
             if domainutils.is_app_on_flathub_summary(appid):
                 return
             if appid.startswith(domainutils.CODE_HOSTS):
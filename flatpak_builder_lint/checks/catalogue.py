@@ -1,13 +1,40 @@
 import glob
 import os
 import re
-import tempfile
 
 from .. import appstream, builddir, config, domainutils, ostree
 from . import Check
 
 
 class MetainfoCheck(Check):
+    revalidate = True
+    codes = frozenset(
+        {
+            "appstream-flathub-manifest-url-not-reachable",
+            "appstream-icon-key-no-type",
+            "appstream-id-mismatch-flatpak-id",
+            "appstream-latest-release-is-prerelease",
+            "appstream-launchable-file-missing",
+            "appstream-missing-appinfo-file",
+            "appstream-missing-categories",
+            "appstream-missing-developer-name",
+            "appstream-missing-icon-file",
+            "appstream-missing-icon-key",
+            "appstream-missing-project-license",
+            "appstream-multiple-components",
+            "appstream-release-tag-missing-timestamp",
+            "appstream-remote-icon-not-mirrored",
+            "appstream-unsupported-component-type",
+            "metainfo-launchable-tag-wrong-value",
+            "metainfo-missing-launchable-tag",
+            "no-exportable-icon-installed",
+            "non-png-icon-in-hicolor-size-folder",
+            "non-svg-icon-in-scalable-folder",
+        }
+    )
+    repo_subpaths = ("files/share/app-info", "files/share/applications", "files/share/icons")
+    share_ref_findings = True
+
     def _validate(self, path: str, appid: str, ref_type: str) -> None:
         skip = False
         if appid.endswith(config.FLATHUB_BASEAPP_IDENTIFIER) or ref_type == "runtime":
@@ -30,7 +57,7 @@ class MetainfoCheck(Check):
             return
 
         if os.path.exists(appstream_path):
-            if len(appstream.components(appstream_path)) != 1:
+            if appstream.component_count(appstream_path) != 1:
                 self.errors.add("appstream-multiple-components")
                 return
 
@@ -58,7 +85,9 @@ class MetainfoCheck(Check):
 
             manifest_key = appstream.get_manifest_key(appstream_path)
 
-            if manifest_key:
+            if manifest_key and not self.is_excepted(
+                "appstream-flathub-manifest-url-not-reachable"
+            ):
                 ok, resp = domainutils.check_url(manifest_key[0], strict=False)
                 if not ok:
                     self.errors.add("appstream-flathub-manifest-url-not-reachable")
@@ -211,19 +240,17 @@ class MetainfoCheck(Check):
 
         self._validate(f"{path}/files/share", appid, ref_type)
 
-    def check_repo(self, path: str) -> None:
-        for ref in ostree.get_all_refs_filtered(path):
-            parts = ref.split("/")
-            ref_type, appid = parts[0], parts[1]
+    def _check_ref(self, path: str, ref: str) -> None:
+        parts = ref.split("/")
+        ref_type, appid = parts[0], parts[1]
 
-            if not (appid and ref_type):
-                return
+        if not (appid and ref_type):
+            return
 
-            with tempfile.TemporaryDirectory() as tmpdir:
-                for subdir in ("app-info", "applications", "icons"):
-                    os.makedirs(os.path.join(tmpdir, subdir), exist_ok=True)
-                    ostree.extract_subpath(
-                        path, ref, f"files/share/{subdir}", os.path.join(tmpdir, subdir), True
-                    )
+        with self._checkout_ref(path, ref) as ref_dir:
+            self._validate(f"{ref_dir}/files/share", appid, ref_type)
 
-                self._validate(tmpdir, appid, ref_type)
+    def check_repo(self, path: str) -> None:
+        self._for_each_ref(
+            ostree.get_all_refs_filtered(path), lambda check, ref: check._check_ref(path, ref)
+        )
@@ -2,15 +2,64 @@ import glob
 import os
 import re
 import subprocess
-import tempfile
 
 from gi.repository import GLib
 
-from .. import appstream, builddir, config, ostree
+from .. import appstream, builddir, config, validationcache
 from . import Check
 
+DESKTOP_FILE_VALIDATE_ARGS = ("--no-hints", "--no-warn-deprecated")
+
+
+def _run_desktop_file_validate(path: str) -> list[str] | None:
+    env = os.environ.copy()
+    env["LANGUAGE"] = "C"
+    env["LC_ALL"] = "C"
+
+    cmd = subprocess.run(
+        ["desktop-file-validate", *DESKTOP_FILE_VALIDATE_ARGS, path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        check=False,
+        env=env,
+    )
+    if cmd.returncode == 0:
+        return None
+    return [p.strip() for p in cmd.stdout.decode("utf-8").split(f"{os.path.basename(path)}:")[1:]]
+
+
+# Returns the errors if the desktop file failed validation
+def validate_desktop_file(path: str) -> list[str] | None:
+    return validationcache.cached(
+        "desktop-file-validate",
+        validationcache.tool_version("desktop-file-validate"),
+        DESKTOP_FILE_VALIDATE_ARGS,
+        path,
+        lambda: _run_desktop_file_validate(path),
+    )
+
 
 class DesktopfileCheck(Check):
+    codes = frozenset(
+        {
+            "desktop-file-exec-has-flatpak-run",
+            "desktop-file-exec-key-absent",
+            "desktop-file-failed-validation",
+            "desktop-file-icon-key-absent",
+            "desktop-file-icon-key-empty",
+            "desktop-file-icon-key-wrong-value",
+            "desktop-file-icon-not-installed",
+            "desktop-file-is-hidden",
+            "desktop-file-is-nodisplay",
+            "desktop-file-low-quality-category",
+            "desktop-file-not-installed",
+            "desktop-file-terminal-key-not-true",
+            "no-exportable-icon-installed",
+        }
+    )
+    repo_subpaths = ("files/share/app-info", "files/share/applications", "files/share/icons")
+    share_ref_findings = True
+
     def _validate(self, path: str, appid: str) -> None:
         appstream_path = f"{path}/app-info/xmls/{appid}.xml.gz"
         desktopfiles_path = f"{path}/applications"
@@ -42,7 +91,7 @@ class DesktopfileCheck(Check):
         if not os.path.exists(appstream_path):
             return
 
-        if len(appstream.components(appstream_path)) != 1:
+        if appstream.component_count(appstream_path) != 1:
             return
 
         aps_ctype = appstream.component_type(appstream_path)
@@ -69,31 +118,17 @@ class DesktopfileCheck(Check):
                 )
 
         for file in desktop_files:
-            if os.path.exists(f"{desktopfiles_path}/{file}"):
-                env = os.environ.copy()
-                env["LANGUAGE"] = "C"
-                env["LC_ALL"] = "C"
-
-                cmd = subprocess.run(
-                    [
-                        "desktop-file-validate",
-                        "--no-hints",
-                        "--no-warn-deprecated",
-                        f"{desktopfiles_path}/{file}",
-                    ],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    check=False,
-                    env=env,
-                )
-                if cmd.returncode != 0:
+            if os.path.exists(f"{desktopfiles_path}/{file}") and not self.is_excepted(
+                "desktop-file-failed-validation"
+            ):
+                messages = validate_desktop_file(f"{desktopfiles_path}/{file}")
+                if messages is not None:
                     self.errors.add("desktop-file-failed-validation")
                     self.info.add(
                         f"desktop-file-failed-validation: Desktop file: {os.path.basename(file)}"
                         + " has failed validation. Please see the errors in desktopfile block"
                     )
-                    for p in cmd.stdout.decode("utf-8").split(f"{file}:")[1:]:
-                        self.desktopfile.add(p.strip())
+                    self.desktopfile.update(messages)
 
         if os.path.exists(f"{desktopfiles_path}/{appid}.desktop"):
             key_file = GLib.KeyFile.new()
@@ -235,19 +270,16 @@ class DesktopfileCheck(Check):
 
         self._validate(f"{path}/files/share", appid)
 
+    def _check_ref(self, path: str, ref: str) -> None:
+        appid = ref.split("/")[1]
+
+        with self._checkout_ref(path, ref) as ref_dir:
+            self._validate(f"{ref_dir}/files/share", appid)
+
     def check_repo(self, path: str) -> None:
         self._populate_refs(path)
         refs = self.repo_primary_refs
         if not refs:
             return
-        for ref in refs:
-            appid = ref.split("/")[1]
-
-            with tempfile.TemporaryDirectory() as tmpdir:
-                for subdir in ("app-info", "applications", "icons"):
-                    os.makedirs(os.path.join(tmpdir, subdir), exist_ok=True)
-                    ostree.extract_subpath(
-                        path, ref, f"files/share/{subdir}", os.path.join(tmpdir, subdir), True
-                    )
 
-                self._validate(tmpdir, appid)
+        self._for_each_ref(refs, lambda check, ref: check._check_ref(path, ref))
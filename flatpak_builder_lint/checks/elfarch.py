@@ -2,13 +2,22 @@ import glob
 import logging
 import os
 import struct
-import tempfile
 
 from .. import builddir, ostree
 from . import Check
 
 logger = logging.getLogger(__name__)
 
+# e_ident and e_machine, nothing after them is needed
+ELF_HEADER_SIZE = 20
+ELF_SUBPATHS = ("files/lib", "files/bin")
+
+ARCH_MAP = {
+    0x3E: "x86_64",
+    0xB7: "aarch64",
+    0xF3: "riscv64",
+}
+
 
 def is_elf(fname: str) -> bool:
     if not os.path.isfile(fname):
@@ -25,42 +34,55 @@ def find_elf_files(path: str) -> list[str]:
     return [file for file in glob.iglob(f"{path}/**", recursive=True) if is_elf(file)]
 
 
+def get_header_arch(header: bytes) -> str | None:
+    if len(header) < ELF_HEADER_SIZE or not header.startswith(b"\x7fELF"):
+        return None
+
+    # EI_DATA is 2 for big endian
+    byte_order = ">" if header[5] == 2 else "<"
+    e_machine = struct.unpack_from(f"{byte_order}H", header, 18)[0]
+    return ARCH_MAP.get(e_machine)
+
+
 def get_elf_arch(fname: str) -> str | None:
-    if is_elf(fname):
-        try:
-            with open(fname, "rb") as f:
-                f.seek(18)
-                e_machine = struct.unpack("<H", f.read(2))[0]
-                arch_map = {
-                    0x3E: "x86_64",
-                    0xB7: "aarch64",
-                    0xF3: "riscv64",
-                }
-                return arch_map.get(e_machine)
-        except struct.error as e:
-            logger.debug(
-                "Failed to unpack ELF architecture from %s: %s: %s", fname, type(e).__name__, e
-            )
-        except OSError as e:
-            logger.debug("Failed to read ELF file %s: %s: %s", fname, type(e).__name__, e)
+    if not os.path.isfile(fname):
+        return None
+    try:
+        with open(fname, "rb") as f:
+            return get_header_arch(f.read(ELF_HEADER_SIZE))
+    except OSError as e:
+        logger.debug("Failed to read ELF file %s: %s: %s", fname, type(e).__name__, e)
     return None
 
 
 def collect_elf_arches(path: str) -> dict[str, str]:
-    return {file: arch for file in find_elf_files(path) if (arch := get_elf_arch(file)) is not None}
+    return {
+        file: arch
+        for file in glob.iglob(f"{path}/**", recursive=True)
+        if (arch := get_elf_arch(file)) is not None
+    }
+
+
+def collect_commit_elf_arches(tree: ostree.CommitTree, path: str) -> dict[str, str]:
+    return {
+        file: arch
+        for file, header in tree.read_heads(path, ELF_HEADER_SIZE)
+        if (arch := get_header_arch(header)) is not None
+    }
 
 
 class ELFArchCheck(Check):
-    def _validate(self, path: str, ref: str) -> None:
+    codes = frozenset(
+        {
+            "elf-arch-multiple-found",
+            "elf-arch-not-found",
+        }
+    )
+
+    def _report(self, ref: str, elf_arches_dict: dict[str, str]) -> None:
         splits = ref.split("/")
         ref_arch = splits[1]
 
-        elf_arches_dict: dict[str, str] = {}
-
-        for subpath in ("files/lib", "files/bin"):
-            fullpath = os.path.join(path, subpath)
-            elf_arches_dict.update(collect_elf_arches(fullpath))
-
         elf_arches = elf_arches_dict.values()
 
         if not (elf_arches_dict and elf_arches):
@@ -77,6 +99,15 @@ class ELFArchCheck(Check):
                 + f" {list(elf_arches)}, {elf_arches_dict}"
             )
 
+    def _validate(self, path: str, ref: str) -> None:
+        elf_arches_dict: dict[str, str] = {}
+
+        for subpath in ELF_SUBPATHS:
+            fullpath = os.path.join(path, subpath)
+            elf_arches_dict.update(collect_elf_arches(fullpath))
+
+        self._report(ref, elf_arches_dict)
+
     def check_build(self, path: str) -> None:
         stripped_ref = builddir.get_runtime(path)
         if not stripped_ref:
@@ -84,21 +115,25 @@ class ELFArchCheck(Check):
 
         self._validate(path, stripped_ref)
 
+    def _check_ref(self, path: str, ref: str) -> None:
+        # Binaries are most of an app, a remote lint does not fetch them
+        if ostree.is_partial_commit(path, ref):
+            return
+
+        # Only the ELF headers are read from the file objects, nothing
+        # is checked out
+        tree = ostree.get_commit_tree(path, ref)
+        elf_arches_dict: dict[str, str] = {}
+
+        for subpath in ELF_SUBPATHS:
+            elf_arches_dict.update(collect_commit_elf_arches(tree, subpath))
+
+        self._report("/".join(ref.split("/")[1:]), elf_arches_dict)
+
     def check_repo(self, path: str) -> None:
-        return
         self._populate_refs(path)
         refs = self.repo_primary_refs
         if not refs:
             return
 
-        for ref in refs:
-            stripped_ref = "/".join(ref.split("/")[1:])
-
-            with tempfile.TemporaryDirectory() as tmpdir:
-                for subdir in ("bin", "lib"):
-                    os.makedirs(os.path.join(tmpdir, subdir), exist_ok=True)
-                    ostree.extract_subpath(
-                        path, ref, f"files/{subdir}", os.path.join(tmpdir, subdir), True
-                    )
-
-                self._validate(tmpdir, stripped_ref)
+        self._for_each_ref(refs, lambda check, ref: check._check_ref(path, ref))
@@ -1,5 +1,4 @@
 import re
-import tempfile
 from collections import defaultdict
 from collections.abc import Callable, Mapping
 from typing import Any
@@ -11,6 +10,15 @@ LAPSE_THRESHOLD: int = 3
 
 
 class EolRuntimeCheck(Check):
+    revalidate = True
+    codes = frozenset(
+        {
+            "runtime-is-eol-*-*",
+            "runtime-update-available-to-*-*",
+        }
+    )
+    repo_reads = ("metadata",)
+
     def _get_latest_runtime_verdict(self, active_runtimes: set[str]) -> dict[str, str]:
         runtime_groups: dict[str, set[str]] = {
             "fdsdk": {"org.freedesktop.Sdk", "org.freedesktop.Platform"},
@@ -157,7 +165,7 @@ class EolRuntimeCheck(Check):
         return True, latest
 
     def _validate(self, appid: str, runtime_ref: str, is_extension: bool) -> None:
-        if config.SKIP_EOLRUNTIME_CHECKS:
+        if config.skip_eolruntime_checks():
             return
 
         is_baseapp = appid.endswith(config.FLATHUB_BASEAPP_IDENTIFIER)
@@ -226,18 +234,18 @@ class EolRuntimeCheck(Check):
 
         self._validate(appid, runtime_ref, ref_type != "app")
 
+    def _check_ref(self, path: str, ref: str) -> None:
+        appid = ref.split("/")[1]
+        runtime_ref = ostree.get_ref_metadata(path, ref).get("runtime")
+        if not isinstance(runtime_ref, str):
+            return
+
+        self._validate(appid, runtime_ref, False)
+
     def check_repo(self, path: str) -> None:
         self._populate_refs(path)
         refs = self.repo_primary_refs
         if not refs:
             return
 
-        for ref in refs:
-            appid = ref.split("/")[1]
-            with tempfile.TemporaryDirectory() as tmpdir:
-                ostree.extract_subpath(path, ref, "/metadata", tmpdir)
-                runtime_ref = builddir.get_runtime(tmpdir)
-                if not runtime_ref:
-                    return
-
-                self._validate(appid, runtime_ref, False)
+        self._for_each_ref(refs, lambda check, ref: check._check_ref(path, ref))
@@ -1,5 +1,4 @@
 import re
-import tempfile
 from collections import defaultdict
 from collections.abc import Mapping
 from typing import Any
@@ -81,6 +80,89 @@ def _flatpak_user_folder_error(fs: str) -> str:
 
 
 class FinishArgsCheck(Check):
+    codes = frozenset(
+        {
+            "finish-args-*-filesystem-access",
+            "finish-args-*-ro-filesystem-access",
+            "finish-args-absolute-home-path",
+            "finish-args-absolute-run-media-path",
+            "finish-args-arbitrary-*-*-access",
+            "finish-args-arbitrary-dbus-access",
+            "finish-args-autostart-filesystem-access",
+            "finish-args-conditional-permission-input-no-restriction",
+            "finish-args-conditional-permission-not-allowed-*",
+            "finish-args-conditional-permission-usb-no-restriction",
+            "finish-args-contains-both-x11-and-fallback",
+            "finish-args-contains-both-x11-and-wayland",
+            "finish-args-contains-inherit-wayland-socket",
+            "finish-args-dconf-talk-name",
+            "finish-args-desktopfile-filesystem-access",
+            "finish-args-direct-dconf-path",
+            "finish-args-fallback-x11-without-wayland",
+            "finish-args-flatpak-appdata-folder*-access",
+            "finish-args-flatpak-spawn-access",
+            "finish-args-flatpak-system-folder*-access",
+            "finish-args-flatpak-system-talk-name",
+            "finish-args-flatpak-talk-name",
+            "finish-args-flatpak-user-folder*-access",
+            "finish-args-freedesktop-dbus-system-talk-name",
+            "finish-args-freedesktop-dbus-talk-name",
+            "finish-args-full-home-cache-access",
+            "finish-args-full-home-config-access",
+            "finish-args-full-home-local-access",
+            "finish-args-full-home-local-share-access",
+            "finish-args-gnupg-filesystem-access",
+            "finish-args-has-nodevice-*",
+            "finish-args-has-nosocket-*",
+            "finish-args-has-socket-gpg-agent",
+            "finish-args-has-socket-ssh-auth",
+            "finish-args-has-unshare-*",
+            "finish-args-host-tmp-access",
+            "finish-args-host-var-access",
+            "finish-args-incorrect-dbus-gvfs",
+            "finish-args-incorrect-secret-service-talk-name",
+            "finish-args-incorrect-theme-folder-permission",
+            "finish-args-insufficient-required-flatpak",
+            "finish-args-kwin-system-talk-name",
+            "finish-args-kwin-talk-name",
+            "finish-args-legacy-font-folder-permission",
+            "finish-args-legacy-icon-folder-permission",
+            "finish-args-login1-system-talk-name",
+            "finish-args-login1-talk-name",
+            "finish-args-metadata-key",
+            "finish-args-mpris-flatpak-id-system-talk-name",
+            "finish-args-mpris-flatpak-id-talk-name",
+            "finish-args-no-required-flatpak",
+            "finish-args-not-defined",
+            "finish-args-only-wayland",
+            "finish-args-own-name-*",
+            "finish-args-plasmashell-system-talk-name",
+            "finish-args-plasmashell-talk-name",
+            "finish-args-portal-impl-*-system-talk-name",
+            "finish-args-portal-impl-*-talk-name",
+            "finish-args-portal-talk-name",
+            "finish-args-reserved-*",
+            "finish-args-ssh-filesystem-access",
+            "finish-args-system-own-name-*",
+            "finish-args-systemd-filesystem-access",
+            "finish-args-systemd1-system-talk-name",
+            "finish-args-systemd1-talk-name",
+            "finish-args-unnecessary-*-*-*-access",
+            "finish-args-unnecessary-appid-mpris-own-name",
+            "finish-args-unnecessary-appid-own-name",
+            "finish-args-unnecessary-appid-talk-name",
+            "finish-args-uses-no-talk-name",
+            "finish-args-wildcard-freedesktop-system-talk-name",
+            "finish-args-wildcard-freedesktop-talk-name",
+            "finish-args-wildcard-gnome-system-talk-name",
+            "finish-args-wildcard-gnome-talk-name",
+            "finish-args-wildcard-kde-system-talk-name",
+            "finish-args-wildcard-kde-talk-name",
+            "finish-args-x11-without-ipc",
+        }
+    )
+    repo_reads = ("metadata",)
+
     def _validate(self, appid: str | None, finish_args: dict[str, set[str]]) -> None:
         init_ver = finish_args.get("required-flatpak")
         flatpak_version = None
@@ -710,22 +792,23 @@ class FinishArgsCheck(Check):
 
         self._validate(appid, permissions)
 
+    def _check_ref(self, path: str, ref: str) -> None:
+        appid = ref.split("/")[1]
+
+        metadata = ostree.get_ref_metadata(path, ref)
+        if not metadata:
+            return
+        raw_perms = metadata.get("permissions")
+        permissions: dict[str, set[str]] = raw_perms if isinstance(raw_perms, dict) else {}
+        if not (permissions or appid.endswith(config.FLATHUB_BASEAPP_IDENTIFIER)):
+            self.errors.add("finish-args-not-defined")
+            return
+        self._validate(appid, permissions)
+
     def check_repo(self, path: str) -> None:
         self._populate_refs(path)
         refs = self.repo_primary_refs
         if not refs:
             return
-        for ref in refs:
-            appid = ref.split("/")[1]
-
-            with tempfile.TemporaryDirectory() as tmpdir:
-                ostree.extract_subpath(path, ref, "/metadata", tmpdir)
-                metadata = builddir.parse_metadata(tmpdir)
-                if not metadata:
-                    return
-                raw_perms = metadata.get("permissions")
-                permissions: dict[str, set[str]] = raw_perms if isinstance(raw_perms, dict) else {}
-                if not (permissions or appid.endswith(config.FLATHUB_BASEAPP_IDENTIFIER)):
-                    self.errors.add("finish-args-not-defined")
-                    return
-                self._validate(appid, permissions)
+
+        self._for_each_ref(refs, lambda check, ref: check._check_ref(path, ref))
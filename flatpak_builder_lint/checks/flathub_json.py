@@ -1,4 +1,3 @@
-import tempfile
 from collections.abc import Mapping
 from typing import Any
 
@@ -7,7 +6,19 @@ from . import Check
 
 
 class FlathubJsonCheck(Check):
+    revalidate = True
     arches = config.FLATHUB_SUPPORTED_ARCHES
+    codes = frozenset(
+        {
+            "flathub-json-skip-appstream-check",
+            "flathub-json-automerge-enabled",
+            "flathub-json-eol-rebase-without-message",
+            "flathub-json-eol-rebase-target-not-on-flathub",
+            "flathub-json-only-arches-empty",
+            "flathub-json-excluded-all-arches",
+        }
+    )
+    repo_reads = ("metadata", f"files/{config.FLATHUB_JSON_FILE}")
 
     def _check_if_extra_data(self, modules: list[dict[str, Any]]) -> bool:
         for module in modules:
@@ -45,7 +56,10 @@ class FlathubJsonCheck(Check):
         if eol_rebase:
             if not eol:
                 self.errors.add("flathub-json-eol-rebase-without-message")
-            if eol_rebase not in domainutils.get_all_flatpak_ids_on_flathub():
+            if (
+                not self.is_excepted("flathub-json-eol-rebase-target-not-on-flathub")
+                and eol_rebase not in domainutils.get_all_flatpak_ids_on_flathub()
+            ):
                 self.errors.add("flathub-json-eol-rebase-target-not-on-flathub")
 
         if only_arches is not None and not isinstance(only_arches, bool) and len(only_arches) == 0:
@@ -82,21 +96,21 @@ class FlathubJsonCheck(Check):
 
         self._validate(appid, flathub_json, ref_type != "app")
 
+    def _check_ref(self, path: str, ref: str) -> None:
+        appid = ref.split("/")[1]
+
+        metadata = ostree.get_ref_metadata(path, ref)
+        if not metadata:
+            return
+        flathub_json = ostree.get_flathub_json(path, ref)
+        if not flathub_json:
+            return
+        self._validate(appid, flathub_json, False)
+
     def check_repo(self, path: str) -> None:
         self._populate_refs(path)
         refs = self.repo_primary_refs
         if not refs:
             return
 
-        for ref in refs:
-            appid = ref.split("/")[1]
-
-            with tempfile.TemporaryDirectory() as tmpdir:
-                ostree.extract_subpath(path, ref, "/metadata", tmpdir)
-                metadata = builddir.parse_metadata(tmpdir)
-                if not metadata:
-                    return
-                flathub_json = ostree.get_flathub_json(path, ref, tmpdir)
-                if not flathub_json:
-                    return
-                self._validate(appid, flathub_json, False)
+        self._for_each_ref(refs, lambda check, ref: check._check_ref(path, ref))
@@ -1,9 +1,6 @@
-import gzip
 import json
 import logging
 import os
-import shutil
-import tempfile
 
 import requests
 
@@ -16,6 +13,17 @@ logger = logging.getLogger(__name__)
 
 
 class FlatManagerCheck(Check):
+    revalidate = True
+    codes = frozenset(
+        {
+            "appstream-no-flathub-manifest-key",
+            "flat-manager-branch-repo-mismatch",
+            "flat-manager-no-app-ref-uploaded",
+            "flat-manager-wrong-ref-branch-for-beta-repo",
+            "flat-manager-wrong-ref-branch-for-stable-repo",
+        }
+    )
+
     def check_repo(self, path: str) -> None:
         flathub_hooks_cfg_paths = [
             "/run/host/etc/flathub-hooks.json",
@@ -85,18 +93,11 @@ class FlatManagerCheck(Check):
                         self.errors.add("flat-manager-branch-repo-mismatch")
                         break
 
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    with (
-                        gzip.open(
-                            f"{path}/appstream/{arches.pop()}/appstream.xml.gz", "rb"
-                        ) as appstream_gz,
-                        open(f"{tmpdir}/appstream.xml", "wb") as appstream_file,
-                    ):
-                        shutil.copyfileobj(appstream_gz, appstream_file)
-
-                    manifest_key = appstream.get_manifest_key(f"{tmpdir}/appstream.xml")
-                    if not manifest_key:
-                        self.errors.add("appstream-no-flathub-manifest-key")
+                manifest_key = appstream.find_manifest_key(
+                    f"{path}/appstream/{arches.pop()}/appstream.xml.gz"
+                )
+                if not manifest_key:
+                    self.errors.add("appstream-no-flathub-manifest-key")
 
             else:
                 ref_branches: set[str] = {
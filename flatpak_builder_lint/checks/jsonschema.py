@@ -1,6 +1,7 @@
 import importlib.resources
 import json
 from collections.abc import Mapping
+from functools import cache
 from typing import Any
 
 import jsonschema
@@ -10,17 +11,26 @@ from .. import staticfiles
 from . import Check
 
 
+@cache
+def load_schema() -> dict[str, Any]:
+    with (
+        importlib.resources.files(staticfiles).joinpath("flatpak-manifest.schema.json").open() as f
+    ):
+        schema: dict[str, Any] = json.load(f)
+    return schema
+
+
 class JSONSchemaCheck(Check):
-    def check_manifest(self, manifest: Mapping[str, Any]) -> None:
-        with (
-            importlib.resources.files(staticfiles)
-            .joinpath("flatpak-manifest.schema.json")
-            .open() as f
-        ):
-            schema = json.load(f)
+    codes = frozenset(
+        {
+            "jsonschema-schema-error",
+            "jsonschema-validation-error",
+        }
+    )
 
+    def check_manifest(self, manifest: Mapping[str, Any]) -> None:
         try:
-            jsonschema.validate(dict(manifest), schema)
+            jsonschema.validate(dict(manifest), load_schema())
         except jsonschema.exceptions.SchemaError:
             self.errors.add("jsonschema-schema-error")
         except jsonschema.exceptions.ValidationError as exc:
@@ -1,15 +1,63 @@
 import glob
 import os
-import tempfile
-
-from ruamel.yaml import YAML
-from ruamel.yaml.error import YAMLError
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
 
 from .. import appstream, builddir, config, ostree
 from . import Check
 
+# Validations of all checks, refs and --jobs threads share one pool, so
+# this is the limit of validators running at once
+VALIDATE_THREADS = 4
+
+
+@cache
+def _validate_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=VALIDATE_THREADS, thread_name_prefix="metainfo-validate")
+
+
+def validate_metainfo_files(files: list[str]) -> list[appstream.ValidationReport]:
+    # The validator waits on a subprocess or runs in C without the GIL,
+    # reports are returned in file order
+    return list(_validate_executor().map(appstream.validate_metainfo, files))
+
 
 class MetainfoCheck(Check):
+    codes = frozenset(
+        {
+            "appstream-failed-validation",
+            "appstream-metainfo-missing",
+            "metainfo-missing-component-tag",
+        }
+    )
+    repo_subpaths = ("files/share/appdata", "files/share/metainfo")
+    share_ref_findings = True
+
+    def _report_validation(self, file: str, report: appstream.ValidationReport) -> None:
+        if report["passed"]:
+            return
+
+        self.errors.add("appstream-failed-validation")
+        self.info.add(
+            f"appstream-failed-validation: Metainfo file {os.path.basename(file)} has"
+            + " failed validation. Please see the errors in appstream block"
+        )
+
+        self.appstream.update(report["messages"])
+
+        for issue in report["issues"]:
+            if issue["severity"] not in ("warning", "error"):
+                continue
+            parts = ["E", report["filename"]]
+            if issue["tag"]:
+                parts.append(issue["tag"])
+            if issue["line"]:
+                parts.append(str(issue["line"]))
+            message = ":".join(parts)
+            if issue["explanation"]:
+                message += f" {issue['explanation'].strip()}"
+            self.appstream.add(message.strip())
+
     def _validate(self, path: str, appid: str, ref_type: str) -> None:
         skip = False
         if appid.endswith(config.FLATHUB_BASEAPP_IDENTIFIER) or ref_type == "runtime":
@@ -46,44 +94,15 @@ class MetainfoCheck(Check):
             )
             return
 
-        for file in metainfo_files:
-            metainfo_validation = appstream.validate(file, "--no-net", "--format", "yaml")
-            if metainfo_validation["returncode"] != 0:
-                self.errors.add("appstream-failed-validation")
-                self.info.add(
-                    f"appstream-failed-validation: Metainfo file {os.path.basename(file)} has"
-                    + " failed validation. Please see the errors in appstream block"
-                )
-
-                for err in metainfo_validation["stderr"].splitlines():
-                    self.appstream.add(err.strip())
-
-                yaml = YAML()
-
-                try:
-                    validation_data = yaml.load(metainfo_validation["stdout"])
-                    filename = validation_data.get("File", file)
-                    issues = validation_data.get("Issues", [])
-                    for issue in issues:
-                        severity = issue.get("severity", "").lower()
-                        if severity in ("warning", "error"):
-                            sev_prefix = "E"
-                            tag = issue.get("tag")
-                            line = issue.get("line")
-                            explanation = issue.get("explanation")
-                            parts = [sev_prefix, filename]
-                            if tag:
-                                parts.append(tag.strip())
-                            if line:
-                                parts.append(str(line).strip())
-                            message = ":".join(parts)
-                            if explanation:
-                                message += f" {explanation.strip()}"
-                            self.appstream.add(message.strip())
-                except YAMLError as e:
-                    self.appstream.add(f"Failed to parse appstream validate YAML output: {e}")
-
-            if not appstream.metainfo_components(file):
+        reports: list[appstream.ValidationReport | None] = [None] * len(metainfo_files)
+        if not self.is_excepted("appstream-failed-validation"):
+            reports = list(validate_metainfo_files(metainfo_files))
+
+        for file, report in zip(metainfo_files, reports, strict=True):
+            if report is not None:
+                self._report_validation(file, report)
+
+            if not appstream.is_metainfo_component(file):
                 self.errors.add("metainfo-missing-component-tag")
                 return
 
@@ -94,19 +113,17 @@ class MetainfoCheck(Check):
 
         self._validate(f"{path}/files/share", appid, ref_type)
 
-    def check_repo(self, path: str) -> None:
-        for ref in ostree.get_all_refs_filtered(path):
-            parts = ref.split("/")
-            ref_type, appid = parts[0], parts[1]
+    def _check_ref(self, path: str, ref: str) -> None:
+        parts = ref.split("/")
+        ref_type, appid = parts[0], parts[1]
 
-            if not (appid and ref_type):
-                return
+        if not (appid and ref_type):
+            return
 
-            with tempfile.TemporaryDirectory() as tmpdir:
-                for subdir in ("appdata", "metainfo"):
-                    os.makedirs(os.path.join(tmpdir, subdir), exist_ok=True)
-                    ostree.extract_subpath(
-                        path, ref, f"files/share/{subdir}", os.path.join(tmpdir, subdir), True
-                    )
+        with self._checkout_ref(path, ref) as ref_dir:
+            self._validate(f"{ref_dir}/files/share", appid, ref_type)
 
-                self._validate(tmpdir, appid, ref_type)
+    def check_repo(self, path: str) -> None:
+        self._for_each_ref(
+            ostree.get_all_refs_filtered(path), lambda check, ref: check._check_ref(path, ref)
+        )
@@ -21,6 +21,26 @@ def _get_bundled_extensions_not_prefixed_with_appid(manifest: Mapping[str, Any])
 
 
 class ModuleCheck(Check):
+    codes = frozenset(
+        {
+            "appid-unprefixed-bundled-extension-*",
+            "module-*-autotools-non-release-build",
+            "module-*-build-network-access",
+            "module-*-checker-tracks-commits",
+            "module-*-cleanup-debug",
+            "module-*-multiple-git-sources-stacked",
+            "module-*-source-dest-filename-is-path",
+            "module-*-source-dir-not-allowed",
+            "module-*-source-git-branch",
+            "module-*-source-git-no-commit-with-tag",
+            "module-*-source-git-no-tag-commit-branch",
+            "module-*-source-git-no-url",
+            "module-*-source-git-url-not-http",
+            "module-*-source-md5-deprecated",
+            "module-*-source-sha1-deprecated",
+        }
+    )
+
     def check_stacked_git_source(
         self,
         module_name: str,
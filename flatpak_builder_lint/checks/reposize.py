@@ -1,49 +1,122 @@
 import logging
 import os
+import threading
+from collections.abc import Callable, Mapping
+from concurrent.futures import ThreadPoolExecutor
 
-from .. import config
+from .. import config, ostree
 from . import Check
 
 logger = logging.getLogger(__name__)
 
+# Loose objects are spread over 256 shard directories, they are scanned
+# in parallel
+SCAN_THREADS = 8
+
+
+class _SizeCounter:
+    def __init__(self, limit: int | None) -> None:
+        self.size = 0
+        self.limit = limit
+        self.exceeded = threading.Event()
+        self._lock = threading.Lock()
+
+    def add(self, size: int) -> None:
+        with self._lock:
+            self.size += size
+            if self.limit is not None and self.size >= self.limit:
+                self.exceeded.set()
+
+
+def _scan_size(top: str, counter: _SizeCounter, prune: frozenset[str] = frozenset()) -> None:
+    pending = [top]
+
+    while pending and not counter.exceeded.is_set():
+        dirpath = pending.pop()
+        size = 0
+        try:
+            with os.scandir(dirpath) as it:
+                entries = list(it)
+        except OSError as e:
+            logger.debug("Failed to scan %s: %s: %s", dirpath, type(e).__name__, e)
+            continue
+
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in prune:
+                        pending.append(entry.path)
+                elif not entry.is_symlink():
+                    size += entry.stat(follow_symlinks=False).st_size
+            except OSError as e:
+                logger.debug("Failed to get size of %s: %s: %s", entry.path, type(e).__name__, e)
+        counter.add(size)
+
 
 class RepoSizeCheck(Check):
+    # The size of the objects can change while the refs stay the same,
+    # so it is not covered by the cache key of a repo
+    revalidate = True
+    codes = frozenset({"flatpak-repo-too-large"})
+
     @staticmethod
-    def get_dir_size(path: str) -> int:
-        size = 0
-        for dirpath, _, filenames in os.walk(
-            path,
-            onerror=lambda e: logger.debug(
-                "os.walk error for %s: %s: %s", path, type(e).__name__, e
-            ),
-        ):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                try:
-                    if not os.path.islink(fp):
-                        size += os.path.getsize(fp)
-                except (FileNotFoundError, PermissionError) as e:
-                    logger.debug("Failed to get size of %s: %s: %s", fp, type(e).__name__, e)
-                    continue
-        logger.debug("Directory size for %s: %s bytes", path, size)
-        return size
-
-    def _validate(self, path: str, primary_ref_count: int = 1) -> None:
+    def get_dir_size(path: str, limit: int | None = None) -> int:
+        # Stops early once limit is crossed, the returned size is then
+        # only a lower bound
+        counter = _SizeCounter(limit)
+        objects = os.path.join(path, "objects")
+        try:
+            with os.scandir(objects) as it:
+                shards = [e.path for e in it if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            shards = []
+
+        roots = [(path, frozenset({objects})), (objects, frozenset(shards))]
+        roots.extend((shard, frozenset()) for shard in shards)
+
+        with ThreadPoolExecutor(max_workers=SCAN_THREADS) as executor:
+            futures = [executor.submit(_scan_size, top, counter, prune) for top, prune in roots]
+            for future in futures:
+                future.result()
+
+        logger.debug("Directory size for %s: %s bytes", path, counter.size)
+        return counter.size
+
+    def _validate(
+        self,
+        path: str,
+        primary_ref_count: int = 1,
+        get_ref_sizes: Callable[[], Mapping[str, int]] | None = None,
+    ) -> None:
         BASE = 12 * 1024 * 1024 * 1024
         MAX = BASE * primary_ref_count if primary_ref_count > 1 else BASE
 
-        repo_size = self.get_dir_size(path)
+        if not config.is_flathub_pipeline():
+            return
 
-        if config.is_flathub_pipeline() and repo_size >= MAX:
+        repo_size = self.get_dir_size(path, limit=MAX)
+
+        if repo_size >= MAX:
             size_gb = repo_size / (1024**3)
             max_gb = MAX / (1024**3)
             self.errors.add("flatpak-repo-too-large")
-            self.info.add(
-                f"flatpak-repo-too-large: Flatpak repo size is {size_gb:.2f} GB"
-                + f" exceeds limit of {max_gb:.2f} GB"
+            message = (
+                f"flatpak-repo-too-large: Flatpak repo size is at least {size_gb:.2f} GB"
+                + f" and exceeds limit of {max_gb:.2f} GB"
             )
+            # Only read from the commits once the limit is known to be exceeded
+            ref_sizes = get_ref_sizes() if get_ref_sizes else None
+            if ref_sizes:
+                largest = sorted(ref_sizes.items(), key=lambda item: (-item[1], item[0]))
+                message += ". Download size of refs: " + ", ".join(
+                    f"{ref} {size / (1024**3):.2f} GB" for ref, size in largest
+                )
+            self.info.add(message)
 
     def check_repo(self, path: str) -> None:
+        if not config.is_flathub_pipeline():
+            return
+
         self._populate_refs(path)
         primary_ref_count = len(self.repo_primary_refs)
-        self._validate(path, primary_ref_count)
+        self._validate(path, primary_ref_count, lambda: ostree.get_ref_download_sizes(path))
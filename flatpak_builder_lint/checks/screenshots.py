@@ -1,6 +1,5 @@
 import glob
 import os
-import tempfile
 
 from .. import appstream, builddir, config, ostree
 from . import Check
@@ -11,6 +10,21 @@ def should_skip_mirror_check(has_test_ref: bool) -> bool:
 
 
 class ScreenshotsCheck(Check):
+    codes = frozenset(
+        {
+            "appstream-external-screenshot-url",
+            "appstream-metainfo-missing",
+            "appstream-missing-appinfo-file",
+            "appstream-missing-screenshots",
+            "appstream-multiple-components",
+            "appstream-screenshots-files-not-found-in-ostree",
+            "appstream-screenshots-not-mirrored-in-ostree",
+            "metainfo-missing-screenshots",
+            "metainfo-svg-screenshots",
+        }
+    )
+    repo_subpaths = ("files/share/appdata", "files/share/metainfo", "files/share/app-info")
+
     def _validate(self, path: str, appid: str, ref_type: str, has_test_ref: bool) -> None:
         appstream_path = f"{path}/app-info/xmls/{appid}.xml.gz"
 
@@ -80,7 +94,7 @@ class ScreenshotsCheck(Check):
             return
 
         if os.path.exists(appstream_path):
-            if len(appstream.components(appstream_path)) != 1:
+            if appstream.component_count(appstream_path) != 1:
                 self.errors.add("appstream-multiple-components")
                 return
 
@@ -118,50 +132,49 @@ class ScreenshotsCheck(Check):
         # ref branch is not exposed in builddir metadata
         self._validate(f"{path}/files/share", appid, ref_type, has_test_ref=False)
 
-    def check_repo(self, path: str) -> None:
-        self._populate_refs(path)
-        refs = self.repo_primary_refs
-        refs.update({r for r in ostree.get_refs(path, None) if r.startswith("screenshots/")})
-        app_refs = {ref for ref in refs if ref.startswith("app/") and len(ref.split("/")) == 4}
-        if not app_refs:
-            return
-
-        has_test_ref = False
-        for ref in app_refs:
-            appid = ref.split("/")[1]
-            arch = ref.split("/")[2]
-            branch = ref.split("/")[3]
-
-            if branch == "test":
-                has_test_ref = True
+    def _check_ref(self, path: str, ref: str, refs: set[str], has_test_ref: bool) -> None:
+        appid = ref.split("/")[1]
+        arch = ref.split("/")[2]
 
-            with tempfile.TemporaryDirectory() as tmpdir:
-                for subdir in ("appdata", "metainfo", "app-info"):
-                    os.makedirs(os.path.join(tmpdir, subdir), exist_ok=True)
-                    ostree.extract_subpath(
-                        path, ref, f"files/share/{subdir}", os.path.join(tmpdir, subdir), True
-                    )
+        with self._checkout_ref(path, ref) as ref_dir:
+            share_dir = f"{ref_dir}/files/share"
+            self._validate(share_dir, appid, "app", has_test_ref)
+            appstream_path = f"{share_dir}/app-info/xmls/{appid}.xml.gz"
 
-                self._validate(tmpdir, appid, "app", has_test_ref)
-                appstream_path = f"{tmpdir}/app-info/xmls/{appid}.xml.gz"
+            if not should_skip_mirror_check(has_test_ref) and os.path.exists(appstream_path):
+                aps_ctype = appstream.component_type(appstream_path)
 
-                if not should_skip_mirror_check(has_test_ref) and os.path.exists(appstream_path):
-                    aps_ctype = appstream.component_type(appstream_path)
-
-                    if aps_ctype in config.FLATHUB_APPSTREAM_TYPES_DESKTOP:
-                        if f"screenshots/{arch}" not in refs:
+                if aps_ctype in config.FLATHUB_APPSTREAM_TYPES_DESKTOP:
+                    if f"screenshots/{arch}" not in refs:
+                        # A remote lint only fetches the screenshots ref
+                        # when it is passed with --ref
+                        if not ostree.is_partial_commit(path, ref):
                             self.errors.add("appstream-screenshots-not-mirrored-in-ostree")
-                            return
+                        return
+
+                    # Only the file names are needed, nothing is checked out
+                    ref_sc_files = {
+                        name
+                        for _, _, files in ostree.get_commit_tree(
+                            path, f"screenshots/{arch}"
+                        ).walk()
+                        for name in files
+                        if name.endswith(".png")
+                    }
 
-                        media_path = os.path.join(tmpdir, "app-info", f"screenshots-{arch}")
-                        media_glob_path = f"{media_path}/**"
-                        ostree.extract_subpath(path, f"screenshots/{arch}", "/", media_path)
+                    if not ref_sc_files:
+                        self.errors.add("appstream-screenshots-files-not-found-in-ostree")
 
-                        ref_sc_files = {
-                            os.path.basename(path)
-                            for path in glob.glob(media_glob_path, recursive=True)
-                            if path.endswith(".png")
-                        }
+    def check_repo(self, path: str) -> None:
+        self._populate_refs(path)
+        refs = self.repo_primary_refs | {
+            r for r in ostree.get_refs(path, None) if r.startswith("screenshots/")
+        }
+        app_refs = {ref for ref in refs if ref.startswith("app/") and len(ref.split("/")) == 4}
+        if not app_refs:
+            return
 
-                        if not ref_sc_files:
-                            self.errors.add("appstream-screenshots-files-not-found-in-ostree")
+        has_test_ref = any(ref.split("/")[3] == "test" for ref in app_refs)
+        self._for_each_ref(
+            app_refs, lambda check, ref: check._check_ref(path, ref, refs, has_test_ref)
+        )
@@ -6,6 +6,23 @@ from . import Check
 
 
 class TopLevelCheck(Check):
+    revalidate = True
+    codes = frozenset(
+        {
+            "external-gitmodule-url-found",
+            "manifest-directory-too-large",
+            "manifest-invalid-yaml",
+            "manifest-json-warnings",
+            "manifest-toplevel-build-network-access",
+            "manifest-unknown-properties",
+            "toplevel-cleanup-debug",
+            "toplevel-command-is-path",
+            "toplevel-no-command",
+            "toplevel-no-modules",
+            "toplevel-unnecessary-branch",
+        }
+    )
+
     def check_manifest(self, manifest: Mapping[str, Any]) -> None:
         yaml_failed = manifest.get("x-manifest-yaml-failed")
         if yaml_failed:
@@ -1,12 +1,13 @@
-import argparse
 import importlib
 import json
 import logging
 import os
 import pkgutil
 import sys
-import textwrap
-from importlib.resources import files
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from importlib.resources import as_file, files
 from types import MappingProxyType
 from typing import Any
 
@@ -15,11 +16,16 @@ from . import (
     appstream,
     builddir,
     checks,
+    cliutils,
     config,
+    daemon,
     domainutils,
+    exceptions_index,
     exceptions_janitor,
     manifest,
     ostree,
+    prefixmatch,
+    resultcache,
     staticfiles,
 )
 
@@ -29,13 +35,14 @@ for plugin_info in pkgutil.iter_modules(checks.__path__):
     importlib.import_module(f".{plugin_info.name}", package=checks.__name__)
 
 
-def setup_logging(debug: bool = False) -> None:
-    log_format = "%(asctime)s %(levelname)s:%(name)s:%(funcName)s: %(message)s"
+LOG_FORMAT = "%(asctime)s %(levelname)s:%(name)s:%(funcName)s: %(message)s"
+
 
-    if debug or config.DEBUG:
+def setup_logging(debug: bool = False) -> None:
+    if debug or config.is_debug():
         logging.basicConfig(
             level=logging.CRITICAL + 1,
-            format=log_format,
+            format=LOG_FORMAT,
         )
         logging.getLogger("flatpak_builder_lint").setLevel(logging.DEBUG)
     else:
@@ -49,10 +56,10 @@ def setup_logging(debug: bool = False) -> None:
         if os.path.isfile(log_path):
             os.remove(log_path)
         file_handler = logging.FileHandler(log_path, mode="a", encoding="utf-8")
-        file_handler.setFormatter(logging.Formatter(log_format))
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
         logging.basicConfig(
             level=logging.CRITICAL + 1,
-            format=log_format,
+            format=LOG_FORMAT,
             handlers=[file_handler],
             force=True,
         )
@@ -60,33 +67,25 @@ def setup_logging(debug: bool = False) -> None:
 
 
 def _filter(info: set[str], excepts: set[str]) -> list[str]:
-    final = set()
-    for i in info:
-        count = False
-        for j in excepts:
-            if i is not None and i.startswith(j):
-                count = True
-                break
-        if not count:
-            final.add(i)
-    return list(final)
+    matcher = prefixmatch.compile_prefixes(frozenset(excepts))
+    return [i for i in info if i is None or not matcher.match(i)]
 
 
 def get_local_exceptions(appid: str, exceptions_repo: str | None) -> set[str]:
     result: set[str] = set()
-    with files(staticfiles).joinpath("exceptions.json").open("r", encoding="utf-8") as f:
-        exceptions = json.load(f)
-        ret = exceptions.get(appid, {})
-        if exceptions_repo:
-            result = set(ret.get(exceptions_repo, {}).keys()) | set(ret.get("*", {}).keys())
-        else:
-            result = {k for v in ret.values() for k in v}
-        logger.debug(
-            "Loaded local exceptions for %s (repo key: %s): %s",
-            appid,
-            exceptions_repo,
-            result,
-        )
+    with as_file(files(staticfiles).joinpath("exceptions.json")) as exceptions_file:
+        exceptions_index.sync_file(config.EXCEPTIONS_INDEX, str(exceptions_file))
+    ret = exceptions_index.lookup(config.EXCEPTIONS_INDEX, appid)
+    if exceptions_repo:
+        result = set(ret.get(exceptions_repo, {}).keys()) | set(ret.get("*", {}).keys())
+    else:
+        result = {k for v in ret.values() for k in v}
+    logger.debug(
+        "Loaded local exceptions for %s (repo key: %s): %s",
+        appid,
+        exceptions_repo,
+        result,
+    )
 
     return result
 
@@ -105,152 +104,225 @@ def get_user_exceptions(file: str, appid: str) -> set[str]:
     return set()
 
 
-def print_gh_annotations(results: dict[str, str | list[str]], artifact_type: str) -> None:
-    if not results:
-        return
-
-    OMITTED_ANNOTATIONS = {
-        "appstream-failed-validation",
-        "desktop-file-failed-validation",
-    }
-
-    info: dict[str, str] = {
-        k.strip(): v.strip()
-        for entry in results.get("info", [])
-        if ": " in entry
-        for k, v in [entry.split(": ", 1)]
-        if k.strip() not in OMITTED_ANNOTATIONS
-    }
-
-    for msg in results.get("errors", []):
-        if msg in OMITTED_ANNOTATIONS:
-            continue
-
-        detail = f"Details: {info.get(msg)}" if msg in info else ""
-        print(f"::error::{msg!r} error found in linter {artifact_type} check. {detail}")  # noqa: T201
-
-    for line in results.get("appstream", []):
-        print(f"::error::Appstream: {line.strip()!r}")  # noqa: T201
-
-    for line in results.get("desktopfile", []):
-        print(f"::error::Desktop file: {line.strip()!r}")  # noqa: T201
+def get_exceptions(
+    appid: str, user_exceptions_path: str | None, exceptions_repo: str | None
+) -> set[str]:
+    if user_exceptions_path:
+        exceptions = get_user_exceptions(user_exceptions_path, appid)
+        logger.debug("Using user exceptions: %s", exceptions)
+    else:
+        exceptions = domainutils.get_remote_exceptions_github(appid, exceptions_repo)
+        logger.debug("Using remote exceptions: %s", exceptions)
 
-    for line in results.get("jsonschema", []):
-        print(f"::error::JSON schema: {line.strip()!r}")  # noqa: T201
+    if not exceptions:
+        exceptions = get_local_exceptions(appid, exceptions_repo)
+        logger.debug("Falling back to local exceptions: %s", exceptions)
 
-    for msg in results.get("warnings", []):
-        if msg in OMITTED_ANNOTATIONS:
-            continue
+    return exceptions
 
-        detail = f"Details: {info.get(msg)}" if msg in info else ""
-        print(f"::warning::{msg!r} warning found in linter {artifact_type} check. {detail}")  # noqa: T201
 
-    if help_msg := results.get("message"):
-        print(f"::notice::💡 {help_msg}")  # noqa: T201
+def get_repo_subpaths() -> set[str]:
+    return {
+        subpath
+        for checkclass in checks.ALL
+        for subpath in (*checkclass.repo_subpaths, *checkclass.repo_reads)
+    }
 
 
 def run_checks(
     kind: str,
     path: str,
     enable_exceptions: bool = False,
-    appid: str | None = None,
+    appid: list[str] | None = None,
     user_exceptions_path: str | None = None,
     enable_janitor_exceptions: bool = False,
     exceptions_repo: str | None = None,
+    *,
+    repo_primary_refs: set[str] | None = None,
+    jobs: int = 1,
+    use_result_cache: bool = False,
 ) -> dict[str, str | list[str]]:
+    # Bundles and remote repos are linted as a local repo with the same
+    # checks
+    local_repo: AbstractContextManager[str] | None = None
+    if kind == "bundle":
+        local_repo = ostree.bundle_repo(path)
+    elif kind == "repo" and cliutils.is_remote_url(path):
+        if not repo_primary_refs:
+            raise ValueError("Refs to lint are required for a remote repo")
+        local_repo = ostree.remote_repo(path, repo_primary_refs, get_repo_subpaths())
+
+    if local_repo is not None:
+        with local_repo as repo_path:
+            return run_checks(
+                "repo",
+                repo_path,
+                enable_exceptions,
+                appid,
+                user_exceptions_path,
+                enable_janitor_exceptions,
+                exceptions_repo,
+                repo_primary_refs=repo_primary_refs,
+                jobs=jobs,
+                use_result_cache=use_result_cache,
+            )
+
     stale_exceptions: set[str] | None = None
+    exceptions: set[str] = set()
 
     match kind:
         case "manifest":
             check_method_name = "check_manifest"
             infer_appid_func = manifest.infer_appid
-            check_method_arg: str | MappingProxyType[str, Any] = manifest.show_manifest(path)
         case "builddir":
             check_method_name = "check_build"
             infer_appid_func = builddir.infer_appid
-            check_method_arg = path
         case "repo":
             check_method_name = "check_repo"
             infer_appid_func = ostree.infer_appid
-            check_method_arg = path
         case _:
             raise ValueError(f"Unknown kind: {kind}")
 
-    for checkclass in checks.ALL:
-        check = checkclass()
+    # The list of --appid, only its first value is used
+    linted_appid = appid[0] if appid else None
+    if enable_exceptions:
+        linted_appid = linted_appid or infer_appid_func(path)
+        if linted_appid:
+            exceptions = get_exceptions(linted_appid, user_exceptions_path, exceptions_repo)
+
+    report_stale_exceptions = bool(
+        exceptions
+        and enable_janitor_exceptions
+        and linted_appid
+        and config.is_flathub_build_pipeline()
+    )
+
+    # Stale exceptions are still reported for apps with the wildcard
+    if "*" in exceptions and not report_stale_exceptions:
+        logger.debug("Skipping all checks for %s, found wildcard exception", linted_appid)
+        return {}
+
+    # Closed on any error as well, so the daemon and batches do not leave
+    # checkouts behind
+    workspace = ostree.CheckoutWorkspace(path) if kind == "repo" else None
+    with workspace or nullcontext():
+        context = checks.LintContext(
+            repo_primary_refs=set(repo_primary_refs or ()),
+            jobs=jobs,
+            # Stale exceptions are found from the errors of every check, so
+            # nothing can be skipped when they are reported
+            exceptions=frozenset() if report_stale_exceptions else frozenset(exceptions),
+            workspace=workspace,
+        )
+
+        if kind == "repo":
+            if not context.repo_primary_refs:
+                context.repo_primary_refs.update(ostree.get_primary_refs(path))
+            context.shared_findings = (
+                resultcache.shared_findings(context)
+                if use_result_cache
+                else checks.SharedFindings()
+            )
+
+        result_cache_key = resultcache.cache_key(kind, path, context) if use_result_cache else None
+        cached = resultcache.load(result_cache_key) if result_cache_key else None
+        if cached is not None:
+            logger.debug("Found cached results for %s, revalidating the remaining checks", path)
+
+        check_instances = []
+        for checkclass in checks.ALL:
+            if checkclass.codes is not None and context.is_excepted(*checkclass.codes):
+                logger.debug("Skipping %s, all of its codes are excepted", checkclass.__name__)
+                continue
+            if cached is not None and not checkclass.revalidate:
+                continue
+            check_instances.append(checkclass(context.fork()))
+
+        check_methods = [
+            check_method
+            for check in check_instances
+            if (check_method := getattr(check, check_method_name, None)) and callable(check_method)
+        ]
+
+        check_method_arg: str | MappingProxyType[str, Any] = path
+        if kind == "manifest" and (check_methods or cached is None):
+            check_method_arg = manifest.show_manifest(path)
+
+        if jobs > 1 and len(check_methods) > 1:
+            logger.debug("Running %s checks with %s jobs", len(check_methods), jobs)
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = [executor.submit(method, check_method_arg) for method in check_methods]
+                for future in futures:
+                    future.result()
+        else:
+            for method in check_methods:
+                method(check_method_arg)
+
+    if result_cache_key and cached is None:
+        resultcache.store(
+            result_cache_key,
+            (check.context for check in check_instances if not check.revalidate),
+        )
+
+    if cached is not None:
+        context.merge(cached)
 
-        if (check_method := getattr(check, check_method_name, None)) and callable(check_method):
-            check_method(check_method_arg)
+    # Merge in registration order so the result does not depend on
+    # which check finished first
+    for check in check_instances:
+        context.merge(check.context)
 
     results: dict[str, str | list[str]] = {}
-    if errors := checks.Check.errors:
+    if errors := context.errors:
         results["errors"] = list(errors)
-    if warnings := checks.Check.warnings:
+    if warnings := context.warnings:
         results["warnings"] = list(warnings)
-    if jsonschema := checks.Check.jsonschema:
+    if jsonschema := context.jsonschema:
         results["jsonschema"] = list(jsonschema)
-    if appstream := checks.Check.appstream:
+    if appstream := context.appstream:
         results["appstream"] = list(appstream)
-    if desktopfile := checks.Check.desktopfile:
+    if desktopfile := context.desktopfile:
         results["desktopfile"] = list(desktopfile)
-    if info := checks.Check.info:
+    if info := context.info:
         results["info"] = list(info)
 
-    if enable_exceptions:
-        exceptions = None
-
-        appid = appid[0] if appid else infer_appid_func(path)
-
-        if appid:
-            if user_exceptions_path:
-                exceptions = get_user_exceptions(user_exceptions_path, appid)
-                logger.debug("Using user exceptions: %s", exceptions)
-            else:
-                exceptions = domainutils.get_remote_exceptions_github(appid, exceptions_repo)
-                logger.debug("Using remote exceptions: %s", exceptions)
-
-            if not exceptions:
-                exceptions = get_local_exceptions(appid, exceptions_repo)
-                logger.debug("Falling back to local exceptions: %s", exceptions)
-
-        if exceptions:
-            if (
-                enable_janitor_exceptions
-                and appid
-                and config.is_flathub_build_pipeline()
-                and (stale_raw := exceptions_janitor.get_stale_exceptions(errors, exceptions))
-            ):
-                ignore_stale_exceptions: set[str] = {"appid-url-not-reachable"}
-                stale_exceptions = stale_raw - ignore_stale_exceptions
-                if stale_exceptions:
-                    exceptions_janitor.report_stale_exceptions(appid, stale_exceptions)
-
-            if "*" in exceptions:
-                return {}
-
-            results["errors"] = list(errors - set(exceptions))
-            if not results["errors"]:
-                results.pop("errors")
-
-            warnings_lst = list(warnings - set(exceptions))
+    if exceptions:
+        if (
+            linted_appid
+            and report_stale_exceptions
+            and (stale_raw := exceptions_janitor.get_stale_exceptions(errors, exceptions))
+        ):
+            ignore_stale_exceptions: set[str] = {"appid-url-not-reachable"}
+            stale_exceptions = stale_raw - ignore_stale_exceptions
             if stale_exceptions:
-                warnings_lst.append("stale-exceptions-found")
-            results["warnings"] = warnings_lst
-            if not results["warnings"]:
-                results.pop("warnings")
+                exceptions_janitor.report_stale_exceptions(linted_appid, stale_exceptions)
 
-            if "appstream-failed-validation" in set(exceptions):
-                results.pop("appstream", None)
+        if "*" in exceptions:
+            return {}
 
-            if "desktop-file-failed-validation" in set(exceptions):
-                results.pop("desktopfile", None)
+        results["errors"] = list(errors - set(exceptions))
+        if not results["errors"]:
+            results.pop("errors")
 
-            info_lst = _filter(set(info), set(exceptions))
-            if stale_exceptions:
-                info_lst.append(f"stale-exceptions-found: {', '.join(sorted(stale_exceptions))}")
-            results["info"] = info_lst
-            if not results["info"]:
-                results.pop("info")
+        warnings_lst = list(warnings - set(exceptions))
+        if stale_exceptions:
+            warnings_lst.append("stale-exceptions-found")
+        results["warnings"] = warnings_lst
+        if not results["warnings"]:
+            results.pop("warnings")
+
+        if "appstream-failed-validation" in set(exceptions):
+            results.pop("appstream", None)
+
+        if "desktop-file-failed-validation" in set(exceptions):
+            results.pop("desktopfile", None)
+
+        info_lst = _filter(set(info), set(exceptions))
+        if stale_exceptions:
+            info_lst.append(f"stale-exceptions-found: {', '.join(sorted(stale_exceptions))}")
+        results["info"] = info_lst
+        if not results["info"]:
+            results.pop("info")
 
     help_text = "See https://docs.flathub.org/linter for details and exceptions"
 
@@ -260,136 +332,83 @@ def run_checks(
     return results
 
 
+@contextmanager
+def request_logging() -> Iterator[None]:
+    # The daemon was set up with its own flags, a request with the debug
+    # flag also logs to the console
+    root_handlers = logging.getLogger().handlers
+    if not config.is_debug() or any(
+        type(handler) is logging.StreamHandler for handler in root_handlers
+    ):
+        yield
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    package_logger = logging.getLogger("flatpak_builder_lint")
+    package_logger.addHandler(handler)
+    try:
+        yield
+    finally:
+        package_logger.removeHandler(handler)
+
+
+def serve_request(request: dict[str, Any]) -> Any:
+    with request_logging():
+        return _serve_request(request)
+
+
+def _serve_request(request: dict[str, Any]) -> Any:
+    kind = request["kind"]
+    path = request["path"]
+
+    if kind == "appstream":
+        return appstream.validate(path, "--explain")
+
+    options = dict(request.get("options", {}))
+    options["repo_primary_refs"] = set(options.get("repo_primary_refs", ()))
+    return run_checks(kind, path, **options)
+
+
 def main() -> int:
-    description = textwrap.dedent("""\
-        flatpak-builder-lint
-
-        A linter for Flatpak manifests and build artifacts primarily
-        developed for Flathub
-    """)
-    parser = argparse.ArgumentParser(
-        description=description,
-        formatter_class=argparse.RawTextHelpFormatter,
-        usage=argparse.SUPPRESS,
-        add_help=False,
-        epilog=f"Please report any issues at https://github.com/{config.LINTER_FULL_REPO}",
-    )
-    parser.add_argument(
-        "-h",
-        "--help",
-        action="help",
-        help="Show this help message and exit",
-    )
-    parser.add_argument(
-        "--version",
-        action="version",
-        help="Show the version number and exit",
-        version=f"flatpak-builder-lint {__version__}",
-    )
-    parser.add_argument(
-        "--exceptions",
-        help="Skip errors added to exceptions. Exceptions must be submitted to Flathub",
-        action="store_true",
-    )
-    parser.add_argument(
-        "--exceptions-repo",
-        help=(
-            "Repo key for remote exception lookups from Flathub. "
-            "Omitting merges all repo keys; supplying a value merges '*' and that key."
-        ),
-        type=str,
-        metavar="",
-    )
-    parser.add_argument(
-        "--user-exceptions",
-        help="Path to a JSON file with exceptions",
-        type=str,
-        metavar="",
-    )
-    parser.add_argument(
-        "--appid", help="Override the app ID with this app ID", type=str, metavar="", nargs=1
-    )
-    parser.add_argument(
-        "--cwd",
-        help="Override the path parameter with the current working directory",
-        action="store_true",
-    )
-    parser.add_argument(
-        "--ref",
-        help="Override the primary ref detection with this ref",
-        type=str,
-        action="append",
-        default=[],
-        metavar="",
-    )
-    parser.add_argument(
-        "type",
-        choices=["appstream", "manifest", "builddir", "repo"],
-        help=textwrap.dedent("""\
-            Type of artifact to lint
-
-              appstream expects a MetaInfo file
-              manifest  expects a flatpak-builder manifest
-              builddir  expects a flatpak-builder build directory
-              repo      expects an OSTree repo exported by flatpak-builder\n\n"""),
-    )
-    parser.add_argument(
-        "path",
-        help="Path to the artifact",
-        type=str,
-        nargs=1,
-        metavar="PATH",
-    )
-    parser.add_argument(
-        "--gha-format",
-        help="Use GitHub Actions annotations in CI",
-        action="store_true",
-    )
-    parser.add_argument(
-        "--janitor-exceptions",
-        help="Enable reporting of stale exceptions to linter repository",
-        action="store_true",
-    )
-    parser.add_argument(
-        "--debug",
-        help="Enable debug logging to console",
-        action="store_true",
-    )
+    parser = cliutils.build_parser()
+    args = cliutils.parse_args(parser)
 
-    args = parser.parse_args()
     setup_logging(args.debug)
 
     logger.debug("flatpak-builder-lint version: %s", __version__)
 
-    exit_code = 0
+    if args.serve:
+        daemon.serve(args.socket, serve_request)
+        sys.exit(0)
+
+    def lint(path: str) -> dict[str, str | list[str]]:
+        try:
+            return run_checks(
+                args.type,
+                path,
+                args.exceptions,
+                args.appid,
+                args.user_exceptions,
+                args.janitor_exceptions,
+                args.exceptions_repo,
+                repo_primary_refs=set(args.ref),
+                jobs=args.jobs,
+                use_result_cache=args.result_cache,
+            )
+        finally:
+            # Batches can go through many repos, their files are not kept open
+            ostree.close_repos()
 
-    path = os.getcwd() if args.cwd else args.path[0]
+    if args.batch:
+        sys.exit(cliutils.lint_batch(cliutils.iter_batch_paths(args.batch), lint))
 
-    if args.ref:
-        checks.Check.repo_primary_refs = set(args.ref)
+    path = os.getcwd() if args.cwd else args.path
 
     if args.type != "appstream":
-        if results := run_checks(
-            args.type,
-            path,
-            args.exceptions,
-            args.appid,
-            args.user_exceptions,
-            args.janitor_exceptions,
-            args.exceptions_repo,
-        ):
-            if "errors" in results:
-                exit_code = 1
-
-            if os.environ.get("GITHUB_ACTIONS") == "true" and args.gha_format:
-                print_gh_annotations(results, args.type)
-            else:
-                print(json.dumps(results, indent=4))  # noqa: T201
+        exit_code = cliutils.print_results(lint(path), args.type, args.gha_format)
     else:
-        appstream_results = appstream.validate(path, "--explain")
-        print(appstream_results["stdout"])  # noqa: T201
-        print(appstream_results["stderr"])  # noqa: T201
-        exit_code = appstream_results["returncode"]
+        exit_code = cliutils.print_appstream_results(appstream.validate(path, "--explain"))
 
     sys.exit(exit_code)
 
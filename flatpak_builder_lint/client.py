@@ -0,0 +1,90 @@
+import json
+import os
+import socket
+import sys
+from io import BufferedIOBase
+from typing import Any
+
+from . import cliutils, config
+
+# Sends lint requests to a daemon started with flatpak-builder-lint --serve.
+# Like cliutils, this must not import anything that loads the linter.
+
+
+def request(stream: BufferedIOBase, payload: dict[str, Any]) -> Any:
+    stream.write(json.dumps(payload).encode() + b"\n")
+    stream.flush()
+
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("The daemon closed the connection")
+
+    reply = json.loads(line)
+    if "exception" in reply:
+        raise cliutils.RemoteLintError(reply["exception"])
+    return reply["results"]
+
+
+def main() -> int:
+    parser = cliutils.build_parser()
+    args = cliutils.parse_args(parser)
+
+    if args.serve:
+        parser.error("--serve is not supported by the client")
+
+    options = {
+        "enable_exceptions": args.exceptions,
+        "appid": args.appid,
+        "user_exceptions_path": args.user_exceptions and os.path.abspath(args.user_exceptions),
+        "enable_janitor_exceptions": args.janitor_exceptions,
+        "exceptions_repo": args.exceptions_repo,
+        "repo_primary_refs": args.ref,
+        "jobs": args.jobs,
+        "use_result_cache": args.result_cache,
+    }
+    env = {name: os.environ[name] for name in config.DAEMON_FORWARDED_ENV if name in os.environ}
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(args.socket)
+    except OSError as err:
+        sock.close()
+        parser.exit(
+            2,
+            f"Failed to connect to the daemon at {args.socket}: {err.strerror}. "
+            "Start it with flatpak-builder-lint --serve\n",
+        )
+
+    with sock, sock.makefile("rwb") as stream:
+
+        def lint(path: str) -> Any:
+            return request(
+                stream,
+                {
+                    "kind": args.type,
+                    "path": path if cliutils.is_remote_url(path) else os.path.abspath(path),
+                    "options": options,
+                    "env": env,
+                },
+            )
+
+        if args.batch:
+            sys.exit(cliutils.lint_batch(cliutils.iter_batch_paths(args.batch), lint))
+
+        path = os.getcwd() if args.cwd else args.path
+
+        try:
+            results = lint(path)
+        except cliutils.RemoteLintError as err:
+            parser.exit(1, f"flatpak-builder-lint: {err}\n")
+
+    if args.type != "appstream":
+        exit_code = cliutils.print_results(results, args.type, args.gha_format)
+    else:
+        exit_code = cliutils.print_appstream_results(results)
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import textwrap
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from contextlib import nullcontext
+from typing import Any
+
+from . import __version__, config
+
+# Only the standard library may be imported here, the client imports
+# this module and has to start without loading the linter
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteLintError(Exception):
+    """An error reported by the lint daemon, already formatted"""
+
+
+def is_remote_url(path: str) -> bool:
+    return path.startswith(("http://", "https://"))
+
+
+def positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer value: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {number}")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    description = textwrap.dedent("""\
+        flatpak-builder-lint
+
+        A linter for Flatpak manifests and build artifacts primarily
+        developed for Flathub
+    """)
+    parser = argparse.ArgumentParser(
+        description=description,
+        formatter_class=argparse.RawTextHelpFormatter,
+        usage=argparse.SUPPRESS,
+        add_help=False,
+        epilog=f"Please report any issues at https://github.com/{config.LINTER_FULL_REPO}",
+    )
+    parser.add_argument(
+        "-h",
+        "--help",
+        action="help",
+        help="Show this help message and exit",
+    )
+    parser.add_argument(
+        "--version",
+        action="version",
+        help="Show the version number and exit",
+        version=f"flatpak-builder-lint {__version__}",
+    )
+    parser.add_argument(
+        "--exceptions",
+        help="Skip errors added to exceptions. Exceptions must be submitted to Flathub",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--exceptions-repo",
+        help=(
+            "Repo key for remote exception lookups from Flathub. "
+            "Omitting merges all repo keys; supplying a value merges '*' and that key."
+        ),
+        type=str,
+        metavar="",
+    )
+    parser.add_argument(
+        "--user-exceptions",
+        help="Path to a JSON file with exceptions",
+        type=str,
+        metavar="",
+    )
+    parser.add_argument(
+        "--appid", help="Override the app ID with this app ID", type=str, metavar="", nargs=1
+    )
+    parser.add_argument(
+        "--cwd",
+        help="Override the path parameter with the current working directory",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--ref",
+        help="Override the primary ref detection with this ref",
+        type=str,
+        action="append",
+        default=[],
+        metavar="",
+    )
+    parser.add_argument(
+        "type",
+        choices=["appstream", "manifest", "builddir", "repo", "bundle"],
+        nargs="?",
+        help=textwrap.dedent("""\
+            Type of artifact to lint
+
+              appstream expects a MetaInfo file
+              manifest  expects a flatpak-builder manifest
+              builddir  expects a flatpak-builder build directory
+              repo      expects an OSTree repo exported by flatpak-builder
+                        or the URL of a remote repo with --ref
+              bundle    expects a single-file Flatpak bundle\n\n"""),
+    )
+    parser.add_argument(
+        "path",
+        help="Path to the artifact",
+        type=str,
+        nargs="?",
+        metavar="PATH",
+    )
+    parser.add_argument(
+        "--batch",
+        help=(
+            "Path to a file with one artifact path per line or - for stdin. "
+            "Prints one JSON result per line"
+        ),
+        type=str,
+        metavar="",
+    )
+    parser.add_argument(
+        "--gha-format",
+        help="Use GitHub Actions annotations in CI",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--janitor-exceptions",
+        help="Enable reporting of stale exceptions to linter repository",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--jobs",
+        help="Number of checks to run in parallel",
+        type=positive_int,
+        default=1,
+        metavar="",
+    )
+    parser.add_argument(
+        "--result-cache",
+        help="Reuse the findings of an unchanged artifact from an earlier run",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--serve",
+        help="Run as a daemon serving lint requests on the socket",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--socket",
+        help="Path to the daemon socket. Defaults to flatpak-builder-lint.sock in $XDG_RUNTIME_DIR",
+        type=str,
+        default=config.SOCKET_PATH,
+        metavar="",
+    )
+    parser.add_argument(
+        "--debug",
+        help="Enable debug logging to console",
+        action="store_true",
+    )
+
+    return parser
+
+
+def parse_args(
+    parser: argparse.ArgumentParser, argv: list[str] | None = None
+) -> argparse.Namespace:
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        return args
+
+    if not args.type:
+        parser.error("the following arguments are required: type")
+    if args.batch and args.type == "appstream":
+        parser.error("--batch is not supported for appstream")
+    if args.batch and (args.appid or args.ref):
+        parser.error("--appid and --ref are not supported with --batch")
+    if not (args.batch or args.cwd or args.path):
+        parser.error("the following arguments are required: PATH")
+    if args.path and is_remote_url(args.path) and not (args.type == "repo" and args.ref):
+        parser.error("remote URLs are only supported for repo with --ref")
+
+    return args
+
+
+def print_gh_annotations(results: dict[str, str | list[str]], artifact_type: str) -> None:
+    if not results:
+        return
+
+    OMITTED_ANNOTATIONS = {
+        "appstream-failed-validation",
+        "desktop-file-failed-validation",
+    }
+
+    info: dict[str, str] = {
+        k.strip(): v.strip()
+        for entry in results.get("info", [])
+        if ": " in entry
+        for k, v in [entry.split(": ", 1)]
+        if k.strip() not in OMITTED_ANNOTATIONS
+    }
+
+    for msg in results.get("errors", []):
+        if msg in OMITTED_ANNOTATIONS:
+            continue
+
+        detail = f"Details: {info.get(msg)}" if msg in info else ""
+        print(f"::error::{msg!r} error found in linter {artifact_type} check. {detail}")  # noqa: T201
+
+    for line in results.get("appstream", []):
+        print(f"::error::Appstream: {line.strip()!r}")  # noqa: T201
+
+    for line in results.get("desktopfile", []):
+        print(f"::error::Desktop file: {line.strip()!r}")  # noqa: T201
+
+    for line in results.get("jsonschema", []):
+        print(f"::error::JSON schema: {line.strip()!r}")  # noqa: T201
+
+    for msg in results.get("warnings", []):
+        if msg in OMITTED_ANNOTATIONS:
+            continue
+
+        detail = f"Details: {info.get(msg)}" if msg in info else ""
+        print(f"::warning::{msg!r} warning found in linter {artifact_type} check. {detail}")  # noqa: T201
+
+    if help_msg := results.get("message"):
+        print(f"::notice::💡 {help_msg}")  # noqa: T201
+
+
+def print_results(
+    results: dict[str, str | list[str]], artifact_type: str, gha_format: bool = False
+) -> int:
+    if not results:
+        return 0
+
+    if os.environ.get("GITHUB_ACTIONS") == "true" and gha_format:
+        print_gh_annotations(results, artifact_type)
+    else:
+        print(json.dumps(results, indent=4))  # noqa: T201
+
+    return 1 if "errors" in results else 0
+
+
+def print_appstream_results(results: Mapping[str, Any]) -> int:
+    print(results["stdout"])  # noqa: T201
+    print(results["stderr"])  # noqa: T201
+    return int(results["returncode"])
+
+
+def iter_batch_paths(batch_file: str) -> Iterator[str]:
+    with nullcontext(sys.stdin) if batch_file == "-" else open(batch_file, encoding="utf-8") as f:
+        for line in f:
+            if path := line.strip():
+                yield path
+
+
+def lint_batch(paths: Iterable[str], lint: Callable[[str], dict[str, str | list[str]]]) -> int:
+    exit_code = 0
+
+    for path in paths:
+        line: dict[str, Any] = {"path": path}
+        try:
+            results = lint(path)
+        except RemoteLintError as err:
+            line["exception"] = str(err)
+            exit_code = 1
+        except Exception as err:
+            logger.debug("Failed to lint %s", path, exc_info=True)
+            line["exception"] = f"{type(err).__name__}: {err}"
+            exit_code = 1
+        else:
+            if "errors" in results:
+                exit_code = 1
+            line["results"] = results
+
+        print(json.dumps(line), flush=True)  # noqa: T201
+
+    return exit_code
@@ -62,6 +62,35 @@ FLATHUB_STABLE_GIT_REFS = ("refs/heads/master", "refs/heads/branch/")
 XDG_CACHE_HOME = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
 CACHEDIR = os.path.join(XDG_CACHE_HOME, "flatpak-builder-lint")
 
+EXCEPTIONS_INDEX = os.path.join(CACHEDIR, "exceptions.sqlite")
+REMOTE_EXCEPTIONS_INDEX = os.path.join(CACHEDIR, "exceptions-remote.sqlite")
+RESULT_CACHE_DIR = os.path.join(CACHEDIR, "results")
+# Validator outputs by file contents, least recently used are dropped
+VALIDATION_CACHE = os.path.join(CACHEDIR, "validation.sqlite")
+VALIDATION_CACHE_MAX_SIZE = 64 * 1024 * 1024
+# Objects pulled from remote repos, one archive repo per URL
+REMOTE_REPO_CACHE_DIR = os.path.join(CACHEDIR, "remote-repos")
+
+# Repo checkouts that cannot hardlink go to a tmpfs with this much space
+# left, so that extracted files never hit the disk
+TMPFS_SCRATCH_DIRS = (os.environ.get("XDG_RUNTIME_DIR", ""), "/dev/shm")  # noqa: S108
+TMPFS_SCRATCH_MIN_FREE = 1024 * 1024 * 1024
+
+SOCKET_PATH = os.path.join(os.environ.get("XDG_RUNTIME_DIR", CACHEDIR), "flatpak-builder-lint.sock")
+
+# Environment variables the checks read while linting. The client sends
+# these with every request so that the daemon lints in the caller's
+# environment instead of its own.
+DAEMON_FORWARDED_ENV = (
+    "REPO",
+    "REF",
+    "FLATPAK_BUILDER_LINT",
+    "FLAT_MANAGER_BUILD_ID",
+    "FLAT_MANAGER_URL",
+    "FLAT_MANAGER_TOKEN",
+    "GITHUB_TOKEN",
+)
+
 
 def is_flathub_build_pipeline() -> bool:
     return os.getenv("REPO", "").startswith(FLATHUB_GITHUB_ORG_URL)
@@ -87,6 +116,21 @@ def get_lint_flags() -> set[str]:
     return {f.strip() for f in os.getenv("FLATPAK_BUILDER_LINT", "").lower().split(",")}
 
 
-DEBUG = "debug" in get_lint_flags()
-SKIP_EOLRUNTIME_CHECKS = "skip-eol-runtime-checks" in get_lint_flags()
-SKIP_POLICY_ENFORCEMENT = "skip-policy-enforcement" in get_lint_flags()
+# Flags are read on every call, the daemon lints with the flags of
+# each client
+
+
+def is_debug() -> bool:
+    return "debug" in get_lint_flags()
+
+
+def skip_eolruntime_checks() -> bool:
+    return "skip-eol-runtime-checks" in get_lint_flags()
+
+
+def skip_policy_enforcement() -> bool:
+    return "skip-policy-enforcement" in get_lint_flags()
+
+
+def use_appstreamcli_validate() -> bool:
+    return "appstreamcli-validate" in get_lint_flags()
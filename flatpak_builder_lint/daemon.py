@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager, suppress
+from typing import Any
+
+from . import builddir, config, domainutils, gitutils, manifest, ostree
+
+logger = logging.getLogger(__name__)
+
+# Keyed by artifact path, the artifact may have changed between requests
+ARTIFACT_CACHES = (
+    manifest.show_manifest,
+    builddir.parse_metadata,
+    builddir.infer_appid,
+    builddir.infer_type,
+    builddir.get_runtime,
+    ostree.get_refs,
+    ostree.get_all_refs_filtered,
+    ostree.get_primary_refs,
+    ostree.infer_appid,
+    ostree.get_commit_metadata,
+    gitutils.is_git_directory,
+    gitutils.get_git_toplevel,
+    gitutils.get_github_repo_namespace,
+    gitutils.get_repo_tree_size,
+    # Free space of the tmpfs changes between requests
+    ostree.find_tmpfs,
+    # Exception updates have to show up immediately, the GitHub copy is
+    # revalidated with its ETag on every request
+    domainutils.get_remote_exceptions_flathub,
+    domainutils.get_remote_exceptions_github,
+)
+
+# Remote data, kept as long as the HTTP cache keeps responses
+NETWORK_CACHES = (
+    domainutils.fetch_summary_bytes,
+    domainutils.get_summary_obj,
+    domainutils.get_refs_from_summary,
+    domainutils.get_flatpak_ids_from_summary,
+    domainutils.get_appids_from_summary,
+    domainutils.get_all_flatpak_ids_on_flathub,
+    domainutils.get_all_apps_on_flathub,
+    domainutils.get_all_runtimes,
+    domainutils.get_eol_runtimes,
+    domainutils.check_url,
+    domainutils.is_app_on_flathub_api,
+    domainutils.is_app_on_flathub_summary,
+)
+NETWORK_CACHE_TTL = 3600
+
+
+@contextmanager
+def forwarded_environ(env: Mapping[str, str]) -> Iterator[None]:
+    saved = {name: os.environ.get(name) for name in config.DAEMON_FORWARDED_ENV}
+    try:
+        for name in config.DAEMON_FORWARDED_ENV:
+            if name in env:
+                os.environ[name] = env[name]
+            else:
+                os.environ.pop(name, None)
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+class LintRequestHandler(socketserver.StreamRequestHandler):
+    server: "LintServer"
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            reply: dict[str, Any]
+            try:
+                reply = {"results": self.server.lint_request(json.loads(line))}
+            except Exception as err:
+                logger.debug("Failed to serve request %r", line, exc_info=True)
+                reply = {"exception": f"{type(err).__name__}: {err}"}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+            self.wfile.flush()
+
+
+class LintServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, lint: Callable[[dict[str, Any]], Any]) -> None:
+        self.lint = lint
+        # Requests change the process environment and the shared caches,
+        # so they are linted one at a time. Each one can still use --jobs.
+        self.lint_lock = threading.Lock()
+        self.network_caches_cleared = time.monotonic()
+        super().__init__(socket_path, LintRequestHandler)
+
+    def reset_caches(self) -> None:
+        for func in ARTIFACT_CACHES:
+            func.cache_clear()
+        ostree.close_repos()
+
+        if time.monotonic() - self.network_caches_cleared >= NETWORK_CACHE_TTL:
+            logger.debug("Clearing network caches")
+            for network_func in NETWORK_CACHES:
+                network_func.cache_clear()
+            self.network_caches_cleared = time.monotonic()
+
+    def lint_request(self, request: dict[str, Any]) -> Any:
+        if not isinstance(request, dict) or not {"kind", "path"} <= request.keys():
+            raise ValueError("Request must be an object with kind and path")
+
+        with self.lint_lock, forwarded_environ(request.get("env", {})):
+            self.reset_caches()
+            logger.debug("Linting %s %s", request["kind"], request["path"])
+            return self.lint(request)
+
+
+def remove_stale_socket(socket_path: str) -> None:
+    if not os.path.exists(socket_path):
+        return
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            logger.debug("Removing stale socket %s", socket_path)
+            os.unlink(socket_path)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {socket_path}")
+
+
+def serve(socket_path: str, lint: Callable[[dict[str, Any]], Any]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+    remove_stale_socket(socket_path)
+
+    # Requests carry tokens in their environment, other users must not be
+    # able to connect, not even right after the socket is bound
+    umask = os.umask(0o077)
+    try:
+        server = LintServer(socket_path, lint)
+    finally:
+        os.umask(umask)
+
+    with server:
+        logger.debug("Serving lint requests on %s", socket_path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            with suppress(FileNotFoundError):
+                os.unlink(socket_path)
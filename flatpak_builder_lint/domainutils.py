@@ -11,7 +11,7 @@ from publicsuffixlist import PublicSuffixList  # type: ignore[import-untyped]
 from requests_cache import CachedSession
 from urllib3.util import connection as urllib3_connection
 
-from . import config, staticfiles
+from . import config, exceptions_index, staticfiles
 
 gi.require_version("OSTree", "1.0")
 from gi.repository import GLib, OSTree  # noqa: E402
@@ -299,14 +299,18 @@ def get_remote_exceptions_github(appid: str, exceptions_repo: str | None) -> set
         f"HEAD/flatpak_builder_lint/staticfiles/exceptions.json"
     )
     try:
-        # exception updates should be reflected immediately
-        r = requests.get(url, allow_redirects=False, timeout=REQUEST_TIMEOUT)
+        # exception updates should be reflected immediately, so the cached
+        # copy is always revalidated with its ETag
+        r = session.get(url, allow_redirects=False, timeout=REQUEST_TIMEOUT, refresh=True)
         logger.debug(
             "Request headers for %s: %s", url, filter_request_headers(dict(r.request.headers))
         )
         logger.debug("Response headers for %s: %s", url, dict(r.headers))
+        logger.debug("Response for %s from cache: %s", url, r.from_cache)
         if r.status_code == 200 and r.headers.get("Content-Type", "").startswith("text/plain"):
-            app_exceptions = r.json().get(appid, {})
+            # Parses the body only if it differs from the one already indexed
+            exceptions_index.sync_bytes(config.REMOTE_EXCEPTIONS_INDEX, r.content)
+            app_exceptions = exceptions_index.lookup(config.REMOTE_EXCEPTIONS_INDEX, appid)
             if exceptions_repo:
                 result = set(app_exceptions.get(exceptions_repo, {}).keys()) | set(
                     app_exceptions.get("*", {}).keys()
@@ -325,6 +329,8 @@ def get_remote_exceptions_github(appid: str, exceptions_repo: str | None) -> set
         logger.debug(
             "Request exception when fetching exceptions for %s: %s: %s", appid, type(e).__name__, e
         )
+    except ValueError as e:
+        logger.debug("Failed to parse exceptions from %s: %s", url, e)
 
     return set()
 
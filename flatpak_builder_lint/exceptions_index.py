@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+from collections.abc import Mapping
+from contextlib import closing
+from typing import Any
+
+# An sqlite index of exceptions.json so that looking up one app ID does
+# not need the whole file parsed. Only the standard library is used and
+# nothing is imported from the package, utils/ loads this file directly.
+
+SCHEMA_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS apps (
+    appid TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS exceptions (
+    appid TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    exception TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    PRIMARY KEY (appid, repo, exception)
+) WITHOUT ROWID;
+"""
+
+
+def _connect(index_path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+    # Autocommit, transactions are started explicitly
+    conn = sqlite3.connect(index_path, timeout=30, isolation_level=None)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _get_meta(conn: sqlite3.Connection, key: str) -> str | None:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def _app_digest(entry: Any) -> str:
+    return hashlib.sha256(json.dumps(entry, sort_keys=True).encode()).hexdigest()
+
+
+def _update(conn: sqlite3.Connection, data: Mapping[str, Any]) -> None:
+    if _get_meta(conn, "schema") != SCHEMA_VERSION:
+        conn.execute("DELETE FROM apps")
+        conn.execute("DELETE FROM exceptions")
+        _set_meta(conn, "schema", SCHEMA_VERSION)
+
+    stored = dict(conn.execute("SELECT appid, digest FROM apps").fetchall())
+    digests = {appid: _app_digest(entry) for appid, entry in data.items()}
+    changed = [appid for appid, digest in digests.items() if stored.get(appid) != digest]
+    removed = stored.keys() - digests.keys()
+
+    for appid in (*changed, *removed):
+        conn.execute("DELETE FROM exceptions WHERE appid = ?", (appid,))
+        conn.execute("DELETE FROM apps WHERE appid = ?", (appid,))
+
+    for appid in changed:
+        conn.execute("INSERT INTO apps (appid, digest) VALUES (?, ?)", (appid, digests[appid]))
+        conn.executemany(
+            "INSERT INTO exceptions (appid, repo, exception, reason) VALUES (?, ?, ?, ?)",
+            (
+                (appid, repo, exception, str(reason))
+                for repo, repo_exceptions in data[appid].items()
+                if isinstance(repo_exceptions, dict)
+                for exception, reason in repo_exceptions.items()
+            ),
+        )
+
+
+# Returns True if the JSON had to be parsed, only app IDs whose entries
+# changed are rewritten
+def sync_bytes(index_path: str, content: bytes) -> bool:
+    digest = hashlib.sha256(content).hexdigest()
+
+    with closing(_connect(index_path)) as conn:
+        if _get_meta(conn, "digest") == digest and _get_meta(conn, "schema") == SCHEMA_VERSION:
+            return False
+
+        data = json.loads(content)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _update(conn, data)
+            _set_meta(conn, "digest", digest)
+            conn.execute("DELETE FROM meta WHERE key = 'stat'")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    return True
+
+
+# Like sync_bytes but the file is not read at all if it was not modified
+def sync_file(index_path: str, json_path: str) -> bool:
+    st = os.stat(json_path)
+    stamp = f"{os.path.abspath(json_path)}:{st.st_size}:{st.st_mtime_ns}"
+
+    with closing(_connect(index_path)) as conn:
+        if _get_meta(conn, "stat") == stamp and _get_meta(conn, "schema") == SCHEMA_VERSION:
+            return False
+
+    with open(json_path, "rb") as f:
+        parsed = sync_bytes(index_path, f.read())
+
+    with closing(_connect(index_path)) as conn:
+        _set_meta(conn, "stat", stamp)
+
+    return parsed
+
+
+# Same shape as the app ID's entry in exceptions.json
+def lookup(index_path: str, appid: str) -> dict[str, dict[str, str]]:
+    result: dict[str, dict[str, str]] = {}
+
+    with closing(_connect(index_path)) as conn:
+        for repo, exception, reason in conn.execute(
+            "SELECT repo, exception, reason FROM exceptions WHERE appid = ?", (appid,)
+        ):
+            result.setdefault(repo, {})[exception] = reason
+
+    return result
@@ -3,13 +3,27 @@ import os
 
 import requests
 
-from . import config, domainutils
+from . import config, domainutils, prefixmatch
 
 logger = logging.getLogger(__name__)
 
 ISSUE_TITLE = "Stale exceptions"
 ISSUE_LABEL = "stale-exceptions"
 
+# Exceptions for checks that do not run on every artifact kind
+NEVER_STALE = prefixmatch.compile_prefixes(
+    frozenset(
+        {
+            "flathub-json-",
+            "module-",
+            "appid-unprefixed-bundled-extension-",
+            "external-gitmodule-url-found",
+            "manifest-",
+            "toplevel-",
+        }
+    )
+)
+
 
 def get_stale_exceptions(active_errors: set[str], exceptions: set[str]) -> set[str]:
     stale: set[str] = set()
@@ -18,16 +32,7 @@ def get_stale_exceptions(active_errors: set[str], exceptions: set[str]) -> set[s
         if exception == "*":
             continue
 
-        if exception.startswith(
-            (
-                "flathub-json-",
-                "module-",
-                "appid-unprefixed-bundled-extension-",
-                "external-gitmodule-url-found",
-                "manifest-",
-                "toplevel-",
-            )
-        ):
+        if NEVER_STALE.match(exception):
             continue
 
         if exception not in active_errors:
@@ -1,17 +1,36 @@
+import errno
+import fnmatch
+import hashlib
+import io
 import json
 import logging
 import os
+import shutil
+import stat
+import struct
+import tempfile
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from functools import cache
+from types import MappingProxyType
+from typing import Any
 
 import gi
 
-from . import config
+from . import builddir, config
 
 gi.require_version("OSTree", "1.0")
 from gi.repository import Gio, GLib, OSTree  # noqa: E402
 
 logger = logging.getLogger(__name__)
 
+# Opened repos by real path and thread. Checks run refs on separate
+# threads, each of them gets its own handle and keeps reusing it.
+_repos: dict[tuple[str, int], OSTree.Repo] = {}
+_revs: dict[tuple[str, str], str | None] = {}
+_repos_lock = threading.Lock()
+
 
 def open_ostree_repo(repo_path: str) -> OSTree.Repo:
     if not os.path.exists(repo_path):
@@ -27,15 +46,61 @@ def open_ostree_repo(repo_path: str) -> OSTree.Repo:
     return repo
 
 
+def get_repo(repo_path: str) -> OSTree.Repo:
+    key = (os.path.realpath(repo_path), threading.get_ident())
+
+    with _repos_lock:
+        if repo := _repos.get(key):
+            return repo
+
+    repo = open_ostree_repo(repo_path)
+    with _repos_lock:
+        return _repos.setdefault(key, repo)
+
+
+def resolve_rev(repo_path: str, ref: str) -> str | None:
+    key = (os.path.realpath(repo_path), ref)
+
+    with _repos_lock:
+        if key in _revs:
+            return _revs[key]
+
+    _, rev = get_repo(repo_path).resolve_rev(ref, True)
+    with _repos_lock:
+        return _revs.setdefault(key, rev)
+
+
+def close_repo(repo_path: str) -> None:
+    path = os.path.realpath(repo_path)
+
+    with _repos_lock:
+        for repo_key in [k for k in _repos if k[0] == path]:
+            del _repos[repo_key]
+        for rev_key in [k for k in _revs if k[0] == path]:
+            del _revs[rev_key]
+
+
+def close_repos() -> None:
+    with _repos_lock:
+        _repos.clear()
+        _revs.clear()
+
+
 @cache
 def get_refs(repo_path: str, ref_prefix: str | None) -> set[str]:
-    repo = open_ostree_repo(repo_path)
+    repo = get_repo(repo_path)
     _, refs = repo.list_refs(ref_prefix, None)
 
     logger.debug("Found refs %s in repo %s", set(refs.keys()), os.path.abspath(repo_path))
     return set(refs.keys())
 
 
+def get_ref_checksums(repo_path: str) -> dict[str, str]:
+    repo = get_repo(repo_path)
+    _, refs = repo.list_refs(None, None)
+    return dict(refs)
+
+
 @cache
 def get_all_refs_filtered(repo_path: str) -> set[str]:
     refs = get_refs(repo_path, None)
@@ -77,6 +142,63 @@ def infer_appid(path: str) -> str | None:
     return None
 
 
+def get_repo_mode(repo_path: str) -> OSTree.RepoMode:
+    return get_repo(repo_path).get_mode()
+
+
+def _filesystem_type(path: str) -> str | None:
+    path = os.path.realpath(path)
+    best, fstype = "", None
+
+    with open("/proc/self/mounts", encoding="utf-8") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 3:
+                continue
+            # Spaces and other special characters are octal escaped
+            mount_point = fields[1].encode().decode("unicode_escape")
+            prefix = mount_point.rstrip("/") + "/"
+            if (path == mount_point or path.startswith(prefix)) and len(mount_point) > len(best):
+                best, fstype = mount_point, fields[2]
+
+    return fstype
+
+
+@cache
+def find_tmpfs() -> str | None:
+    for path in config.TMPFS_SCRATCH_DIRS:
+        if not (path and os.path.isdir(path) and os.access(path, os.W_OK)):
+            continue
+        try:
+            if _filesystem_type(path) != "tmpfs":
+                continue
+            st = os.statvfs(path)
+        except OSError:
+            continue
+        if st.f_bavail * st.f_frsize >= config.TMPFS_SCRATCH_MIN_FREE:
+            return path
+
+    return None
+
+
+def get_scratch_dir(repo_path: str) -> str:
+    if get_repo_mode(repo_path) in (OSTree.RepoMode.BARE_USER, OSTree.RepoMode.BARE_USER_ONLY):
+        # Checkouts hardlink the objects, which only works on the repo's
+        # own filesystem. OSTree keeps its staging directories there too.
+        repo_tmp = os.path.join(repo_path, "tmp")
+        if os.path.isdir(repo_tmp) and os.access(repo_tmp, os.W_OK):
+            return repo_tmp
+
+    return get_tmpfs_or_tempdir()
+
+
+def get_tmpfs_or_tempdir() -> str:
+    if "TMPDIR" not in os.environ and (tmpfs := find_tmpfs()):
+        return tmpfs
+
+    return tempfile.gettempdir()
+
+
 def extract_subpath(
     repo_path: str,
     ref: str,
@@ -84,14 +206,19 @@ def extract_subpath(
     dest: str,
     should_pass: bool = False,
 ) -> None:
-    repo = open_ostree_repo(repo_path)
+    repo = get_repo(repo_path)
     opts = OSTree.RepoCheckoutAtOptions()
     # https://gitlab.gnome.org/GNOME/pygobject/-/issues/639
     opts.mode = int(OSTree.RepoCheckoutMode.USER)  # type: ignore
     opts.overwrite_mode = int(OSTree.RepoCheckoutOverwriteMode.ADD_FILES)  # type: ignore
     opts.subpath = subpath
+    # Files are hardlinked from bare-user repos, and reflinked from bare
+    # repos where the filesystem supports it. OSTree copies them when
+    # neither works, archive repos are always copied.
+    if repo.get_mode() == OSTree.RepoMode.BARE and hasattr(opts, "force_copy_zerocopy"):
+        opts.force_copy_zerocopy = True
 
-    _, rev = repo.resolve_rev(ref, True)
+    rev = resolve_rev(repo_path, ref)
 
     # https://sourceware.org/git/?p=glibc.git;a=blob;f=io/fcntl.h;h=f157991782681caabe9bd7edb46ec205731965af;hb=HEAD#l149
     AT_FDCWD = -100
@@ -116,14 +243,485 @@ def extract_subpath(
             repo.checkout_at(opts, AT_FDCWD, dest, rev, None)
 
 
-def get_flathub_json(repo_path: str, ref: str, dest: str) -> dict[str, str | bool | list[str]]:
-    flathubjsonfile = config.FLATHUB_JSON_FILE
-    extract_subpath(repo_path, ref, f"/files/{flathubjsonfile}", dest, True)
-    flathub_json_path = os.path.join(dest, flathubjsonfile)
+class CheckoutWorkspace:
+    # Subpaths of refs that repo checks need on disk. Each of them is
+    # checked out once per lint run, every check reads the same copy.
+
+    def __init__(self, repo_path: str) -> None:
+        self.repo_path = repo_path
+        self._root: str | None = None
+        self._lock = threading.Lock()
+        self._subpath_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._checked_out: set[tuple[str, str]] = set()
+
+    def __enter__(self) -> "CheckoutWorkspace":
+        return self
+
+    def __exit__(self, *_args: object) -> None:
+        self.close()
+
+    def _ref_dir(self, ref: str) -> str:
+        with self._lock:
+            if self._root is None:
+                self._root = tempfile.mkdtemp(
+                    prefix="flatpak-builder-lint-", dir=get_scratch_dir(self.repo_path)
+                )
+            return os.path.join(self._root, *ref.split("/"))
+
+    def checkout(self, ref: str, subpaths: Iterable[str]) -> str:
+        ref_dir = self._ref_dir(ref)
+
+        for subpath in subpaths:
+            key = (ref, subpath)
+            with self._lock:
+                subpath_lock = self._subpath_locks.setdefault(key, threading.Lock())
+
+            with subpath_lock:
+                if key in self._checked_out:
+                    continue
+                dest = os.path.join(ref_dir, subpath)
+                # Missing subpaths are left as empty directories
+                os.makedirs(dest, exist_ok=True)
+                extract_subpath(self.repo_path, ref, subpath, dest, True)
+                self._checked_out.add(key)
+
+        return ref_dir
+
+    def close(self) -> None:
+        with self._lock:
+            if self._root is not None:
+                shutil.rmtree(self._root, ignore_errors=True)
+            self._root = None
+            self._subpath_locks.clear()
+            self._checked_out.clear()
+
+
+def _create_repo(repo_path: str) -> OSTree.Repo:
+    repo = OSTree.Repo.new(Gio.File.new_for_path(repo_path))
+    # Opens the repo when it already exists
+    repo.create(OSTree.RepoMode.ARCHIVE, None)
+    return repo
+
+
+def get_remote_cache_path(url: str) -> str:
+    return os.path.join(config.REMOTE_REPO_CACHE_DIR, hashlib.sha256(url.encode()).hexdigest()[:16])
+
+
+def pull_remote_refs(
+    url: str, refs: Iterable[str], subpaths: Iterable[str]
+) -> dict[str, tuple[str, bool]]:
+    # Only the commits and their subpaths are fetched. Objects are kept
+    # in a repo per URL so they are never fetched twice. Screenshots
+    # refs only hold screenshots and are fetched whole when asked for.
+    cache_path = get_remote_cache_path(url)
+    os.makedirs(cache_path, exist_ok=True)
+    repo = _create_repo(cache_path)
+
+    sorted_refs = sorted(refs)
+    pulls = (
+        ([r for r in sorted_refs if not r.startswith("screenshots/")], sorted(subpaths)),
+        ([r for r in sorted_refs if r.startswith("screenshots/")], None),
+    )
+    for pull_refs, subdirs in pulls:
+        if not pull_refs:
+            continue
+        options = {
+            "refs": GLib.Variant("as", pull_refs),
+            "disable-static-deltas": GLib.Variant("b", True),
+            "gpg-verify": GLib.Variant("b", False),
+            "gpg-verify-summary": GLib.Variant("b", False),
+        }
+        if subdirs is not None:
+            options["subdirs"] = GLib.Variant("as", [f"/{s}" for s in subdirs])
+        logger.debug("Pulling %s from %s into %s", pull_refs, url, cache_path)
+        repo.pull_with_options(url, GLib.Variant("a{sv}", options), None, None)
+
+    revs = {}
+    for ref in sorted_refs:
+        rev = repo.resolve_rev(ref, False)[1]
+        _, _, state = repo.load_commit(rev)
+        revs[ref] = (rev, bool(state & OSTree.RepoCommitState.PARTIAL))
+    return revs
+
+
+@contextmanager
+def remote_repo(url: str, refs: Iterable[str], subpaths: Iterable[str]) -> Iterator[str]:
+    # A throwaway repo with only the requested refs, their objects are
+    # read from the cache repo set as its parent
+    revs = pull_remote_refs(url, refs, subpaths)
+
+    with tempfile.TemporaryDirectory(prefix="flatpak-builder-lint-remote-") as tmpdir:
+        repo = _create_repo(tmpdir)
+        repo_config = repo.copy_config()
+        repo_config.set_string("core", "parent", get_remote_cache_path(url))
+        repo.write_config(repo_config)
+
+        repo = open_ostree_repo(tmpdir)
+        for ref, (rev, partial) in revs.items():
+            repo.set_ref_immediate(None, ref, rev, None)
+            # The state is only read from the repo itself, not its parent
+            if partial:
+                repo.mark_commit_partial(rev, True)
+
+        try:
+            yield tmpdir
+        finally:
+            close_repo(tmpdir)
+
+
+# A flatpak bundle is a static delta superblock with the parts inline
+BUNDLE_FORMAT = "(a{sv}tayay(a{sv}aya(say)sstayay)aya(uayttay)a(yaytt))"
+
+
+def read_bundle_ref(bundle_path: str) -> tuple[str, str]:
+    # The file is mapped, only the header is read from it
+    data = GLib.MappedFile.new(bundle_path, False).get_bytes()
+    superblock = GLib.Variant.new_from_bytes(GLib.VariantType.new(BUNDLE_FORMAT), data, False)
+
+    metadata = GLib.VariantDict.new(superblock.get_child_value(0))
+    ref = metadata.lookup_value("ref", GLib.VariantType.new("s"))
+    if ref is None:
+        raise ValueError(f"No ref in bundle: {bundle_path}")
+
+    return ref.get_string(), OSTree.checksum_from_bytes_v(superblock.get_child_value(3))
+
+
+@contextmanager
+def bundle_repo(bundle_path: str) -> Iterator[str]:
+    # The parts of a static delta can only be applied as a whole. They
+    # are applied to a throwaway bare-user-only repo that checkouts can
+    # hardlink from, on a tmpfs when there is one.
+    ref, rev = read_bundle_ref(bundle_path)
+
+    with tempfile.TemporaryDirectory(
+        prefix="flatpak-builder-lint-bundle-", dir=get_tmpfs_or_tempdir()
+    ) as tmpdir:
+        repo = OSTree.Repo.new(Gio.File.new_for_path(tmpdir))
+        repo.create(OSTree.RepoMode.BARE_USER_ONLY, None)
+
+        repo.prepare_transaction(None)
+        try:
+            repo.static_delta_execute_offline(Gio.File.new_for_path(bundle_path), False, None)
+            repo.transaction_set_ref(None, ref, rev)
+            repo.commit_transaction(None)
+        except BaseException:
+            repo.abort_transaction(None)
+            raise
+
+        try:
+            yield tmpdir
+        finally:
+            close_repo(tmpdir)
+
+
+def get_flathub_json(repo_path: str, ref: str) -> dict[str, str | bool | list[str]]:
+    tree = get_commit_tree(repo_path, ref)
     flathub_json: dict[str, str | bool | list[str]] = {}
 
-    if os.path.exists(flathub_json_path):
-        with open(flathub_json_path) as fp:
+    if tree.isfile(f"files/{config.FLATHUB_JSON_FILE}"):
+        with tree.open(f"files/{config.FLATHUB_JSON_FILE}") as fp:
             flathub_json = json.load(fp)
 
     return flathub_json
+
+
+# Keyed by commit checksum, a commit never changes
+@cache
+def get_commit_metadata(
+    repo_path: str, rev: str
+) -> MappingProxyType[str, str | dict[str, set[str]]]:
+    _, commit, _ = get_repo(repo_path).load_commit(rev)
+    commit_metadata = GLib.VariantDict.new(commit.get_child_value(0))
+
+    # Flatpak keeps a copy of the metadata file in the commit metadata
+    if xa_metadata := commit_metadata.lookup_value("xa.metadata", GLib.VariantType.new("s")):
+        return builddir.parse_metadata_bytes(xa_metadata.get_string().encode())
+
+    logger.debug("No xa.metadata in commit %s, reading the metadata file", rev)
+    with _read_commit_tree(repo_path, rev).open("metadata") as f:
+        return builddir.parse_metadata_bytes(f.read())
+
+
+def get_ref_metadata(repo_path: str, ref: str) -> MappingProxyType[str, str | dict[str, set[str]]]:
+    rev = resolve_rev(repo_path, ref)
+    if rev is None:
+        raise FileNotFoundError(errno.ENOENT, "No such ref", ref)
+
+    return get_commit_metadata(repo_path, rev)
+
+
+def get_ref_download_sizes(repo_path: str) -> dict[str, int]:
+    sizes = {}
+
+    for ref, rev in get_ref_checksums(repo_path).items():
+        _, commit, _ = get_repo(repo_path).load_commit(rev)
+        commit_metadata = GLib.VariantDict.new(commit.get_child_value(0))
+        # Added by flatpak build-export, stored big endian
+        if size := commit_metadata.lookup_value("xa.download-size", GLib.VariantType.new("t")):
+            sizes[ref] = int.from_bytes(struct.pack("=Q", size.get_uint64()), "big")
+
+    return sizes
+
+
+class _InputStreamIO(io.RawIOBase):
+    def __init__(self, stream: Gio.InputStream) -> None:
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        data = self._stream.read_bytes(len(buffer), None).get_data() or b""
+        memoryview(buffer).cast("B")[: len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stream.close(None)
+        super().close()
+
+
+def _read_head(file: Gio.File, size: int) -> bytes:
+    stream = file.read(None)
+    try:
+        head = b""
+        while len(head) < size:
+            chunk = stream.read_bytes(size - len(head), None).get_data()
+            if not chunk:
+                break
+            head += chunk
+        return head
+    finally:
+        stream.close(None)
+
+
+class CommitTree:
+    # Read-only access to the files of a commit without checking them
+    # out. Paths are relative to the root of the commit, symlinks are
+    # followed as long as they stay inside it.
+
+    MAX_SYMLINKS = 40
+    QUERY_ATTRIBUTES = (
+        "standard::type,standard::size,standard::symlink-target,unix::mode,unix::uid,unix::gid"
+    )
+
+    def __init__(self, root: Gio.File) -> None:
+        self.root = root
+
+    def _query(self, file: Gio.File, path: str) -> Gio.FileInfo:
+        try:
+            return file.query_info(
+                self.QUERY_ATTRIBUTES, Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS, None
+            )
+        except GLib.Error as err:
+            if err.matches(Gio.io_error_quark(), Gio.IOErrorEnum.NOT_FOUND):
+                raise FileNotFoundError(errno.ENOENT, "No such file in commit", path) from None
+            raise
+
+    def _resolve(self, parts: list[str]) -> Gio.File:
+        return self.root.resolve_relative_path("/".join(parts)) if parts else self.root
+
+    def _lookup(self, path: str, follow_symlinks: bool = True) -> tuple[Gio.File, Gio.FileInfo]:
+        pending = [p for p in path.split("/") if p not in ("", ".")]
+        resolved: list[str] = []
+        file, info = self.root, self._query(self.root, path)
+        symlinks = 0
+
+        while pending:
+            name = pending.pop(0)
+            if name == "..":
+                resolved = resolved[:-1]
+                file = self._resolve(resolved)
+                info = self._query(file, path)
+                continue
+
+            if info.get_file_type() != Gio.FileType.DIRECTORY:
+                raise NotADirectoryError(errno.ENOTDIR, "Not a directory in commit", path)
+
+            file = self._resolve([*resolved, name])
+            info = self._query(file, path)
+
+            if info.get_file_type() == Gio.FileType.SYMBOLIC_LINK and (pending or follow_symlinks):
+                symlinks += 1
+                target = info.get_symlink_target() or ""
+                if symlinks > self.MAX_SYMLINKS or target.startswith("/"):
+                    # Absolute targets point outside of the commit
+                    raise FileNotFoundError(errno.ENOENT, "Unresolvable symlink in commit", path)
+                pending[:0] = [p for p in target.split("/") if p not in ("", ".")]
+                file = self._resolve(resolved)
+                info = self._query(file, path)
+                continue
+
+            resolved.append(name)
+
+        return file, info
+
+    def stat(self, path: str, follow_symlinks: bool = True) -> os.stat_result:
+        _, info = self._lookup(path, follow_symlinks)
+        file_type = {
+            Gio.FileType.DIRECTORY: stat.S_IFDIR,
+            Gio.FileType.SYMBOLIC_LINK: stat.S_IFLNK,
+        }.get(info.get_file_type(), stat.S_IFREG)
+
+        return os.stat_result(
+            (
+                file_type | stat.S_IMODE(info.get_attribute_uint32("unix::mode")),
+                0,
+                0,
+                1,
+                info.get_attribute_uint32("unix::uid"),
+                info.get_attribute_uint32("unix::gid"),
+                info.get_size(),
+                0,
+                0,
+                0,
+            )
+        )
+
+    def checksum(self, path: str) -> str:
+        # The dirtree and dirmeta checksums of a directory, equal
+        # checksums mean equal content
+        file, info = self._lookup(path)
+        if info.get_file_type() != Gio.FileType.DIRECTORY:
+            return str(file.get_checksum())
+
+        file.ensure_resolved()
+        return f"{file.tree_get_contents_checksum()}:{file.tree_get_metadata_checksum()}"
+
+    def exists(self, path: str) -> bool:
+        try:
+            self._lookup(path)
+        except OSError:
+            return False
+        return True
+
+    def isdir(self, path: str) -> bool:
+        try:
+            _, info = self._lookup(path)
+        except OSError:
+            return False
+        return bool(info.get_file_type() == Gio.FileType.DIRECTORY)
+
+    def isfile(self, path: str) -> bool:
+        try:
+            _, info = self._lookup(path)
+        except OSError:
+            return False
+        return bool(info.get_file_type() == Gio.FileType.REGULAR)
+
+    def listdir(self, path: str = "") -> list[str]:
+        file, info = self._lookup(path)
+        if info.get_file_type() != Gio.FileType.DIRECTORY:
+            raise NotADirectoryError(errno.ENOTDIR, "Not a directory in commit", path)
+
+        enumerator = file.enumerate_children(
+            "standard::name", Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS, None
+        )
+        names = []
+        while child := enumerator.next_file(None):
+            names.append(child.get_name())
+        enumerator.close(None)
+
+        return sorted(names)
+
+    def open(self, path: str) -> io.BufferedReader:
+        file, info = self._lookup(path)
+        if info.get_file_type() == Gio.FileType.DIRECTORY:
+            raise IsADirectoryError(errno.EISDIR, "Is a directory in commit", path)
+
+        return io.BufferedReader(_InputStreamIO(file.read(None)))
+
+    def read_heads(self, top: str, size: int) -> Iterator[tuple[str, bytes]]:
+        # The first size bytes of every regular file below top, symlinks
+        # are not followed. Children are looked up from their parent so
+        # every dirtree is loaded once and file objects are only read up
+        # to size.
+        try:
+            directory, info = self._lookup(top)
+        except OSError:
+            return
+        if info.get_file_type() != Gio.FileType.DIRECTORY:
+            return
+
+        pending = [(top, directory)]
+        while pending:
+            path, directory = pending.pop()
+            enumerator = directory.enumerate_children(
+                "standard::name,standard::type", Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS, None
+            )
+            children = []
+            while child_info := enumerator.next_file(None):
+                children.append((child_info.get_name(), child_info.get_file_type()))
+            enumerator.close(None)
+
+            subdirs = []
+            for name, file_type in sorted(children):
+                child_path = f"{path}/{name}" if path else name
+                child = directory.get_child(name)
+                if file_type == Gio.FileType.DIRECTORY:
+                    subdirs.append((child_path, child))
+                elif file_type == Gio.FileType.REGULAR:
+                    yield child_path, _read_head(child, size)
+            pending.extend(reversed(subdirs))
+
+    def walk(self, top: str = "") -> Iterator[tuple[str, list[str], list[str]]]:
+        # Like os.walk, symlinks to directories are not descended into
+        dirs, files = [], []
+        for name in self.listdir(top):
+            child = f"{top}/{name}" if top else name
+            if stat.S_ISDIR(self.stat(child, follow_symlinks=False).st_mode):
+                dirs.append(name)
+            else:
+                files.append(name)
+
+        yield top, dirs, files
+        for name in dirs:
+            yield from self.walk(f"{top}/{name}" if top else name)
+
+    def glob(self, pattern: str) -> list[str]:
+        # Like glob.glob without recursive patterns, hidden names only
+        # match components that start with a dot
+        matches = [""]
+
+        for part in (p for p in pattern.split("/") if p):
+            found = []
+            for parent in matches:
+                if not any(c in part for c in "*?["):
+                    candidate = f"{parent}/{part}" if parent else part
+                    if self.exists(candidate):
+                        found.append(candidate)
+                    continue
+
+                if not self.isdir(parent):
+                    continue
+                names = self.listdir(parent)
+                if not part.startswith("."):
+                    names = [n for n in names if not n.startswith(".")]
+                found.extend(
+                    f"{parent}/{name}" if parent else name for name in fnmatch.filter(names, part)
+                )
+            matches = found
+
+        return sorted(m for m in matches if m)
+
+
+def is_partial_commit(repo_path: str, ref: str) -> bool:
+    # Commits pulled for a remote lint only have the paths checks read
+    rev = resolve_rev(repo_path, ref)
+    if rev is None:
+        return False
+    _, _, state = get_repo(repo_path).load_commit(rev)
+    return bool(state & OSTree.RepoCommitState.PARTIAL)
+
+
+def _read_commit_tree(repo_path: str, rev: str) -> CommitTree:
+    _, root, _ = get_repo(repo_path).read_commit(rev, None)
+    return CommitTree(root)
+
+
+def get_commit_tree(repo_path: str, ref: str) -> CommitTree:
+    rev = resolve_rev(repo_path, ref)
+    if rev is None:
+        raise FileNotFoundError(errno.ENOENT, "No such ref", ref)
+
+    return _read_commit_tree(repo_path, rev)
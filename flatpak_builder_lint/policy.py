@@ -18,7 +18,7 @@ class TimedSeverityPolicy:
     extra_info_msg: str | None = None
 
     def is_enforced(self, today: date | None = None) -> bool:
-        if config.SKIP_POLICY_ENFORCEMENT:
+        if config.skip_policy_enforcement():
             return False
 
         if today is None:
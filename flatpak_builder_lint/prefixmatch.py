@@ -0,0 +1,38 @@
+import re
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import Any
+
+# Matches a string against many prefixes at once. The prefixes are merged
+# into a trie shaped regex so each character is only compared once no
+# matter how many prefixes share it.
+
+
+def _build_trie(prefixes: Iterable[str]) -> dict[str, Any]:
+    trie: dict[str, Any] = {}
+    for prefix in prefixes:
+        node = trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+        # An empty key marks the end of a prefix
+        node[""] = {}
+    return trie
+
+
+def _trie_pattern(node: dict[str, Any]) -> str:
+    # Anything below the end of a prefix is already matched by it
+    if "" in node:
+        return ""
+
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items())]
+    if len(branches) == 1:
+        return branches[0]
+    return f"(?:{'|'.join(branches)})"
+
+
+# Keyed by the exceptions of each linted app, bounded for the daemon
+@lru_cache(maxsize=64)
+def compile_prefixes(prefixes: frozenset[str]) -> re.Pattern[str]:
+    if not prefixes:
+        return re.compile(r"(?!)")
+    return re.compile(_trie_pattern(_build_trie(prefixes)))
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Iterable
+from functools import cache
+from typing import Any
+
+from . import __version__, checks, config, gitutils, manifest, ostree, policy
+
+logger = logging.getLogger(__name__)
+
+# Findings of checks that only look at the artifact are stored under a
+# digest of everything they read. Checks with revalidate set are run
+# again on every lint and never stored.
+
+FINDINGS = ("errors", "warnings", "jsonschema", "appstream", "desktopfile", "info")
+
+# Changes what the checks report, tokens are left out so that they can
+# be rotated without dropping the cache
+KEY_ENV = ("REPO", "REF", "FLATPAK_BUILDER_LINT", "FLAT_MANAGER_BUILD_ID")
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _update_file(h: "hashlib._Hash", path: str) -> None:
+    h.update(path.encode() + b"\0")
+    try:
+        if os.path.islink(path):
+            h.update(b"l" + os.readlink(path).encode())
+        elif os.path.isfile(path):
+            h.update(b"f")
+            with open(path, "rb") as f:
+                while chunk := f.read(CHUNK_SIZE):
+                    h.update(chunk)
+        else:
+            h.update(b"-")
+    except OSError:
+        h.update(b"!")
+    h.update(b"\0")
+
+
+def _update_tree(h: "hashlib._Hash", top: str) -> None:
+    for root, dirs, files in os.walk(top):
+        dirs.sort()
+        for name in sorted(files + [d for d in dirs if os.path.islink(os.path.join(root, d))]):
+            path = os.path.join(root, name)
+            h.update(oct(os.lstat(path).st_mode).encode())
+            _update_file(h, path)
+
+
+@cache
+def linter_digest() -> str:
+    # The version alone misses changes to an unreleased checkout
+    h = hashlib.sha256(__version__.encode())
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for root, dirs, files in os.walk(package_dir):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            h.update(os.path.relpath(path, package_dir).encode() + b"\0")
+            _update_file(h, path)
+    return h.hexdigest()
+
+
+def manifest_inputs(path: str) -> list[str]:
+    manifest_dir = os.path.dirname(os.path.abspath(path))
+    git_toplevel = gitutils.get_git_toplevel(manifest_dir)
+
+    return [
+        os.path.abspath(path),
+        *sorted(manifest.collect_sub_manifests(path) or ()),
+        os.path.join(manifest_dir, config.FLATHUB_JSON_FILE),
+        os.path.join(git_toplevel or manifest_dir, ".gitmodules"),
+    ]
+
+
+def input_digest(kind: str, path: str) -> str:
+    h = hashlib.sha256(f"{kind}\0{os.path.abspath(path)}\0".encode())
+
+    match kind:
+        case "manifest":
+            for file in manifest_inputs(path):
+                _update_file(h, file)
+        case "builddir":
+            _update_file(h, os.path.join(path, "metadata"))
+            _update_tree(h, os.path.join(path, "files"))
+        case "repo":
+            for ref, checksum in sorted(ostree.get_ref_checksums(path).items()):
+                h.update(f"{ref}\0{checksum}\0".encode())
+        case _:
+            raise ValueError(f"Unknown kind: {kind}")
+
+    return h.hexdigest()
+
+
+def policy_dates() -> list[str]:
+    return sorted(
+        f"{p.code}:{p.promotion_date.isoformat()}"
+        for p in vars(policy).values()
+        if isinstance(p, policy.TimedSeverityPolicy)
+    )
+
+
+def _run_key(context: checks.LintContext) -> dict[str, Any]:
+    return {
+        "linter": linter_digest(),
+        "policies": policy_dates(),
+        "env": {name: os.environ.get(name, "") for name in KEY_ENV},
+        "exceptions": sorted(context.exceptions),
+    }
+
+
+def cache_key(kind: str, path: str, context: checks.LintContext) -> str:
+    key = {
+        "input": input_digest(kind, path),
+        "refs": sorted(context.repo_primary_refs),
+        **_run_key(context),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def shared_findings(context: checks.LintContext) -> checks.SharedFindings:
+    # Findings shared between refs are keyed by the checksums of what
+    # was checked, so they are reused by later runs of any artifact
+    # with the same content
+    run_key = json.dumps(_run_key(context), sort_keys=True)
+
+    def entry_key(key: str) -> str:
+        return hashlib.sha256(f"{run_key}\0{key}".encode()).hexdigest()
+
+    return checks.SharedFindings(
+        load=lambda key: load(entry_key(key)),
+        store=lambda key, findings: store(entry_key(key), (findings,)),
+    )
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(config.RESULT_CACHE_DIR, key[:2], f"{key}.json")
+
+
+def load(key: str) -> checks.LintContext | None:
+    try:
+        with open(_entry_path(key), encoding="utf-8") as f:
+            stored = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as err:
+        logger.debug("Ignoring unreadable result cache entry %s: %s", key, err)
+        return None
+
+    context = checks.LintContext()
+    for name in FINDINGS:
+        getattr(context, name).update(stored.get(name, ()))
+    return context
+
+
+def store(key: str, contexts: Iterable[checks.LintContext]) -> None:
+    merged = checks.LintContext()
+    for context in contexts:
+        merged.merge(context)
+
+    path = _entry_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=os.path.dirname(path), delete=False
+        ) as f:
+            json.dump({name: sorted(getattr(merged, name)) for name in FINDINGS}, f)
+        os.replace(f.name, path)
+    except OSError as err:
+        logger.debug("Failed to store result cache entry %s: %s", key, err)
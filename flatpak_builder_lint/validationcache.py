@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import time
+from collections.abc import Callable, Sequence
+from contextlib import closing
+from functools import cache
+from typing import Any, TypeVar
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Validator output keyed by the file contents, so that an unchanged
+# MetaInfo or desktop file is validated once no matter how many times
+# it is linted. Entries are evicted least recently used first once the
+# stored outputs exceed config.VALIDATION_CACHE_MAX_SIZE.
+
+SCHEMA_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+T = TypeVar("T")
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(config.VALIDATION_CACHE)), exist_ok=True)
+    conn = sqlite3.connect(config.VALIDATION_CACHE, timeout=30, isolation_level=None)
+    conn.executescript(SCHEMA)
+    row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    if not row or row[0] != SCHEMA_VERSION:
+        conn.execute("DELETE FROM entries")
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema', ?)", (SCHEMA_VERSION,)
+        )
+    return conn
+
+
+def _count(conn: sqlite3.Connection, name: str, n: int = 1) -> None:
+    conn.execute(
+        "INSERT INTO stats (name, count) VALUES (?, ?) "
+        "ON CONFLICT (name) DO UPDATE SET count = count + excluded.count",
+        (name, n),
+    )
+
+
+def _evict(conn: sqlite3.Connection, max_size: int) -> None:
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total <= max_size:
+        return
+
+    evicted = []
+    for key, size in conn.execute("SELECT key, size FROM entries ORDER BY used"):
+        if total <= max_size:
+            break
+        evicted.append((key,))
+        total -= size
+    conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+    _count(conn, "evictions", len(evicted))
+
+
+@cache
+def _version_output(path: str, _size: int, _mtime_ns: int) -> str:
+    try:
+        cmd = subprocess.run([path, "--version"], capture_output=True, check=False, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return cmd.stdout.decode("utf-8", "replace").strip() if cmd.returncode == 0 else ""
+
+
+# Identifies the installed binary, its version output is only read
+# again once the binary changes
+def tool_version(name: str) -> str:
+    path = shutil.which(name)
+    if path is None:
+        return ""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ""
+    return (
+        f"{path}:{st.st_size}:{st.st_mtime_ns}:{_version_output(path, st.st_size, st.st_mtime_ns)}"
+    )
+
+
+def cache_key(validator: str, version: str, flags: Sequence[str], path: str) -> str:
+    # Validators check the file name as well, for example against the ID
+    h = hashlib.sha256(
+        json.dumps([validator, version, list(flags), os.path.basename(path)]).encode() + b"\0"
+    )
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cached(
+    validator: str, version: str, flags: Sequence[str], path: str, validate: Callable[[], T]
+) -> T:
+    try:
+        key = cache_key(validator, version, flags, path)
+        with closing(_connect()) as conn:
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time_ns(), key))
+                _count(conn, "hits")
+                logger.debug("Validation cache hit for %s", path)
+                value: T = json.loads(row[0])
+                return value
+            _count(conn, "misses")
+    except (OSError, ValueError, sqlite3.Error) as err:
+        logger.debug("Validation cache unavailable for %s: %s", path, err)
+        return validate()
+
+    result = validate()
+
+    try:
+        value_json = json.dumps(result)
+        with closing(_connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, used) VALUES (?, ?, ?, ?)",
+                    (key, value_json, len(value_json), time.time_ns()),
+                )
+                _evict(conn, config.VALIDATION_CACHE_MAX_SIZE)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+    except (OSError, TypeError, ValueError, sqlite3.Error) as err:
+        logger.debug("Failed to store validation cache entry for %s: %s", path, err)
+
+    return result
+
+
+def stats() -> dict[str, Any]:
+    with closing(_connect()) as conn:
+        counts = dict(conn.execute("SELECT name, count FROM stats").fetchall())
+        entries, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+    return {
+        "hits": counts.get("hits", 0),
+        "misses": counts.get("misses", 0),
+        "evictions": counts.get("evictions", 0),
+        "entries": entries,
+        "size": size,
+    }
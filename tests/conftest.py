@@ -7,30 +7,35 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from flatpak_builder_lint import checks
+from flatpak_builder_lint import checks, config
 from flatpak_builder_lint.policy import TimedSeverityPolicy
 
 
 @pytest.fixture(autouse=True)
-def reset_check_state() -> Generator[None, None, None]:
+def restore_check_registry() -> Generator[None, None, None]:
     original_all = checks.ALL[:]
-    checks.Check.errors = set()
-    checks.Check.warnings = set()
-    checks.Check.jsonschema = set()
-    checks.Check.appstream = set()
-    checks.Check.desktopfile = set()
-    checks.Check.info = set()
-    checks.Check.repo_primary_refs = set()
     yield
     checks.ALL.clear()
     checks.ALL.extend(original_all)
-    checks.Check.errors = set()
-    checks.Check.warnings = set()
-    checks.Check.jsonschema = set()
-    checks.Check.appstream = set()
-    checks.Check.desktopfile = set()
-    checks.Check.info = set()
-    checks.Check.repo_primary_refs = set()
+
+
+@pytest.fixture(autouse=True)
+def exceptions_index(tmp_path_factory: pytest.TempPathFactory) -> Iterator[None]:
+    index_dir = tmp_path_factory.mktemp("exceptions-index")
+    with (
+        patch.object(config, "EXCEPTIONS_INDEX", str(index_dir / "exceptions.sqlite")),
+        patch.object(
+            config, "REMOTE_EXCEPTIONS_INDEX", str(index_dir / "exceptions-remote.sqlite")
+        ),
+    ):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def validation_cache(tmp_path_factory: pytest.TempPathFactory) -> Iterator[None]:
+    cache_dir = tmp_path_factory.mktemp("validation-cache")
+    with patch.object(config, "VALIDATION_CACHE", str(cache_dir / "validation.sqlite")):
+        yield
 
 
 @pytest.fixture(scope="module")
@@ -428,13 +428,11 @@ def test_builddir_runtime_update_available(
     assert not any(e.startswith("runtime-is-eol") for e in found_errors)
 
 
-# ELF check is disabled for repo check
-# in flatpak_builder_lint/checks/elfarch.py
-def test_wrong_elf_arch(tmp_testdir: str) -> None:
+def test_wrong_elf_arch(check_type: str, tmp_testdir: str) -> None:
     testdir = "tests/builddir/wrong-elf-arch"
     create_elf(testdir, "aarch64")
     create_elf(testdir, "riscv64", "test2.elf")
-    ret = rc(testdir, "builddir", tmp_testdir)
+    ret = rc(testdir, check_type, tmp_testdir)
     found_errors = set(ret["errors"])
     assert "elf-arch-multiple-found" in found_errors
     assert "elf-arch-not-found" in found_errors
@@ -2,6 +2,8 @@ import io
 import json
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from types import MappingProxyType
 from typing import Any
 from unittest.mock import patch
@@ -9,12 +11,8 @@ from unittest.mock import patch
 import pytest
 
 from flatpak_builder_lint import checks
-from flatpak_builder_lint.cli import (
-    _filter,
-    main,
-    print_gh_annotations,
-    run_checks,
-)
+from flatpak_builder_lint.cli import _filter, main, run_checks
+from flatpak_builder_lint.cliutils import print_gh_annotations
 
 
 def _write_json(path: str, data: Any) -> None:
@@ -180,6 +178,194 @@ class TestRunChecksDispatch:
         assert "message" not in result
         assert "errors" not in result
 
+    def test_results_do_not_leak_between_runs(self) -> None:
+        class FakeCheck(checks.Check):
+            def check_manifest(self, manifest: Any) -> None:
+                self.errors.add(f"error-{manifest['id']}")
+
+        orig_all = checks.ALL[:]
+        checks.ALL.clear()
+        checks.ALL.append(FakeCheck)
+        try:
+            with (
+                patch(
+                    "flatpak_builder_lint.cli.manifest.show_manifest",
+                    side_effect=_make_manifest_payload,
+                ),
+                patch("flatpak_builder_lint.cli.manifest.infer_appid", return_value=None),
+            ):
+                first = run_checks("manifest", "com.example.First")
+                second = run_checks("manifest", "com.example.Second")
+        finally:
+            checks.ALL.clear()
+            checks.ALL.extend(orig_all)
+
+        assert first["errors"] == ["error-com.example.First"]
+        assert second["errors"] == ["error-com.example.Second"]
+
+    def test_concurrent_runs_are_isolated(self) -> None:
+        class FakeCheck(checks.Check):
+            def check_manifest(self, manifest: Any) -> None:
+                self.errors.add(f"error-{manifest['id']}")
+
+        appids = [f"com.example.App{i}" for i in range(16)]
+
+        orig_all = checks.ALL[:]
+        checks.ALL.clear()
+        checks.ALL.append(FakeCheck)
+        try:
+            with (
+                patch(
+                    "flatpak_builder_lint.cli.manifest.show_manifest",
+                    side_effect=_make_manifest_payload,
+                ),
+                patch("flatpak_builder_lint.cli.manifest.infer_appid", return_value=None),
+                ThreadPoolExecutor(max_workers=4) as executor,
+            ):
+                results = list(executor.map(lambda a: run_checks("manifest", a), appids))
+        finally:
+            checks.ALL.clear()
+            checks.ALL.extend(orig_all)
+
+        for appid, result in zip(appids, results, strict=True):
+            assert result["errors"] == [f"error-{appid}"]
+
+    def test_remote_repo_lints_a_local_copy(self, tmp_path: Any) -> None:
+        linted: list[str] = []
+
+        class FakeCheck(checks.Check):
+            repo_subpaths = ("files/share/metainfo",)
+            repo_reads = ("metadata",)
+
+            def check_repo(self, path: str) -> None:
+                linted.append(path)
+                self.errors.add("fake-error")
+
+        refs = {"app/com.example.App/x86_64/stable"}
+        remote_repo = patch("flatpak_builder_lint.cli.ostree.remote_repo")
+        orig_all = checks.ALL[:]
+        checks.ALL.clear()
+        checks.ALL.append(FakeCheck)
+        try:
+            with remote_repo as remote_repo_mock:
+                remote_repo_mock.return_value.__enter__.return_value = str(tmp_path)
+                result = run_checks("repo", "https://example.com/repo", repo_primary_refs=refs)
+        finally:
+            checks.ALL.clear()
+            checks.ALL.extend(orig_all)
+
+        remote_repo_mock.assert_called_once_with(
+            "https://example.com/repo", refs, {"files/share/metainfo", "metadata"}
+        )
+        assert linted == [str(tmp_path)]
+        assert result["errors"] == ["fake-error"]
+
+    def test_bundle_lints_the_unpacked_repo(self, tmp_path: Any) -> None:
+        linted: list[str] = []
+
+        class FakeCheck(checks.Check):
+            def check_repo(self, path: str) -> None:
+                linted.append(path)
+
+        orig_all = checks.ALL[:]
+        checks.ALL.clear()
+        checks.ALL.append(FakeCheck)
+        try:
+            with (
+                patch("flatpak_builder_lint.cli.ostree.bundle_repo") as bundle_repo,
+                patch("flatpak_builder_lint.cli.ostree.get_primary_refs", return_value=set()),
+            ):
+                bundle_repo.return_value.__enter__.return_value = str(tmp_path)
+                assert run_checks("bundle", "/fake/app.flatpak") == {}
+        finally:
+            checks.ALL.clear()
+            checks.ALL.extend(orig_all)
+
+        bundle_repo.assert_called_once_with("/fake/app.flatpak")
+        assert linted == [str(tmp_path)]
+
+    def test_remote_repo_needs_refs(self) -> None:
+        with pytest.raises(ValueError, match="Refs to lint are required"):
+            run_checks("repo", "https://example.com/repo")
+
+    def test_workspace_is_closed_when_setup_fails(self, tmp_path: Any) -> None:
+        with (
+            patch("flatpak_builder_lint.cli.ostree.CheckoutWorkspace.close") as close,
+            patch(
+                "flatpak_builder_lint.cli.ostree.get_primary_refs",
+                side_effect=OSError("broken repo"),
+            ),
+            pytest.raises(OSError, match="broken repo"),
+        ):
+            run_checks("repo", str(tmp_path))
+
+        close.assert_called_once()
+
+
+class TestRunChecksJobs:
+    def _run(self, check_classes: list[type[checks.Check]], jobs: int) -> dict[str, Any]:
+        orig_all = checks.ALL[:]
+        checks.ALL.clear()
+        checks.ALL.extend(check_classes)
+        try:
+            with (
+                patch(
+                    "flatpak_builder_lint.cli.manifest.show_manifest",
+                    return_value=_make_manifest_payload(),
+                ),
+                patch("flatpak_builder_lint.cli.manifest.infer_appid", return_value=None),
+            ):
+                return run_checks("manifest", "/fake", jobs=jobs)
+        finally:
+            checks.ALL.clear()
+            checks.ALL.extend(orig_all)
+
+    def test_checks_run_concurrently(self) -> None:
+        barrier = threading.Barrier(2, timeout=10)
+
+        class FirstCheck(checks.Check):
+            def check_manifest(self, _manifest: Any) -> None:
+                barrier.wait()
+                self.errors.add("first-error")
+
+        class SecondCheck(checks.Check):
+            def check_manifest(self, _manifest: Any) -> None:
+                barrier.wait()
+                self.warnings.add("second-warning")
+
+        result = self._run([FirstCheck, SecondCheck], jobs=2)
+        assert result["errors"] == ["first-error"]
+        assert result["warnings"] == ["second-warning"]
+
+    def test_parallel_results_match_serial(self) -> None:
+        def make_check(i: int) -> type[checks.Check]:
+            class FakeCheck(checks.Check):
+                def check_manifest(self, _manifest: Any) -> None:
+                    self.errors.add(f"error-{i}")
+                    self.info.add(f"error-{i}: details {i}")
+
+            return FakeCheck
+
+        check_classes = [make_check(i) for i in range(8)]
+        serial = self._run(check_classes, jobs=1)
+        parallel = self._run(check_classes, jobs=4)
+
+        assert set(serial["errors"]) == set(parallel["errors"])
+        assert set(serial["info"]) == set(parallel["info"])
+        assert len(parallel["errors"]) == 8
+
+    def test_check_exception_is_propagated(self) -> None:
+        class BrokenCheck(checks.Check):
+            def check_manifest(self, _manifest: Any) -> None:
+                raise RuntimeError("broken")
+
+        class FakeCheck(checks.Check):
+            def check_manifest(self, _manifest: Any) -> None:
+                pass
+
+        with pytest.raises(RuntimeError, match="broken"):
+            self._run([BrokenCheck, FakeCheck], jobs=2)
+
 
 class TestRunChecksExceptions:
     def _run_with_error(
@@ -205,7 +391,7 @@ class TestRunChecksExceptions:
                 ),
                 patch("flatpak_builder_lint.cli.get_local_exceptions", return_value=exceptions),
             ):
-                result = run_checks("manifest", "/fake", enable_exceptions=True, appid=appid)
+                result = run_checks("manifest", "/fake", enable_exceptions=True, appid=[appid])
         finally:
             checks.ALL.clear()
             checks.ALL.extend(orig_all)
@@ -252,7 +438,7 @@ class TestRunChecksExceptions:
                     "manifest",
                     "/fake",
                     enable_exceptions=True,
-                    appid="com.example.App",
+                    appid=["com.example.App"],
                     user_exceptions_path="dummy.json",
                 )
         finally:
@@ -293,7 +479,7 @@ class TestRunChecksExceptions:
                     "manifest",
                     "/fake",
                     enable_exceptions=True,
-                    appid="com.example.App",
+                    appid=["com.example.App"],
                 )
         finally:
             checks.ALL.clear()
@@ -302,6 +488,118 @@ class TestRunChecksExceptions:
         assert "appstream" not in result
 
 
+class TestRunChecksPruning:
+    def _run(
+        self, check: type[checks.Check], exceptions: set[str], **kwargs: Any
+    ) -> tuple[dict[str, Any], Any]:
+        orig_all = checks.ALL[:]
+        checks.ALL.clear()
+        checks.ALL.append(check)
+        try:
+            with (
+                patch(
+                    "flatpak_builder_lint.cli.manifest.show_manifest",
+                    return_value=_make_manifest_payload(),
+                ) as mock_show,
+                patch(
+                    "flatpak_builder_lint.cli.domainutils.get_remote_exceptions_github",
+                    return_value=exceptions,
+                ),
+            ):
+                result = run_checks(
+                    "manifest", "/fake", enable_exceptions=True, appid=["com.example.App"], **kwargs
+                )
+        finally:
+            checks.ALL.clear()
+            checks.ALL.extend(orig_all)
+        return result, mock_show
+
+    def test_wildcard_exception_runs_nothing(self) -> None:
+        ran = []
+
+        class FakeCheck(checks.Check):
+            def check_manifest(self, _manifest: Any) -> None:
+                ran.append(True)
+
+        result, mock_show = self._run(FakeCheck, {"*"})
+
+        assert result == {}
+        assert not ran
+        mock_show.assert_not_called()
+
+    def test_check_is_skipped_when_all_codes_are_excepted(self) -> None:
+        ran = []
+
+        class FakeCheck(checks.Check):
+            codes = frozenset({"fake-error", "fake-warning"})
+
+            def check_manifest(self, _manifest: Any) -> None:
+                ran.append(True)
+                self.errors.add("fake-error")
+
+        result, _ = self._run(FakeCheck, {"fake-error", "fake-warning"})
+
+        assert not ran
+        assert "errors" not in result
+
+    def test_check_runs_when_some_codes_are_not_excepted(self) -> None:
+        class FakeCheck(checks.Check):
+            codes = frozenset({"fake-error", "fake-warning"})
+
+            def check_manifest(self, _manifest: Any) -> None:
+                self.warnings.add("fake-warning")
+
+        result, _ = self._run(FakeCheck, {"fake-error"})
+
+        assert result["warnings"] == ["fake-warning"]
+
+    def test_check_can_short_circuit_excepted_codes(self) -> None:
+        class FakeCheck(checks.Check):
+            def check_manifest(self, _manifest: Any) -> None:
+                if not self.is_excepted("fake-error"):
+                    self.errors.add("fake-error")
+                self.warnings.add("fake-warning")
+
+        result, _ = self._run(FakeCheck, {"fake-error"})
+
+        assert "errors" not in result
+        assert result["warnings"] == ["fake-warning"]
+
+    def test_nothing_is_skipped_when_reporting_stale_exceptions(self) -> None:
+        ran = []
+
+        class FakeCheck(checks.Check):
+            codes = frozenset({"fake-error"})
+
+            def check_manifest(self, _manifest: Any) -> None:
+                ran.append(True)
+                self.errors.add("fake-error")
+
+        with (
+            patch("flatpak_builder_lint.cli.config.is_flathub_build_pipeline", return_value=True),
+            patch("flatpak_builder_lint.cli.exceptions_janitor.report_stale_exceptions"),
+        ):
+            self._run(FakeCheck, {"fake-error"}, enable_janitor_exceptions=True)
+
+        assert ran
+
+    def test_wildcard_stale_exceptions_are_reported(self) -> None:
+        class FakeCheck(checks.Check):
+            def check_manifest(self, _manifest: Any) -> None:
+                self.errors.add("fake-error")
+
+        with (
+            patch("flatpak_builder_lint.cli.config.is_flathub_build_pipeline", return_value=True),
+            patch("flatpak_builder_lint.cli.exceptions_janitor.report_stale_exceptions") as report,
+        ):
+            result, _ = self._run(
+                FakeCheck, {"*", "fake-error", "stale-error"}, enable_janitor_exceptions=True
+            )
+
+        assert result == {}
+        report.assert_called_once_with("com.example.App", {"stale-error"})
+
+
 class TestMainArgParsing:
     def _run_main(self, argv: list[str]) -> int | None:
         with patch.object(sys, "argv", argv), pytest.raises(SystemExit) as exc:
@@ -322,6 +620,11 @@ class TestMainArgParsing:
     def test_missing_path_exits_nonzero(self) -> None:
         assert self._run_main(["flatpak-builder-lint", "manifest"]) != 0
 
+    def test_remote_url_needs_repo_and_ref(self) -> None:
+        url = "https://example.com/repo"
+        assert self._run_main(["flatpak-builder-lint", "repo", url]) != 0
+        assert self._run_main(["flatpak-builder-lint", "manifest", url, "--ref", "app/a/b/c"]) != 0
+
     def test_manifest_no_errors_exits_zero(self, tmp_path: Any) -> None:
         p = tmp_path / "com.example.App.json"
         p.write_text("{}")
@@ -355,7 +658,7 @@ class TestMainArgParsing:
                 return_value={"errors": ["finish-args-not-defined"]},
             ),
             patch.dict(os.environ, {"GITHUB_ACTIONS": "true"}),
-            patch("flatpak_builder_lint.cli.print_gh_annotations") as mock_ann,
+            patch("flatpak_builder_lint.cliutils.print_gh_annotations") as mock_ann,
         ):
             self._run_main(["flatpak-builder-lint", "--gha-format", "manifest", str(p)])
             mock_ann.assert_called_once()
@@ -384,8 +687,76 @@ class TestMainArgParsing:
             )
         assert mock_rc.call_args[0][3] == ["com.override.App"]
 
+    def test_jobs_passed_to_run_checks(self, tmp_path: Any) -> None:
+        p = tmp_path / "x.json"
+        p.write_text("{}")
+        with patch("flatpak_builder_lint.cli.run_checks", return_value={}) as mock_rc:
+            self._run_main(["flatpak-builder-lint", "--jobs", "4", "manifest", str(p)])
+        assert mock_rc.call_args.kwargs["jobs"] == 4
+
+    def test_invalid_jobs_exits_nonzero(self, tmp_path: Any) -> None:
+        p = tmp_path / "x.json"
+        p.write_text("{}")
+        assert self._run_main(["flatpak-builder-lint", "--jobs", "0", "manifest", str(p)]) != 0
+
+    def test_batch_prints_one_line_per_artifact(self, tmp_path: Any) -> None:
+        batch = tmp_path / "paths.txt"
+        batch.write_text("first.json\n\nsecond.json\n")
+
+        def fake_run_checks(_kind: str, path: str, *_args: Any, **_kwargs: Any) -> dict[str, Any]:
+            return {"errors": ["some-error"]} if path == "second.json" else {}
+
+        buf = io.StringIO()
+        with (
+            patch("flatpak_builder_lint.cli.run_checks", side_effect=fake_run_checks),
+            patch("sys.stdout", buf),
+        ):
+            code = self._run_main(["flatpak-builder-lint", "manifest", "--batch", str(batch)])
+
+        lines = [json.loads(line) for line in buf.getvalue().splitlines()]
+        assert code == 1
+        assert lines == [
+            {"path": "first.json", "results": {}},
+            {"path": "second.json", "results": {"errors": ["some-error"]}},
+        ]
+
+    def test_batch_continues_after_exception(self, tmp_path: Any) -> None:
+        batch = tmp_path / "paths.txt"
+        batch.write_text("broken.json\nfine.json\n")
+
+        def fake_run_checks(_kind: str, path: str, *_args: Any, **_kwargs: Any) -> dict[str, Any]:
+            if path == "broken.json":
+                raise OSError("No such manifest file")
+            return {}
+
+        buf = io.StringIO()
+        with (
+            patch("flatpak_builder_lint.cli.run_checks", side_effect=fake_run_checks),
+            patch("sys.stdout", buf),
+        ):
+            code = self._run_main(["flatpak-builder-lint", "repo", "--batch", str(batch)])
+
+        lines = [json.loads(line) for line in buf.getvalue().splitlines()]
+        assert code == 1
+        assert lines[0] == {"path": "broken.json", "exception": "OSError: No such manifest file"}
+        assert lines[1] == {"path": "fine.json", "results": {}}
+
+    def test_batch_not_supported_for_appstream(self, tmp_path: Any) -> None:
+        batch = tmp_path / "paths.txt"
+        batch.write_text("foo.metainfo.xml\n")
+        assert self._run_main(["flatpak-builder-lint", "appstream", "--batch", str(batch)]) != 0
+
+    @pytest.mark.parametrize("option", [["--appid", "com.example.App"], ["--ref", "app/x/y/z"]])
+    def test_batch_rejects_overrides(self, tmp_path: Any, option: list[str]) -> None:
+        batch = tmp_path / "paths.txt"
+        batch.write_text("first.json\nsecond.json\n")
+        with patch("flatpak_builder_lint.cli.run_checks", return_value={}) as mock_rc:
+            code = self._run_main(["flatpak-builder-lint", *option, "repo", "--batch", str(batch)])
+        assert code != 0
+        mock_rc.assert_not_called()
+
     def test_ref_override_sets_repo_primary_refs(self, tmp_path: Any) -> None:
-        with patch("flatpak_builder_lint.cli.run_checks", return_value={}):
+        with patch("flatpak_builder_lint.cli.run_checks", return_value={}) as mock_rc:
             self._run_main(
                 [
                     "flatpak-builder-lint",
@@ -395,4 +766,4 @@ class TestMainArgParsing:
                     str(tmp_path / "x.json"),
                 ]
             )
-        assert "app/com.example.App/x86_64/stable" in checks.Check.repo_primary_refs
+        assert "app/com.example.App/x86_64/stable" in mock_rc.call_args.kwargs["repo_primary_refs"]
@@ -1,12 +1,18 @@
+import hashlib
 import json
 import os
 import tempfile
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, ClassVar
 from unittest.mock import patch
 
 import pytest
 import requests as req
+from requests_cache import CachedSession
 
-from flatpak_builder_lint import checks, cli, domainutils
+from flatpak_builder_lint import cli, config, domainutils
 
 EXCEPTIONS_DATA = {
     "org.flathub.test.App": {
@@ -28,12 +34,6 @@ def mock_domainutils() -> None:
     pass
 
 
-@pytest.fixture(autouse=True)
-def reset_checks() -> None:
-    checks.Check.errors = set()
-    checks.Check.warnings = set()
-
-
 def get_local_exceptions_side_effect(appid: str, exceptions_repo: str | None) -> set[str]:
     raw = EXCEPTIONS_DATA.get(appid, {})
     if not raw:
@@ -131,10 +131,10 @@ def test_remote_exceptions_github(
 ) -> None:
     mock_data = {"org.flathub.test.App": EXCEPTIONS_DATA["org.flathub.test.App"]}
 
-    with patch("requests.get") as mock_get:
+    with patch("flatpak_builder_lint.domainutils.session.get") as mock_get:
         mock_get.return_value.status_code = 200
         mock_get.return_value.headers = {"Content-Type": "text/plain"}
-        mock_get.return_value.json.return_value = mock_data
+        mock_get.return_value.content = json.dumps(mock_data).encode()
 
         domainutils.get_remote_exceptions_github.cache_clear()
         result = domainutils.get_remote_exceptions_github("org.flathub.test.App", repo)
@@ -146,13 +146,86 @@ def test_remote_exceptions_github(
 
 
 def test_remote_exceptions_github_request_failure_returns_empty() -> None:
-    with patch("requests.get", side_effect=req.exceptions.RequestException):
+    with patch(
+        "flatpak_builder_lint.domainutils.session.get",
+        side_effect=req.exceptions.RequestException,
+    ):
         domainutils.get_remote_exceptions_github.cache_clear()
         result = domainutils.get_remote_exceptions_github("org.flathub.test.App", "stable")
 
     assert result == set()
 
 
+class ExceptionsHandler(BaseHTTPRequestHandler):
+    body = b""
+    statuses: ClassVar[list[int]] = []
+
+    def do_GET(self) -> None:
+        etag = f'"{hashlib.sha256(self.body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.statuses.append(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.statuses.append(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *_args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def exceptions_server(tmp_path: Any) -> Iterator[type[ExceptionsHandler]]:
+    handler = type("Handler", (ExceptionsHandler,), {"statuses": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with (
+        patch.object(config, "GITHUB_CONTENT_CDN", f"http://127.0.0.1:{server.server_port}"),
+        patch.object(
+            domainutils,
+            "session",
+            CachedSession(str(tmp_path / "requests_cache"), backend="sqlite"),
+        ),
+    ):
+        yield handler
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_remote_exceptions_github_revalidates_with_etag(
+    exceptions_server: type[ExceptionsHandler],
+) -> None:
+    exceptions_server.body = json.dumps(EXCEPTIONS_DATA).encode()
+
+    for _ in range(2):
+        domainutils.get_remote_exceptions_github.cache_clear()
+        with patch("flatpak_builder_lint.exceptions_index.json.loads", wraps=json.loads) as loads:
+            result = domainutils.get_remote_exceptions_github("org.flathub.test.App", "stable")
+        assert result == {"finish-args-host-filesystem-access", "finish-args-flatpak-spawn-access"}
+
+    assert exceptions_server.statuses == [200, 304]
+    # The unchanged body was not parsed again
+    loads.assert_not_called()
+
+    exceptions_server.body = json.dumps(
+        {"org.flathub.test.App": {"stable": {"appid-url-not-reachable": "Site is down"}}}
+    ).encode()
+    domainutils.get_remote_exceptions_github.cache_clear()
+    result = domainutils.get_remote_exceptions_github("org.flathub.test.App", "stable")
+
+    assert exceptions_server.statuses == [200, 304, 200]
+    assert result == {"appid-url-not-reachable"}
+
+
 def test_user_exceptions_ignores_repo() -> None:
     data = {"org.flathub.test.App": ["finish-args-host-filesystem-access"]}
 
@@ -1,17 +1,12 @@
+import os
+from pathlib import Path
+from typing import Any
 from unittest.mock import patch
 
-from flatpak_builder_lint import checks
 from flatpak_builder_lint.checks.reposize import RepoSizeCheck
 
 
-def reset_check_state() -> None:
-    checks.Check.errors = set()
-    checks.Check.info = set()
-
-
 def test_repo_too_large_triggers_error() -> None:
-    reset_check_state()
-
     check: RepoSizeCheck = RepoSizeCheck()
 
     with (
@@ -24,8 +19,6 @@ def test_repo_too_large_triggers_error() -> None:
 
 
 def test_repo_small_does_not_trigger_error() -> None:
-    reset_check_state()
-
     check: RepoSizeCheck = RepoSizeCheck()
 
     with (
@@ -35,3 +28,87 @@ def test_repo_small_does_not_trigger_error() -> None:
         check._validate("/fake/repo", primary_ref_count=1)
 
     assert "flatpak-repo-too-large" not in check.errors
+
+
+def _make_repo(path: Path, shards: int, files_per_shard: int) -> int:
+    (path / "refs" / "heads").mkdir(parents=True)
+    (path / "config").write_bytes(b"x" * 10)
+    (path / "refs" / "heads" / "ref").write_bytes(b"x" * 64)
+    os.symlink("config", path / "config-link")
+    size = 10 + 64
+    for shard in range(shards):
+        shard_dir = path / "objects" / f"{shard:02x}"
+        shard_dir.mkdir(parents=True)
+        for i in range(files_per_shard):
+            (shard_dir / f"{i}.filez").write_bytes(b"x" * (i + 1))
+            size += i + 1
+    return size
+
+
+def test_get_dir_size_counts_every_object(tmp_path: Path) -> None:
+    size = _make_repo(tmp_path, shards=16, files_per_shard=5)
+    assert RepoSizeCheck.get_dir_size(str(tmp_path)) == size
+
+
+def test_get_dir_size_stops_at_limit(tmp_path: Path) -> None:
+    size = _make_repo(tmp_path, shards=64, files_per_shard=2)
+    scanned: list[str] = []
+    scandir = os.scandir
+
+    def counting_scandir(path: str) -> Any:
+        scanned.append(path)
+        return scandir(path)
+
+    with patch("flatpak_builder_lint.checks.reposize.os.scandir", counting_scandir):
+        found = RepoSizeCheck.get_dir_size(str(tmp_path), limit=10)
+
+    assert 10 <= found < size
+    assert len(scanned) < 64
+
+
+def test_repo_too_large_reports_ref_sizes() -> None:
+    check: RepoSizeCheck = RepoSizeCheck()
+    ref_sizes = {
+        "app/org.flathub.App/x86_64/stable": 9 * 1024**3,
+        "app/org.flathub.App/aarch64/stable": 11 * 1024**3,
+    }
+
+    with (
+        patch.object(RepoSizeCheck, "get_dir_size", return_value=26 * 1024**3) as get_dir_size,
+        patch("flatpak_builder_lint.checks.reposize.config.is_flathub_pipeline", return_value=True),
+    ):
+        check._validate("/fake/repo", primary_ref_count=2, get_ref_sizes=lambda: ref_sizes)
+
+    get_dir_size.assert_called_once_with("/fake/repo", limit=24 * 1024**3)
+    assert check.info == {
+        "flatpak-repo-too-large: Flatpak repo size is at least 26.00 GB and exceeds limit"
+        + " of 24.00 GB. Download size of refs: app/org.flathub.App/aarch64/stable 11.00 GB,"
+        + " app/org.flathub.App/x86_64/stable 9.00 GB"
+    }
+
+
+def test_repo_size_is_not_scanned_outside_of_flathub() -> None:
+    with (
+        patch.object(RepoSizeCheck, "get_dir_size") as get_dir_size,
+        patch(
+            "flatpak_builder_lint.checks.reposize.config.is_flathub_pipeline", return_value=False
+        ),
+    ):
+        RepoSizeCheck()._validate("/fake/repo")
+
+    get_dir_size.assert_not_called()
+
+
+def test_ref_sizes_are_only_read_when_too_large() -> None:
+    check: RepoSizeCheck = RepoSizeCheck()
+    check.repo_primary_refs.add("app/org.flathub.App/x86_64/stable")
+
+    with (
+        patch.object(RepoSizeCheck, "get_dir_size", return_value=100 * 1024**2),
+        patch("flatpak_builder_lint.checks.reposize.config.is_flathub_pipeline", return_value=True),
+        patch("flatpak_builder_lint.checks.reposize.ostree.get_ref_download_sizes") as sizes,
+    ):
+        check.check_repo("/fake/repo")
+
+    sizes.assert_not_called()
+    assert not check.errors
@@ -1,6 +1,9 @@
 import gzip
+import os
+import shutil
 import textwrap
 from typing import Any
+from unittest.mock import patch
 
 import pytest
 
@@ -54,7 +57,7 @@ class TestAppstreamXml:
 
     def test_appstream_id(self, tmp_path: Any) -> None:
         p = _write_appstream(tmp_path, MINIMAL_METAINFO)
-        assert appstream.appstream_id(p) == ["org.example.App"]
+        assert appstream.appstream_id(p) == ("org.example.App",)
 
     def test_is_developer_name_present_with_developer_tag(self, tmp_path: Any) -> None:
         p = _write_appstream(tmp_path, MINIMAL_METAINFO)
@@ -108,7 +111,7 @@ class TestAppstreamXml:
 
     def test_get_launchable(self, tmp_path: Any) -> None:
         p = _write_appstream(tmp_path, MINIMAL_METAINFO)
-        assert appstream.get_launchable(p) == ["org.example.App.desktop"]
+        assert appstream.get_launchable(p) == ("org.example.App.desktop",)
 
     def test_check_caption_all_have_captions(self, tmp_path: Any) -> None:
         p = _write_appstream(tmp_path, MINIMAL_METAINFO)
@@ -188,6 +191,45 @@ class TestAppstreamXml:
         assert len(result) == 1
         assert "flathub" in result[0]
 
+    def test_find_manifest_key_in_catalogue(self, tmp_path: Any) -> None:
+        xml = """
+            <components>
+              <component><id>org.example.Other</id></component>
+              <component>
+                <id>org.example.App</id>
+                <custom>
+                  <value key="flathub::other">other</value>
+                  <value key="flathub::manifest">https://example.org/org.example.App.json</value>
+                </custom>
+              </component>
+            </components>
+        """
+        p = _write_appstream(tmp_path, xml, gz=True)
+        assert appstream.find_manifest_key(p) == "https://example.org/org.example.App.json"
+
+    def test_find_manifest_key_stops_at_first_match(self, tmp_path: Any) -> None:
+        xml = """
+            <components>
+              <component>
+                <custom><value key="flathub::manifest">first</value></custom>
+              </component>
+              <component>
+                <custom><value key="flathub::manifest">second</value></custom>
+              </component>
+              <component><unclosed>
+        """
+        p = _write_appstream(tmp_path, xml, gz=True)
+        assert appstream.find_manifest_key(p) == "first"
+
+    def test_find_manifest_key_absent(self, tmp_path: Any) -> None:
+        p = _write_appstream(tmp_path, MINIMAL_METAINFO)
+        assert appstream.find_manifest_key(p) is None
+
+    def test_find_manifest_key_raises_on_invalid_xml(self, tmp_path: Any) -> None:
+        p = _write_appstream(tmp_path, "<components><component>", gz=True)
+        with pytest.raises(RuntimeError):
+            appstream.find_manifest_key(p)
+
     def test_is_valid_component_type_true(self, tmp_path: Any) -> None:
         p = _write_appstream(tmp_path, MINIMAL_METAINFO)
         assert appstream.is_valid_component_type(p) is True
@@ -237,3 +279,118 @@ class TestAppstreamXml:
         xml = "<components><component/></components>"
         p = _write_appstream(tmp_path, xml)
         assert appstream.metainfo_components(p) == []
+
+
+class TestAppstreamDocument:
+    def test_parsed_once_per_file(self, tmp_path: Any) -> None:
+        p = _write_appstream(tmp_path, MINIMAL_METAINFO, gz=True)
+
+        with patch("flatpak_builder_lint.appstream.parse_xml", wraps=appstream.parse_xml) as parse:
+            assert appstream.component_type(p) == "desktop-application"
+            assert appstream.appstream_id(p) == ("org.example.App",)
+            assert appstream.get_launchable(p) == ("org.example.App.desktop",)
+            assert appstream.get_latest_release_version(p) == "1.0"
+            assert appstream.check_caption(p) is True
+
+        parse.assert_called_once()
+
+    def test_reparsed_when_modified(self, tmp_path: Any) -> None:
+        p = _write_appstream(tmp_path, MINIMAL_METAINFO)
+        assert appstream.get_document(p).ids == ("org.example.App",)
+
+        st = os.stat(p)
+        _write_appstream(tmp_path, MINIMAL_METAINFO.replace("org.example.App", "org.example.New"))
+        os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        assert appstream.get_document(p).ids == ("org.example.New",)
+
+    def test_matches_xpath_queries(self, tmp_path: Any) -> None:
+        p = _write_appstream(tmp_path, MINIMAL_METAINFO)
+        document = appstream.get_document(p)
+
+        assert document.screenshot_images == tuple(
+            appstream.xpath_list(p, "//screenshots/screenshot/image/text()")
+        )
+        assert document.cached_icon == "org.example.App.png"
+        assert document.project_license == "GPL-2.0"
+        assert document.has_developer_name
+        assert document.has_vcs_browser_url
+        assert not document.has_untyped_icon
+        assert not document.manifest_keys
+
+    def test_missing_file_raises(self, tmp_path: Any) -> None:
+        with pytest.raises(FileNotFoundError):
+            appstream.get_document(str(tmp_path / "nonexistent.xml"))
+
+    def test_holds_no_elements(self, tmp_path: Any) -> None:
+        p = _write_appstream(tmp_path, MINIMAL_METAINFO)
+        document = appstream.get_document(p)
+
+        for value in vars(document).values():
+            values = value if isinstance(value, tuple) else (value,)
+            assert all(v is None or type(v) in {str, int, bool} for v in values)
+
+    def test_component_count(self, tmp_path: Any) -> None:
+        xml = "<components><component/><component/></components>"
+        p = _write_appstream(tmp_path, xml)
+        assert appstream.component_count(p) == 2
+        assert not appstream.is_metainfo_component(p)
+
+
+INVALID_METAINFO = """
+    <?xml version="1.0" encoding="UTF-8"?>
+    <component type="desktop-application">
+      <id>org.example.App</id>
+      <name>App</name>
+      <summary>An app</summary>
+      <metadata_license>CC0-1.0</metadata_license>
+    </component>
+"""
+
+needs_appstreamcli = pytest.mark.skipif(
+    shutil.which("appstreamcli") is None, reason="appstreamcli is not installed"
+)
+
+
+class TestValidateMetainfo:
+    @needs_appstreamcli
+    def test_appstreamcli_report(self, tmp_path: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setenv("FLATPAK_BUILDER_LINT", "appstreamcli-validate")
+        p = _write_appstream(tmp_path, INVALID_METAINFO)
+
+        report = appstream.validate_metainfo(p)
+
+        assert not report["passed"]
+        assert report["filename"] == "app.xml"
+        issue = next(i for i in report["issues"] if i["tag"] == "app-description-required")
+        assert issue["severity"] == "error"
+        assert issue["line"] is None
+        assert issue["explanation"]
+
+    @needs_appstreamcli
+    def test_in_process_matches_appstreamcli(self, tmp_path: Any) -> None:
+        p = _write_appstream(tmp_path, INVALID_METAINFO)
+
+        in_process = appstream._validate_in_process(p)
+        subprocess = appstream._validate_appstreamcli(p)
+
+        assert in_process["passed"] == subprocess["passed"]
+        assert {(i["tag"], i["severity"], i["line"]) for i in in_process["issues"]} == {
+            (i["tag"], i["severity"], i["line"]) for i in subprocess["issues"]
+        }
+
+    def test_appstreamcli_unparsable_output(self, tmp_path: Any) -> None:
+        p = _write_appstream(tmp_path, INVALID_METAINFO)
+        result = {"stdout": "Issues: [", "stderr": "some error\n", "returncode": 3}
+
+        with patch.object(appstream, "validate", return_value=result):
+            report = appstream._validate_appstreamcli(p)
+
+        assert not report["passed"]
+        assert report["issues"] == []
+        assert report["messages"][0] == "some error"
+        assert report["messages"][1].startswith("Failed to parse appstream validate YAML output")
+
+    def test_missing_file_raises(self, tmp_path: Any) -> None:
+        with pytest.raises(FileNotFoundError):
+            appstream.validate_metainfo(str(tmp_path / "nonexistent.xml"))
@@ -0,0 +1,111 @@
+import ast
+import inspect
+import re
+import sys
+from collections.abc import Iterator
+
+import pytest
+
+from flatpak_builder_lint import checks, cli  # noqa: F401
+
+# Finds every code a check adds to its errors or warnings in its source.
+# Parts of a code that come from the artifact are replaced by "*", the
+# same way they are declared in Check.codes.
+
+FINDINGS = {"errors", "warnings"}
+
+
+def _functions(module: ast.Module) -> dict[str, ast.FunctionDef]:
+    return {node.name: node for node in module.body if isinstance(node, ast.FunctionDef)}
+
+
+def _enclosing_function(tree: ast.AST, node: ast.AST) -> ast.FunctionDef | None:
+    found = None
+    # Outer functions are walked first, the innermost one is found last
+    for func in ast.walk(tree):
+        if isinstance(func, ast.FunctionDef) and any(n is node for n in ast.walk(func)):
+            found = func
+    return found
+
+
+def _patterns(
+    node: ast.expr,
+    scope: ast.AST | None,
+    module: ast.Module,
+    args: dict[str, str] | None = None,
+) -> Iterator[str]:
+    args = args or {}
+    match node:
+        case ast.Constant(value=str(value)):
+            yield value
+        case ast.JoinedStr(values=values):
+            parts = []
+            for part in values:
+                if isinstance(part, ast.Constant):
+                    parts.append(str(part.value))
+                elif (
+                    isinstance(part, ast.FormattedValue)
+                    and isinstance(part.value, ast.Name)
+                    and part.value.id in args
+                ):
+                    parts.append(args[part.value.id])
+                else:
+                    parts.append("*")
+            yield re.sub(r"\*+", "*", "".join(parts))
+        case ast.Name(id=name) if name in args:
+            yield args[name]
+        case ast.Name(id=name):
+            assert scope is not None, f"Unresolved code {name}"
+            for assign in ast.walk(scope):
+                if isinstance(assign, ast.Assign) and any(
+                    isinstance(t, ast.Name) and t.id == name for t in assign.targets
+                ):
+                    yield from _patterns(assign.value, scope, module, args)
+        case ast.Call(func=ast.Name(id=name), args=call_args) if name in _functions(module):
+            func = _functions(module)[name]
+            bound = {
+                param.arg: value.value
+                if isinstance(value, ast.Constant) and isinstance(value.value, str)
+                else "*"
+                for param, value in zip(func.args.args, call_args, strict=False)
+            }
+            for ret in ast.walk(func):
+                if isinstance(ret, ast.Return) and ret.value is not None:
+                    yield from _patterns(ret.value, func, module, bound)
+        case _:
+            raise AssertionError(f"Unsupported code expression: {ast.unparse(node)}")
+
+
+def emitted_codes(checkclass: type[checks.Check]) -> frozenset[str]:
+    module = ast.parse(inspect.getsource(sys.modules[checkclass.__module__]))
+    classdef = next(
+        node
+        for node in module.body
+        if isinstance(node, ast.ClassDef) and node.name == checkclass.__name__
+    )
+    codes: set[str] = set()
+    for node in ast.walk(classdef):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "add"
+            and isinstance(node.func.value, ast.Attribute)
+            and node.func.value.attr in FINDINGS
+        ):
+            scope = _enclosing_function(classdef, node)
+            codes.update(_patterns(node.args[0], scope, module))
+    return frozenset(codes)
+
+
+@pytest.mark.parametrize(
+    "checkclass",
+    [c for c in checks.ALL if c.__module__.startswith(f"{checks.__name__}.")],
+    ids=lambda c: c.__module__.rsplit(".", 1)[-1],
+)
+def test_codes_match_the_source(checkclass: type[checks.Check]) -> None:
+    assert checkclass.codes == emitted_codes(checkclass)
+
+
+def test_pattern_codes_are_never_excepted() -> None:
+    context = checks.LintContext(exceptions=frozenset({"module-foo-cleanup-debug"}))
+    assert not context.is_excepted("module-*-cleanup-debug")
@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+
+from flatpak_builder_lint import checks
+
+
+class RefCheck(checks.Check):
+    def _check_ref(self, ref: str) -> None:
+        self.errors.add(f"error-{ref.split('/')[2]}")
+        self.info.add(f"error-{ref.split('/')[2]}: {ref}")
+
+
+# Not a real check, keep it out of the registry used by run_checks
+checks.ALL.remove(RefCheck)
+
+
+def test_fork_shares_refs_but_not_findings() -> None:
+    context = checks.LintContext(repo_primary_refs={"app/org.flathub.App/x86_64/stable"}, jobs=2)
+    child = context.fork()
+    child.errors.add("some-error")
+
+    assert child.repo_primary_refs is context.repo_primary_refs
+    assert child.jobs == 2
+    assert not context.errors
+
+    context.merge(child)
+    assert context.errors == {"some-error"}
+
+
+def test_is_excepted_needs_every_code() -> None:
+    context = checks.LintContext(exceptions=frozenset({"first-error", "second-error"}))
+    check = RefCheck(context.fork())
+
+    assert check.is_excepted("first-error")
+    assert check.is_excepted("first-error", "second-error")
+    assert not check.is_excepted("first-error", "third-error")
+    assert checks.LintContext(exceptions=frozenset({"*"})).is_excepted("any-error")
+
+
+def test_for_each_ref_merges_findings() -> None:
+    refs = {
+        "app/org.flathub.App/x86_64/stable",
+        "app/org.flathub.App/aarch64/stable",
+    }
+    check = RefCheck(checks.LintContext(jobs=1))
+    check._for_each_ref(refs, lambda c, ref: c._check_ref(ref))
+
+    assert check.errors == {"error-x86_64", "error-aarch64"}
+    assert len(check.info) == 2
+
+
+def test_for_each_ref_runs_refs_concurrently() -> None:
+    refs = {
+        "app/org.flathub.App/x86_64/stable",
+        "app/org.flathub.App/aarch64/stable",
+    }
+    barrier = threading.Barrier(2, timeout=10)
+
+    def run(check: RefCheck, ref: str) -> None:
+        barrier.wait()
+        check._check_ref(ref)
+
+    check = RefCheck(checks.LintContext(jobs=2))
+    check._for_each_ref(refs, run)
+
+    assert check.errors == {"error-x86_64", "error-aarch64"}
+
+
+def test_for_each_ref_propagates_exceptions() -> None:
+    def run(_check: RefCheck, ref: str) -> None:
+        if ref.endswith("/aarch64/stable"):
+            raise RuntimeError("broken ref")
+
+    check = RefCheck(checks.LintContext(jobs=2))
+    with pytest.raises(RuntimeError, match="broken ref"):
+        check._for_each_ref(
+            {"app/org.flathub.App/x86_64/stable", "app/org.flathub.App/aarch64/stable"}, run
+        )
+
+
+def test_shared_findings_run_once_per_key() -> None:
+    shared = checks.SharedFindings()
+    calls: list[str] = []
+
+    def compute(name: str) -> checks.LintContext:
+        calls.append(name)
+        return checks.LintContext(errors={f"error-{name}"})
+
+    first = shared.run("key", False, lambda: compute("first"))
+    second = shared.run("key", False, lambda: compute("second"))
+    other = shared.run("other-key", False, lambda: compute("other"))
+
+    assert calls == ["first", "other"]
+    assert second is first
+    assert other.errors == {"error-other"}
+
+
+def test_shared_findings_persist_only_when_asked() -> None:
+    stored: dict[str, checks.LintContext] = {}
+    shared = checks.SharedFindings(load=stored.get, store=stored.__setitem__)
+
+    shared.run("static", True, lambda: checks.LintContext(errors={"static-error"}))
+    shared.run("network", False, lambda: checks.LintContext(errors={"network-error"}))
+    assert list(stored) == ["static"]
+
+    reloaded = checks.SharedFindings(load=stored.get, store=stored.__setitem__)
+    found = reloaded.run("static", True, lambda: pytest.fail("found in the store"))
+    assert found.errors == {"static-error"}
+
+
+class SharedRefCheck(RefCheck):
+    share_ref_findings = True
+
+    def _shared_findings_key(self, ref: str) -> str | None:
+        # Every arch of an app has the same content
+        return "/".join(ref.split("/")[:2])
+
+
+checks.ALL.remove(SharedRefCheck)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_for_each_ref_shares_findings_of_equal_refs(jobs: int) -> None:
+    refs = {
+        "app/org.flathub.App/x86_64/stable",
+        "app/org.flathub.App/aarch64/stable",
+        "app/org.flathub.Other/x86_64/stable",
+    }
+    checked: list[str] = []
+    lock = threading.Lock()
+
+    def run(check: SharedRefCheck, ref: str) -> None:
+        with lock:
+            checked.append(ref)
+        check._check_ref(ref)
+
+    context = checks.LintContext(jobs=jobs, shared_findings=checks.SharedFindings())
+    check = SharedRefCheck(context)
+    check._for_each_ref(refs, run)
+
+    assert len(checked) == 2
+    assert {ref.split("/")[1] for ref in checked} == {"org.flathub.App", "org.flathub.Other"}
+    assert len(check.errors) == 2
+    assert len(check.info) == 2
@@ -0,0 +1,242 @@
+import ast
+import importlib.util
+import io
+import json
+import os
+import pkgutil
+import stat
+import sys
+import threading
+from collections.abc import Callable, Iterator
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+import requests
+
+import flatpak_builder_lint
+from flatpak_builder_lint import client, config, daemon, domainutils
+
+# Taken before the autouse fixture replaces it with a mock
+get_remote_exceptions_github = domainutils.get_remote_exceptions_github
+
+
+@pytest.fixture
+def serve(tmp_path: Any) -> Iterator[Callable[[Callable[[dict[str, Any]], Any]], str]]:
+    servers: list[daemon.LintServer] = []
+
+    def start(lint: Callable[[dict[str, Any]], Any]) -> str:
+        socket_path = str(tmp_path / "lint.sock")
+        server = daemon.LintServer(socket_path, lint)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return socket_path
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _run_client(argv: list[str]) -> tuple[int | None, str]:
+    buf = io.StringIO()
+    with (
+        patch.object(sys, "argv", ["flatpak-builder-lint-client", *argv]),
+        patch("sys.stdout", buf),
+        pytest.raises(SystemExit) as exc,
+    ):
+        client.main()
+    code = exc.value.code
+    assert code is None or isinstance(code, int)
+    return code, buf.getvalue()
+
+
+def test_client_prints_daemon_results(serve: Any, tmp_path: Any) -> None:
+    requests: list[dict[str, Any]] = []
+
+    def lint(request: dict[str, Any]) -> Any:
+        requests.append(request)
+        return {"errors": ["finish-args-not-defined"]}
+
+    socket_path = serve(lint)
+    manifest = tmp_path / "com.example.App.json"
+    code, out = _run_client(
+        [
+            "--socket",
+            socket_path,
+            "--jobs",
+            "2",
+            "--ref",
+            "app/x/x86_64/stable",
+            "manifest",
+            str(manifest),
+        ]
+    )
+
+    assert code == 1
+    assert json.loads(out) == {"errors": ["finish-args-not-defined"]}
+    assert requests[0]["kind"] == "manifest"
+    assert requests[0]["path"] == str(manifest)
+    assert requests[0]["options"]["jobs"] == 2
+    assert requests[0]["options"]["repo_primary_refs"] == ["app/x/x86_64/stable"]
+
+
+def test_client_batch_reports_daemon_exceptions(serve: Any, tmp_path: Any) -> None:
+    def lint(request: dict[str, Any]) -> Any:
+        if request["path"].endswith("broken.json"):
+            raise OSError("No such manifest file")
+        return {}
+
+    socket_path = serve(lint)
+    batch = tmp_path / "paths.txt"
+    batch.write_text(f"{tmp_path}/broken.json\n{tmp_path}/fine.json\n")
+    code, out = _run_client(["--socket", socket_path, "--batch", str(batch), "manifest"])
+
+    lines = [json.loads(line) for line in out.splitlines()]
+    assert code == 1
+    assert lines == [
+        {"path": f"{tmp_path}/broken.json", "exception": "OSError: No such manifest file"},
+        {"path": f"{tmp_path}/fine.json", "results": {}},
+    ]
+
+
+def test_client_environment_is_forwarded(serve: Any, tmp_path: Any) -> None:
+    seen: list[str | None] = []
+
+    def lint(_request: dict[str, Any]) -> Any:
+        seen.append(os.environ.get("REPO"))
+        return {}
+
+    socket_path = serve(lint)
+    with patch.dict(os.environ, {"REPO": "https://github.com/flathub/com.example.App"}):
+        _run_client(["--socket", socket_path, "manifest", str(tmp_path / "x.json")])
+    with patch.dict(os.environ, clear=False):
+        os.environ.pop("REPO", None)
+        _run_client(["--socket", socket_path, "manifest", str(tmp_path / "x.json")])
+
+    assert seen == ["https://github.com/flathub/com.example.App", None]
+
+
+def test_lint_flags_are_read_per_request(serve: Any, tmp_path: Any) -> None:
+    seen: list[tuple[bool, bool, bool]] = []
+
+    def lint(_request: dict[str, Any]) -> Any:
+        seen.append(
+            (
+                config.is_debug(),
+                config.skip_eolruntime_checks(),
+                config.skip_policy_enforcement(),
+            )
+        )
+        return {}
+
+    socket_path = serve(lint)
+    for flags in ("skip-eol-runtime-checks,skip-policy-enforcement", "debug"):
+        with patch.dict(os.environ, {"FLATPAK_BUILDER_LINT": flags}):
+            _run_client(["--socket", socket_path, "manifest", str(tmp_path / "x.json")])
+
+    assert seen == [(False, True, True), (True, False, False)]
+
+
+def test_client_without_daemon_exits_nonzero(tmp_path: Any) -> None:
+    code, _ = _run_client(["--socket", str(tmp_path / "missing.sock"), "manifest", "x.json"])
+    assert code == 2
+
+
+def test_artifact_caches_are_cleared_per_request(serve: Any, tmp_path: Any) -> None:
+    socket_path = serve(lambda _request: {})
+    with patch.object(daemon, "ARTIFACT_CACHES", [cache := _FakeCache()]):
+        _run_client(["--socket", socket_path, "manifest", str(tmp_path / "x.json")])
+        _run_client(["--socket", socket_path, "manifest", str(tmp_path / "x.json")])
+    assert cache.cleared == 2
+
+
+# Only read the package itself, are keyed by file modification times or
+# hold no data, they are kept for the lifetime of the daemon
+PROCESS_CACHES = {
+    "flatpak_builder_lint.appstream._load_document",
+    "flatpak_builder_lint.checks.jsonschema.load_schema",
+    "flatpak_builder_lint.checks.metainfo._validate_executor",
+    "flatpak_builder_lint.prefixmatch.compile_prefixes",
+    "flatpak_builder_lint.resultcache.linter_digest",
+    "flatpak_builder_lint.validationcache._version_output",
+}
+
+
+def test_every_cache_is_cleared_or_kept_on_purpose() -> None:
+    cleared = {f"{func.__module__}.{func.__name__}" for func in daemon.ARTIFACT_CACHES}
+    cleared |= {f"{func.__module__}.{func.__name__}" for func in daemon.NETWORK_CACHES}
+
+    # Read from the source, some of the functions are mocked by fixtures
+    found = set()
+    for info in pkgutil.walk_packages(flatpak_builder_lint.__path__, "flatpak_builder_lint."):
+        spec = importlib.util.find_spec(info.name)
+        assert spec is not None and spec.origin is not None
+        with open(spec.origin, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef) and any(
+                "cache" in ast.unparse(decorator) for decorator in node.decorator_list
+            ):
+                found.add(f"{info.name}.{node.name}")
+
+    assert found == cleared | PROCESS_CACHES
+
+
+def test_socket_is_owner_only_when_bound(tmp_path: Any) -> None:
+    socket_path = str(tmp_path / "lint.sock")
+    modes = []
+    server_bind = daemon.LintServer.server_bind
+
+    def bind(server: daemon.LintServer) -> None:
+        server_bind(server)
+        modes.append(stat.S_IMODE(os.stat(socket_path).st_mode))
+
+    with (
+        patch.object(daemon.LintServer, "server_bind", bind),
+        patch.object(daemon.LintServer, "serve_forever"),
+    ):
+        daemon.serve(socket_path, lambda _request: {})
+
+    assert modes
+    assert not modes[0] & 0o077
+
+
+def test_remote_exceptions_are_fetched_per_request(serve: Any, tmp_path: Any) -> None:
+    fetched: list[str] = []
+
+    def lint(_request: dict[str, Any]) -> Any:
+        return sorted(get_remote_exceptions_github("com.example.App", None))
+
+    def get(url: str, **_kwargs: Any) -> Any:
+        fetched.append(url)
+        raise requests.exceptions.ConnectionError("offline")
+
+    socket_path = serve(lint)
+    with patch("flatpak_builder_lint.domainutils.session.get", side_effect=get):
+        for _ in range(2):
+            _run_client(["--socket", socket_path, "manifest", str(tmp_path / "x.json")])
+
+    assert len(fetched) == 2
+
+
+def test_stale_socket_is_removed(tmp_path: Any) -> None:
+    socket_path = tmp_path / "lint.sock"
+    socket_path.write_text("")
+    daemon.remove_stale_socket(str(socket_path))
+    assert not socket_path.exists()
+
+
+def test_running_daemon_is_not_replaced(serve: Any) -> None:
+    socket_path = serve(lambda _request: {})
+    with pytest.raises(RuntimeError, match="already listening"):
+        daemon.remove_stale_socket(socket_path)
+
+
+class _FakeCache:
+    def __init__(self) -> None:
+        self.cleared = 0
+
+    def cache_clear(self) -> None:
+        self.cleared += 1
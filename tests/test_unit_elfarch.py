@@ -0,0 +1,39 @@
+import struct
+
+import pytest
+
+from flatpak_builder_lint.checks import elfarch
+
+
+def elf_header(e_machine: int, big_endian: bool = False) -> bytes:
+    byte_order = ">" if big_endian else "<"
+    ident = b"\x7fELF" + bytes([2, 2 if big_endian else 1, 1]) + bytes(9)
+    return ident + struct.pack(f"{byte_order}2H", 2, e_machine)
+
+
+@pytest.mark.parametrize(
+    ("header", "arch"),
+    [
+        (elf_header(0x3E), "x86_64"),
+        (elf_header(0xB7), "aarch64"),
+        (elf_header(0xF3), "riscv64"),
+        (elf_header(0xB7, big_endian=True), "aarch64"),
+        (elf_header(0x28), None),
+        (elf_header(0x3E)[:19], None),
+        (b"#!/bin/sh\n" + bytes(10), None),
+    ],
+)
+def test_get_header_arch(header: bytes, arch: str | None) -> None:
+    assert elfarch.get_header_arch(header) == arch
+
+
+def test_report_mixed_arches() -> None:
+    check = elfarch.ELFArchCheck()
+    check._report(
+        "com.example.App/x86_64/stable", {"files/bin/a": "aarch64", "files/lib/b.so": "riscv64"}
+    )
+    assert check.errors == {"elf-arch-multiple-found", "elf-arch-not-found"}
+
+    check = elfarch.ELFArchCheck()
+    check._report("com.example.App/x86_64/stable", {"files/bin/a": "x86_64"})
+    assert not check.errors
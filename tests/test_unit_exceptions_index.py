@@ -0,0 +1,82 @@
+import json
+import os
+from importlib.resources import files
+from typing import Any
+
+from flatpak_builder_lint import cli, exceptions_index, staticfiles
+
+EXCEPTIONS_DATA = {
+    "org.flathub.first.App": {
+        "stable": {"finish-args-flatpak-spawn-access": "Needed for the terminal"},
+    },
+    "org.flathub.second.App": {
+        "*": {"finish-args-host-filesystem-access": "Predates the linter rule"},
+        "beta": {"finish-args-arbitrary-dbus-access": "Only beta"},
+    },
+}
+
+
+def _write(path: Any, data: dict[str, Any]) -> None:
+    path.write_text(json.dumps(data, indent=4))
+
+
+def test_lookup_returns_app_entry(tmp_path: Any) -> None:
+    index = str(tmp_path / "index.sqlite")
+    exceptions_index.sync_bytes(index, json.dumps(EXCEPTIONS_DATA).encode())
+
+    assert (
+        exceptions_index.lookup(index, "org.flathub.second.App")
+        == (EXCEPTIONS_DATA["org.flathub.second.App"])
+    )
+    assert exceptions_index.lookup(index, "org.flathub.missing.App") == {}
+
+
+def test_sync_bytes_skips_unchanged_content(tmp_path: Any) -> None:
+    index = str(tmp_path / "index.sqlite")
+    content = json.dumps(EXCEPTIONS_DATA).encode()
+
+    assert exceptions_index.sync_bytes(index, content)
+    assert not exceptions_index.sync_bytes(index, content)
+
+
+def test_sync_file_skips_unmodified_file(tmp_path: Any) -> None:
+    index = str(tmp_path / "index.sqlite")
+    source = tmp_path / "exceptions.json"
+    _write(source, EXCEPTIONS_DATA)
+
+    assert exceptions_index.sync_file(index, str(source))
+    assert not exceptions_index.sync_file(index, str(source))
+
+
+def test_sync_rewrites_only_changed_apps(tmp_path: Any) -> None:
+    index = str(tmp_path / "index.sqlite")
+    source = tmp_path / "exceptions.json"
+    _write(source, EXCEPTIONS_DATA)
+    exceptions_index.sync_file(index, str(source))
+
+    updated = {
+        "org.flathub.first.App": EXCEPTIONS_DATA["org.flathub.first.App"],
+        "org.flathub.third.App": {"stable": {"appid-url-not-reachable": "Site is down"}},
+    }
+    _write(source, updated)
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    exceptions_index.sync_file(index, str(source))
+
+    assert exceptions_index.lookup(index, "org.flathub.second.App") == {}
+    assert (
+        exceptions_index.lookup(index, "org.flathub.third.App")
+        == (updated["org.flathub.third.App"])
+    )
+    assert (
+        exceptions_index.lookup(index, "org.flathub.first.App")
+        == (EXCEPTIONS_DATA["org.flathub.first.App"])
+    )
+
+
+def test_local_exceptions_match_bundled_file() -> None:
+    with files(staticfiles).joinpath("exceptions.json").open(encoding="utf-8") as f:
+        bundled = json.load(f)
+    appid = next(iter(bundled))
+
+    assert cli.get_local_exceptions(appid, None) == {k for v in bundled[appid].values() for k in v}
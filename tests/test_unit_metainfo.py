@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from unittest.mock import patch
+
+from flatpak_builder_lint import appstream, checks
+from flatpak_builder_lint.checks import metainfo
+
+APPID = "org.flathub.App"
+
+
+def _report(file: str) -> appstream.ValidationReport:
+    name = file.rsplit("/", 1)[-1]
+    return {
+        "passed": False,
+        "filename": name,
+        "issues": [{"tag": "some-issue", "severity": "error", "line": 1, "explanation": None}],
+        "messages": [],
+    }
+
+
+def _write_metainfo(tmp_path: Any, *names: str) -> str:
+    share = tmp_path / "share"
+    (share / "metainfo").mkdir(parents=True)
+    for name in names:
+        (share / "metainfo" / name).write_text(f"<component><id>{APPID}</id></component>")
+    return str(share)
+
+
+def test_files_are_validated_concurrently(tmp_path: Any) -> None:
+    names = [f"{APPID}.metainfo.xml", f"{APPID}.first.metainfo.xml", f"{APPID}.second.metainfo.xml"]
+    share = _write_metainfo(tmp_path, *names)
+    barrier = threading.Barrier(3, timeout=10)
+
+    def validate(file: str) -> appstream.ValidationReport:
+        barrier.wait()
+        return _report(file)
+
+    check = metainfo.MetainfoCheck(checks.LintContext())
+    with patch.object(appstream, "validate_metainfo", side_effect=validate):
+        check._validate(share, APPID, "app")
+
+    assert check.errors == {"appstream-failed-validation"}
+    assert check.appstream == {f"E:{name}:some-issue:1" for name in names}
+
+
+def test_reports_keep_file_order(tmp_path: Any) -> None:
+    files = [str(tmp_path / f"{i}.metainfo.xml") for i in range(4)]
+
+    def validate(file: str) -> appstream.ValidationReport:
+        # Earlier files finish last
+        time.sleep(0.02 * (len(files) - files.index(file)))
+        return _report(file)
+
+    with patch.object(appstream, "validate_metainfo", side_effect=validate):
+        reports = metainfo.validate_metainfo_files(files)
+
+    assert [r["filename"] for r in reports] == [f.rsplit("/", 1)[-1] for f in files]
+
+
+def test_concurrent_checks_share_the_validator_limit(tmp_path: Any) -> None:
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def validate(file: str) -> appstream.ValidationReport:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return _report(file)
+
+    batches = [[str(tmp_path / f"{i}-{j}.metainfo.xml") for j in range(4)] for i in range(4)]
+    with (
+        patch.object(appstream, "validate_metainfo", side_effect=validate),
+        ThreadPoolExecutor(max_workers=len(batches)) as executor,
+    ):
+        list(executor.map(metainfo.validate_metainfo_files, batches))
+
+    assert 1 < peak <= metainfo.VALIDATE_THREADS
+
+
+def test_excepted_files_are_not_validated(tmp_path: Any) -> None:
+    share = _write_metainfo(tmp_path, f"{APPID}.metainfo.xml")
+    context = checks.LintContext(exceptions=frozenset({"appstream-failed-validation"}))
+
+    check = metainfo.MetainfoCheck(context)
+    with patch.object(appstream, "validate_metainfo") as validate:
+        check._validate(share, APPID, "app")
+
+    validate.assert_not_called()
+    assert not check.errors
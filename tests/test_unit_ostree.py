@@ -0,0 +1,459 @@
+import gzip
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import ClassVar
+from unittest.mock import patch
+
+import pytest
+
+from flatpak_builder_lint import checks, cli, config, ostree
+from flatpak_builder_lint.checks.screenshots import ScreenshotsCheck
+from tests.testlib import commit_to_repo
+
+REF = "app/com.github.flathub.desktop/x86_64/stable"
+
+
+@pytest.fixture
+def repo_path(tmp_testdir: str) -> Iterator[str]:
+    path = os.path.join(tmp_testdir, "ostree-repo")
+    commit_to_repo("tests/builddir/appid", path)
+    yield path
+    ostree.close_repos()
+
+
+def test_get_repo_reuses_handle_per_thread(repo_path: str) -> None:
+    repo = ostree.get_repo(repo_path)
+    assert ostree.get_repo(repo_path) is repo
+
+    other: list[object] = []
+    thread = threading.Thread(target=lambda: other.append(ostree.get_repo(repo_path)))
+    thread.start()
+    thread.join()
+    assert other[0] is not repo
+
+    ostree.close_repo(repo_path)
+    assert ostree.get_repo(repo_path) is not repo
+
+
+def test_resolve_rev_is_memoized(repo_path: str) -> None:
+    rev = ostree.resolve_rev(repo_path, REF)
+    assert rev == ostree.get_ref_checksums(repo_path)[REF]
+
+    with patch.object(ostree, "get_repo") as get_repo:
+        assert ostree.resolve_rev(repo_path, REF) == rev
+    get_repo.assert_not_called()
+
+    assert ostree.resolve_rev(repo_path, "app/does.not.Exist/x86_64/stable") is None
+
+
+def test_extract_subpath_opens_repo_once(repo_path: str, tmp_path: str) -> None:
+    with patch.object(ostree, "open_ostree_repo", wraps=ostree.open_ostree_repo) as open_repo:
+        for name in ("one", "two"):
+            ostree.extract_subpath(repo_path, REF, "/metadata", os.path.join(tmp_path, name))
+
+    assert open_repo.call_count == 1
+    assert os.path.isfile(os.path.join(tmp_path, "two", "metadata"))
+
+
+@pytest.fixture
+def tree_repo(tmp_path: Path) -> Iterator[str]:
+    build = tmp_path / "build"
+    share = build / "files" / "share"
+    (share / "applications").mkdir(parents=True)
+    (share / "icons" / "hicolor" / "scalable" / "apps").mkdir(parents=True)
+    (share / "icons" / "hicolor" / "64x64" / "apps").mkdir(parents=True)
+    shutil.copy("tests/builddir/appid/metadata", build / "metadata")
+    (build / "files" / "flathub.json").write_text('{"only-arches": ["x86_64"]}')
+    (share / "applications" / "com.github.flathub.desktop.desktop").write_text("[Desktop Entry]\n")
+    (share / "applications" / ".hidden").write_text("")
+    (share / "icons" / "hicolor" / "scalable" / "apps" / "app.svg").write_text("<svg/>")
+    (share / "icons" / "hicolor" / "64x64" / "apps" / "app.png").write_bytes(b"\x89PNG")
+    os.symlink("applications", share / "apps")
+    os.symlink("/etc/passwd", share / "outside")
+
+    path = str(tmp_path / "repo")
+    commit_to_repo(str(build), path)
+    yield path
+    ostree.close_repos()
+
+
+def test_commit_tree_reads_files(tree_repo: str) -> None:
+    tree = ostree.get_commit_tree(tree_repo, REF)
+
+    with tree.open("metadata") as f, open("tests/builddir/appid/metadata", "rb") as expected:
+        assert f.read() == expected.read()
+
+    assert tree.listdir("files/share/applications") == [
+        ".hidden",
+        "com.github.flathub.desktop.desktop",
+    ]
+    assert tree.isdir("files/share/apps")
+    assert tree.isfile("files/share/apps/com.github.flathub.desktop.desktop")
+    assert not tree.exists("files/share/outside")
+    assert not tree.exists("files/missing")
+
+    st = tree.stat("files/share/icons/hicolor/64x64/apps/app.png")
+    assert stat.S_ISREG(st.st_mode)
+    assert st.st_size == 4
+    assert stat.S_ISLNK(tree.stat("files/share/apps", follow_symlinks=False).st_mode)
+
+    with pytest.raises(FileNotFoundError):
+        tree.open("files/missing")
+    with pytest.raises(IsADirectoryError):
+        tree.open("files/share")
+
+
+def test_commit_tree_glob(tree_repo: str) -> None:
+    tree = ostree.get_commit_tree(tree_repo, REF)
+
+    assert tree.glob("files/share/icons/hicolor/[!scalable]*/apps/*") == [
+        "files/share/icons/hicolor/64x64/apps/app.png"
+    ]
+    assert tree.glob("files/share/applications/*") == [
+        "files/share/applications/com.github.flathub.desktop.desktop"
+    ]
+    assert tree.glob("files/share/*/com.github.flathub.desktop.desktop") == [
+        "files/share/applications/com.github.flathub.desktop.desktop",
+        "files/share/apps/com.github.flathub.desktop.desktop",
+    ]
+    assert tree.glob("files/missing/*") == []
+
+
+def test_metadata_and_flathub_json_from_commit(tree_repo: str) -> None:
+    assert ostree.get_ref_metadata(tree_repo, REF)["name"] == "com.github.flathub.desktop"
+    assert ostree.get_flathub_json(tree_repo, REF) == {"only-arches": ["x86_64"]}
+
+    with pytest.raises(FileNotFoundError):
+        ostree.get_commit_tree(tree_repo, "app/does.not.Exist/x86_64/stable")
+
+
+def test_commit_tree_walk(tree_repo: str) -> None:
+    tree = ostree.get_commit_tree(tree_repo, REF)
+    walked = {top: (dirs, files) for top, dirs, files in tree.walk("files/share/icons")}
+
+    assert walked["files/share/icons/hicolor"] == (["64x64", "scalable"], [])
+    assert walked["files/share/icons/hicolor/64x64/apps"] == ([], ["app.png"])
+
+
+def test_workspace_checks_out_subpaths_once(tree_repo: str) -> None:
+    subpaths = ("files/share/applications", "files/share/appdata")
+
+    with (
+        patch.object(ostree, "extract_subpath", wraps=ostree.extract_subpath) as extract,
+        ostree.CheckoutWorkspace(tree_repo) as workspace,
+    ):
+        ref_dir = workspace.checkout(REF, subpaths)
+        assert workspace.checkout(REF, subpaths[:1]) == ref_dir
+
+        assert os.path.isfile(
+            os.path.join(ref_dir, "files/share/applications/com.github.flathub.desktop.desktop")
+        )
+        # Subpaths missing from the commit are empty directories
+        assert os.listdir(os.path.join(ref_dir, "files/share/appdata")) == []
+
+    assert extract.call_count == 2
+    assert not os.path.exists(ref_dir)
+
+
+def test_workspace_hardlinks_from_bare_user_only_repo(tmp_path: Path) -> None:
+    build = tmp_path / "build"
+    (build / "files" / "share" / "applications").mkdir(parents=True)
+    shutil.copy("tests/builddir/appid/metadata", build / "metadata")
+    (build / "files" / "share" / "applications" / "app.desktop").write_text("[Desktop Entry]\n")
+
+    repo_path = str(tmp_path / "repo")
+    subprocess.run(["ostree", "init", f"--repo={repo_path}", "--mode=bare-user-only"], check=True)
+    subprocess.run(
+        ["ostree", "commit", f"--repo={repo_path}", f"--branch={REF}", str(build)], check=True
+    )
+
+    assert ostree.get_scratch_dir(repo_path) == os.path.join(repo_path, "tmp")
+    with ostree.CheckoutWorkspace(repo_path) as workspace:
+        ref_dir = workspace.checkout(REF, ("files/share/applications",))
+        st = os.stat(os.path.join(ref_dir, "files/share/applications/app.desktop"))
+        assert st.st_nlink > 1
+    ostree.close_repos()
+
+
+def test_archive_repo_scratch_prefers_tmpfs(
+    repo_path: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv("TMPDIR", raising=False)
+    monkeypatch.setattr(ostree, "find_tmpfs", lambda: str(tmp_path))
+    assert ostree.get_scratch_dir(repo_path) == str(tmp_path)
+
+    monkeypatch.setattr(ostree, "find_tmpfs", lambda: None)
+    assert ostree.get_scratch_dir(repo_path) == tempfile.gettempdir()
+
+
+def test_ref_metadata_from_commit_metadata(tmp_path: Path) -> None:
+    build = tmp_path / "build"
+    build.mkdir()
+    shutil.copy("tests/builddir/appid/metadata", build / "metadata")
+    xa_metadata = (
+        "[Application]\n"
+        "name=org.example.FromCommit\n"
+        "runtime=org.freedesktop.Platform/x86_64/24.08\n"
+    )
+
+    repo_path = str(tmp_path / "repo")
+    subprocess.run(["ostree", "init", f"--repo={repo_path}", "--mode=archive-z2"], check=True)
+    subprocess.run(
+        [
+            "ostree",
+            "commit",
+            f"--repo={repo_path}",
+            f"--branch={REF}",
+            f"--add-metadata-string=xa.metadata={xa_metadata}",
+            str(build),
+        ],
+        check=True,
+    )
+
+    with patch.object(ostree, "_read_commit_tree") as read_commit_tree:
+        metadata = ostree.get_ref_metadata(repo_path, REF)
+    read_commit_tree.assert_not_called()
+
+    assert metadata["name"] == "org.example.FromCommit"
+    assert metadata["runtime"] == "org.freedesktop.Platform/x86_64/24.08"
+    assert ostree.get_ref_metadata(repo_path, REF) is metadata
+    ostree.close_repos()
+
+
+def test_commit_tree_checksum_matches_equal_subtrees(tmp_path: Path) -> None:
+    repo_path = str(tmp_path / "repo")
+    for arch, icon in (("x86_64", b"<svg/>"), ("aarch64", b"<svg/>"), ("i386", b"<svg></svg>")):
+        build = tmp_path / arch
+        apps = build / "files" / "share" / "icons" / "hicolor" / "scalable" / "apps"
+        apps.mkdir(parents=True)
+        (apps / "com.github.flathub.desktop.svg").write_bytes(icon)
+        (build / "files" / "share" / "arch").write_text(arch)
+        metadata = Path("tests/builddir/appid/metadata").read_text()
+        (build / "metadata").write_text(metadata.replace("x86_64", arch))
+        commit_to_repo(str(build), repo_path)
+
+    def icons_checksum(arch: str) -> str:
+        tree = ostree.get_commit_tree(repo_path, f"app/com.github.flathub.desktop/{arch}/stable")
+        return tree.checksum("files/share/icons")
+
+    assert icons_checksum("x86_64") == icons_checksum("aarch64")
+    assert icons_checksum("x86_64") != icons_checksum("i386")
+
+    x86_64 = ostree.get_commit_tree(repo_path, REF)
+    aarch64 = ostree.get_commit_tree(repo_path, "app/com.github.flathub.desktop/aarch64/stable")
+    assert x86_64.checksum("files/share") != aarch64.checksum("files/share")
+    assert x86_64.checksum("files/share/arch") != aarch64.checksum("files/share/arch")
+    with pytest.raises(FileNotFoundError):
+        x86_64.checksum("files/share/metainfo")
+    ostree.close_repos()
+
+
+def test_ref_download_sizes_from_commit_metadata(tmp_path: Path) -> None:
+    build = tmp_path / "build"
+    build.mkdir()
+    shutil.copy("tests/builddir/appid/metadata", build / "metadata")
+    # Flatpak stores the size big endian
+    stored = int.from_bytes((123456789).to_bytes(8, "big"), sys.byteorder)
+
+    repo_path = str(tmp_path / "repo")
+    subprocess.run(["ostree", "init", f"--repo={repo_path}", "--mode=archive-z2"], check=True)
+    subprocess.run(
+        [
+            "ostree",
+            "commit",
+            f"--repo={repo_path}",
+            f"--branch={REF}",
+            f"--add-metadata=xa.download-size=uint64 {stored}",
+            str(build),
+        ],
+        check=True,
+    )
+    subprocess.run(
+        ["ostree", "commit", f"--repo={repo_path}", "--branch=screenshots/x86_64", str(build)],
+        check=True,
+    )
+
+    assert ostree.get_ref_download_sizes(repo_path) == {REF: 123456789}
+    ostree.close_repos()
+
+
+def test_commit_tree_read_heads(tree_repo: str) -> None:
+    tree = ostree.get_commit_tree(tree_repo, REF)
+
+    assert list(tree.read_heads("files/share", 4)) == [
+        ("files/share/applications/.hidden", b""),
+        ("files/share/applications/com.github.flathub.desktop.desktop", b"[Des"),
+        ("files/share/icons/hicolor/64x64/apps/app.png", b"\x89PNG"),
+        ("files/share/icons/hicolor/scalable/apps/app.svg", b"<svg"),
+    ]
+    # Only the top is followed when it is a symlink
+    assert list(tree.read_heads("files/share/apps", 4)) == [
+        ("files/share/apps/.hidden", b""),
+        ("files/share/apps/com.github.flathub.desktop.desktop", b"[Des"),
+    ]
+    assert not list(tree.read_heads("files/missing", 4))
+
+
+class RecordingHandler(SimpleHTTPRequestHandler):
+    requested: ClassVar[list[str]] = []
+
+    def do_GET(self) -> None:
+        self.requested.append(self.path)
+        super().do_GET()
+
+    def log_message(self, *_args: object) -> None:
+        pass
+
+
+@contextmanager
+def serve_repo(repo: str) -> Iterator[str]:
+    RecordingHandler.requested.clear()
+    handler = partial(RecordingHandler, directory=repo)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def remote_repo_url(
+    tree_repo: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[str]:
+    monkeypatch.setattr(config, "REMOTE_REPO_CACHE_DIR", str(tmp_path / "remote-repos"))
+    with serve_repo(tree_repo) as url:
+        yield url
+
+
+def test_remote_repo_fetches_only_subpaths(remote_repo_url: str, tree_repo: str) -> None:
+    subpaths = ("metadata", "files/flathub.json", "files/share/applications")
+
+    with ostree.remote_repo(remote_repo_url, {REF}, subpaths) as repo_path:
+        assert ostree.get_refs(repo_path, None) == {REF}
+        assert ostree.get_flathub_json(repo_path, REF) == {"only-arches": ["x86_64"]}
+        assert ostree.get_ref_metadata(repo_path, REF)["name"] == "com.github.flathub.desktop"
+        tree = ostree.get_commit_tree(repo_path, REF)
+        assert tree.listdir("files/share/applications") == [
+            ".hidden",
+            "com.github.flathub.desktop.desktop",
+        ]
+
+    icons = ostree.get_commit_tree(tree_repo, REF).checksum("files/share/icons").split(":")[0]
+    fetched = {os.path.basename(p) for p in RecordingHandler.requested}
+    assert f"{icons[2:]}.dirtree" not in fetched
+    assert sum(p.endswith(".filez") for p in fetched) == 4
+    assert not os.path.exists(repo_path)
+
+    # Everything is in the cache already
+    RecordingHandler.requested.clear()
+    with ostree.remote_repo(remote_repo_url, {REF}, subpaths) as repo_path:
+        assert ostree.get_flathub_json(repo_path, REF) == {"only-arches": ["x86_64"]}
+    assert not any(p.startswith("/objects/") for p in RecordingHandler.requested)
+
+
+SCREENSHOTS_CATALOGUE = """<?xml version="1.0" encoding="UTF-8"?>
+<components version="0.8" origin="flatpak">
+  <component type="desktop-application">
+    <id>com.github.flathub.desktop</id>
+    <screenshots>
+      <screenshot type="default">
+        <image>https://dl.flathub.org/media/com/github/flathub.desktop/screenshot.png</image>
+      </screenshot>
+    </screenshots>
+  </component>
+</components>
+"""
+
+
+@pytest.fixture
+def screenshots_repo_url(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[str]:
+    build = tmp_path / "build"
+    share = build / "files" / "share"
+    (share / "app-info" / "xmls").mkdir(parents=True)
+    (share / "metainfo").mkdir(parents=True)
+    (build / "screenshots" / "com.github.flathub.desktop").mkdir(parents=True)
+    shutil.copy("tests/builddir/appid/metadata", build / "metadata")
+    with gzip.open(share / "app-info" / "xmls" / "com.github.flathub.desktop.xml.gz", "wb") as f:
+        f.write(SCREENSHOTS_CATALOGUE.encode())
+    (share / "metainfo" / "com.github.flathub.desktop.metainfo.xml").write_text(
+        SCREENSHOTS_CATALOGUE.split("\n", 2)[2].replace("</components>", "")
+    )
+    (build / "screenshots" / "com.github.flathub.desktop" / "screenshot.png").write_bytes(
+        b"\x89PNG"
+    )
+
+    path = str(tmp_path / "repo")
+    commit_to_repo(str(build), path)
+    monkeypatch.setattr(config, "REMOTE_REPO_CACHE_DIR", str(tmp_path / "remote-repos"))
+    with serve_repo(path) as url:
+        yield url
+    ostree.close_repos()
+
+
+def _check_screenshots(repo_path: str) -> set[str]:
+    check = ScreenshotsCheck(checks.LintContext(repo_primary_refs={REF}))
+    check.check_repo(repo_path)
+    return check.errors
+
+
+def test_remote_repo_skips_screenshots_that_were_not_fetched(screenshots_repo_url: str) -> None:
+    with ostree.remote_repo(screenshots_repo_url, {REF}, cli.get_repo_subpaths()) as repo_path:
+        assert ostree.get_refs(repo_path, None) == {REF}
+        assert ostree.is_partial_commit(repo_path, REF)
+        assert "appstream-screenshots-not-mirrored-in-ostree" not in _check_screenshots(repo_path)
+
+
+def test_remote_repo_fetches_screenshots_ref_whole(screenshots_repo_url: str) -> None:
+    refs = {REF, "screenshots/x86_64"}
+
+    with ostree.remote_repo(screenshots_repo_url, refs, cli.get_repo_subpaths()) as repo_path:
+        assert not ostree.is_partial_commit(repo_path, "screenshots/x86_64")
+        tree = ostree.get_commit_tree(repo_path, "screenshots/x86_64")
+        assert tree.isfile("com.github.flathub.desktop/screenshot.png")
+        errors = _check_screenshots(repo_path)
+
+    assert "appstream-screenshots-not-mirrored-in-ostree" not in errors
+    assert "appstream-screenshots-files-not-found-in-ostree" not in errors
+
+
+@pytest.mark.skipif(shutil.which("flatpak") is None, reason="flatpak is not installed")
+def test_bundle_repo(tree_repo: str, tmp_path: Path) -> None:
+    bundle = str(tmp_path / "app.flatpak")
+    subprocess.run(
+        [
+            "flatpak",
+            "build-bundle",
+            "--arch=x86_64",
+            tree_repo,
+            bundle,
+            "com.github.flathub.desktop",
+            "stable",
+        ],
+        check=True,
+    )
+
+    ref, rev = ostree.read_bundle_ref(bundle)
+    assert ref == REF
+    assert rev == ostree.resolve_rev(tree_repo, REF)
+
+    with ostree.bundle_repo(bundle) as repo_path:
+        assert ostree.get_refs(repo_path, None) == {REF}
+        assert ostree.get_flathub_json(repo_path, REF) == {"only-arches": ["x86_64"]}
+        with ostree.CheckoutWorkspace(repo_path) as workspace:
+            ref_dir = workspace.checkout(REF, ["files/share/applications"])
+            desktop_file = f"{ref_dir}/files/share/applications/com.github.flathub.desktop.desktop"
+            assert os.stat(desktop_file).st_nlink > 1
+    assert not os.path.exists(repo_path)
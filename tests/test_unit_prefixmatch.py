@@ -0,0 +1,63 @@
+import pytest
+
+from flatpak_builder_lint import exceptions_janitor, prefixmatch
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("finish-args-x11-without-ipc", True),
+        ("finish-args-x11-without-ipc: details", True),
+        ("finish-args-arbitrary-xdg-data-access", True),
+        ("finish-args-arbitrary-autostart-access", False),
+        ("finish-args-x11", False),
+        ("module-foo-source-git-no-tag", True),
+        ("modular-build-something", False),
+        ("appid-url-not-reachable", False),
+        ("", False),
+    ],
+)
+def test_compile_prefixes(value: str, expected: bool) -> None:
+    matcher = prefixmatch.compile_prefixes(
+        frozenset(
+            {
+                "finish-args-x11-without-ipc",
+                "finish-args-arbitrary-xdg-",
+                "finish-args-arbitrary-xdg-data-access",
+                "module-",
+            }
+        )
+    )
+    assert bool(matcher.match(value)) is expected
+
+
+def test_compile_prefixes_matches_startswith() -> None:
+    prefixes = frozenset({"a", "ab", "abc-", "b.c", "b*", "x(y)", "foo-bar"})
+    matcher = prefixmatch.compile_prefixes(prefixes)
+    for value in ("a", "abc", "bxc", "b.c", "b*x", "x(y)z", "xy", "foo-ba", "foo-bar!", "z"):
+        assert bool(matcher.match(value)) is value.startswith(tuple(prefixes))
+
+
+def test_compile_prefixes_edge_cases() -> None:
+    assert prefixmatch.compile_prefixes(frozenset()).match("anything") is None
+    assert prefixmatch.compile_prefixes(frozenset({""})).match("anything")
+
+
+def test_stale_exceptions_skip_prefixes() -> None:
+    exceptions = {
+        "*",
+        "module-foo-source-git-no-tag",
+        "toplevel-no-command",
+        "finish-args-x11-without-ipc",
+        "appid-url-not-reachable",
+    }
+    stale = exceptions_janitor.get_stale_exceptions({"appid-url-not-reachable"}, exceptions)
+    assert stale == {"finish-args-x11-without-ipc"}
+
+
+def test_compile_prefixes_cache_is_bounded() -> None:
+    for i in range(200):
+        prefixmatch.compile_prefixes(frozenset({f"prefix-{i}"}))
+    info = prefixmatch.compile_prefixes.cache_info()
+    assert info.maxsize is not None
+    assert info.currsize <= info.maxsize
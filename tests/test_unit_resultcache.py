@@ -0,0 +1,149 @@
+import os
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+from flatpak_builder_lint import checks, config, ostree, resultcache
+from flatpak_builder_lint.checks.reposize import RepoSizeCheck
+from flatpak_builder_lint.cli import run_checks
+
+
+@pytest.fixture
+def builddir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(config, "RESULT_CACHE_DIR", str(tmp_path / "results"))
+    path = tmp_path / "builddir"
+    (path / "files" / "share").mkdir(parents=True)
+    (path / "metadata").write_text("[Application]\nname=com.example.App\n")
+    (path / "files" / "share" / "data.txt").write_text("one")
+    return path
+
+
+def test_input_digest_follows_content(builddir: Path) -> None:
+    first = resultcache.input_digest("builddir", str(builddir))
+    assert resultcache.input_digest("builddir", str(builddir)) == first
+
+    (builddir / "files" / "share" / "data.txt").write_text("two")
+    second = resultcache.input_digest("builddir", str(builddir))
+    assert second != first
+
+    os.symlink("data.txt", builddir / "files" / "share" / "link.txt")
+    assert resultcache.input_digest("builddir", str(builddir)) != second
+
+
+def test_manifest_digest_includes_sub_manifests(tmp_path: Path) -> None:
+    (tmp_path / "com.example.App.yaml").write_text("id: com.example.App\nmodules:\n  - sub.json\n")
+    (tmp_path / "sub.json").write_text('{"name": "sub"}')
+    path = str(tmp_path / "com.example.App.yaml")
+
+    first = resultcache.input_digest("manifest", path)
+    (tmp_path / "sub.json").write_text('{"name": "changed"}')
+    assert resultcache.input_digest("manifest", path) != first
+
+
+def test_run_checks_reuses_static_findings(builddir: Path) -> None:
+    calls: list[str] = []
+
+    class StaticCheck(checks.Check):
+        def check_build(self, path: str) -> None:
+            calls.append("static")
+            with open(os.path.join(path, "files", "share", "data.txt")) as f:
+                self.errors.add(f"static-{f.read()}")
+            self.info.add("static-info: details")
+
+    class NetworkCheck(checks.Check):
+        revalidate = True
+
+        def check_build(self, _path: str) -> None:
+            calls.append("network")
+            self.warnings.add(f"network-{len(calls)}")
+
+    checks.ALL[:] = [StaticCheck, NetworkCheck]
+
+    def lint() -> dict[str, Any]:
+        return run_checks("builddir", str(builddir), use_result_cache=True)
+
+    first = lint()
+    assert calls == ["static", "network"]
+    assert first["errors"] == ["static-one"]
+
+    second = lint()
+    assert calls == ["static", "network", "network"]
+    assert second["errors"] == ["static-one"]
+    assert second["info"] == ["static-info: details"]
+    assert second["warnings"] == ["network-3"]
+
+    (builddir / "files" / "share" / "data.txt").write_text("two")
+    third = lint()
+    assert calls[-2:] == ["static", "network"]
+    assert third["errors"] == ["static-two"]
+
+
+def test_run_checks_without_result_cache(builddir: Path) -> None:
+    calls: list[str] = []
+
+    class StaticCheck(checks.Check):
+        def check_build(self, _path: str) -> None:
+            calls.append("static")
+
+    checks.ALL[:] = [StaticCheck]
+
+    run_checks("builddir", str(builddir))
+    run_checks("builddir", str(builddir))
+
+    assert calls == ["static", "static"]
+    assert not os.path.exists(config.RESULT_CACHE_DIR)
+
+
+def test_unreadable_entry_is_a_miss(builddir: Path) -> None:
+    key = resultcache.cache_key("builddir", str(builddir), checks.LintContext())
+    resultcache.store(key, [checks.LintContext(errors={"some-error"})])
+    assert resultcache.load(key) == checks.LintContext(errors={"some-error"})
+
+    entry = Path(config.RESULT_CACHE_DIR, key[:2], f"{key}.json")
+    entry.write_text("{")
+    assert resultcache.load(key) is None
+
+
+@pytest.mark.usefixtures("builddir")
+def test_shared_findings_are_kept_across_runs() -> None:
+    context = checks.LintContext(exceptions=frozenset({"some-exception"}))
+
+    resultcache.shared_findings(context).run(
+        "subtree", True, lambda: checks.LintContext(appstream={"E:some-issue"})
+    )
+    found = resultcache.shared_findings(context).run("subtree", True, checks.LintContext)
+    assert found.appstream == {"E:some-issue"}
+
+    # Other exceptions can change what a check reports
+    missed = resultcache.shared_findings(checks.LintContext()).run(
+        "subtree", True, checks.LintContext
+    )
+    assert not missed.appstream
+
+
+@pytest.mark.usefixtures("builddir")
+def test_repo_size_follows_objects_with_unchanged_refs(tmp_path: Path) -> None:
+    repo = tmp_path / "repo"
+    (repo / "objects" / "00").mkdir(parents=True)
+    checks.ALL[:] = [RepoSizeCheck]
+
+    def lint() -> dict[str, Any]:
+        return run_checks("repo", str(repo), use_result_cache=True)
+
+    with (
+        patch.object(config, "is_flathub_pipeline", return_value=True),
+        patch.object(ostree, "get_ref_checksums", return_value={"app/x/y/z": "0" * 64}),
+        patch.object(ostree, "get_primary_refs", return_value={"app/x/y/z"}),
+        patch.object(ostree, "get_ref_download_sizes", return_value={}),
+    ):
+        assert "errors" not in lint()
+
+        # Sparse, so that it is past the limit without using the space
+        with open(repo / "objects" / "00" / "large.filez", "wb") as f:
+            f.truncate(13 * 1024**3)
+        assert lint()["errors"] == ["flatpak-repo-too-large"]
+
+        os.remove(repo / "objects" / "00" / "large.filez")
+        assert "errors" not in lint()
@@ -0,0 +1,86 @@
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+from flatpak_builder_lint import config, validationcache
+from flatpak_builder_lint.checks import desktop
+
+
+def _write(tmp_path: Any, name: str, content: str) -> str:
+    path = tmp_path / name
+    path.write_text(content)
+    return str(path)
+
+
+def test_unchanged_file_is_validated_once(tmp_path: Any) -> None:
+    path = _write(tmp_path, "org.example.App.desktop", "[Desktop Entry]\n")
+    validate = MagicMock(return_value=["error: missing key"])
+
+    for _ in range(3):
+        assert validationcache.cached("tool", "1.0", (), path, validate) == ["error: missing key"]
+
+    validate.assert_called_once()
+    stats = validationcache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+
+
+def test_key_covers_contents_version_flags_and_name(tmp_path: Any) -> None:
+    path = _write(tmp_path, "a.desktop", "[Desktop Entry]\n")
+    key = validationcache.cache_key("tool", "1.0", ("--flag",), path)
+
+    assert key == validationcache.cache_key("tool", "1.0", ("--flag",), path)
+    assert key != validationcache.cache_key("tool", "1.1", ("--flag",), path)
+    assert key != validationcache.cache_key("tool", "1.0", (), path)
+    assert key != validationcache.cache_key("other", "1.0", ("--flag",), path)
+    assert key != validationcache.cache_key(
+        "tool", "1.0", ("--flag",), _write(tmp_path, "b.desktop", "[Desktop Entry]\n")
+    )
+
+    _write(tmp_path, "a.desktop", "[Desktop Entry]\nName=App\n")
+    assert key != validationcache.cache_key("tool", "1.0", ("--flag",), path)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Any) -> None:
+    paths = [_write(tmp_path, f"{i}.xml", str(i)) for i in range(3)]
+    result = "x" * 100
+
+    with patch.object(config, "VALIDATION_CACHE_MAX_SIZE", 250):
+        validationcache.cached("tool", "1.0", (), paths[0], lambda: result)
+        validationcache.cached("tool", "1.0", (), paths[1], lambda: result)
+        # Used again, so the second entry is the oldest one
+        validationcache.cached("tool", "1.0", (), paths[0], lambda: result)
+        validationcache.cached("tool", "1.0", (), paths[2], lambda: result)
+
+    stats = validationcache.stats()
+    assert (stats["entries"], stats["evictions"]) == (2, 1)
+
+    validate = MagicMock(return_value=result)
+    validationcache.cached("tool", "1.0", (), paths[0], validate)
+    validate.assert_not_called()
+    validationcache.cached("tool", "1.0", (), paths[1], validate)
+    validate.assert_called_once()
+
+
+def test_unusable_cache_still_validates(tmp_path: Any) -> None:
+    path = _write(tmp_path, "a.xml", "<component/>")
+    blocker = _write(tmp_path, "blocker", "")
+
+    with patch.object(config, "VALIDATION_CACHE", f"{blocker}/validation.sqlite"):
+        assert validationcache.cached("tool", "1.0", (), path, lambda: [1]) == [1]
+
+
+def test_tool_version_of_missing_tool() -> None:
+    assert validationcache.tool_version("flatpak-builder-lint-missing-tool") == ""
+
+
+def test_desktop_file_validation_is_cached(tmp_path: Any) -> None:
+    path = _write(tmp_path, "org.example.App.desktop", "[Desktop Entry]\n")
+    output = f'{path}: error: required key "Type" in group "Desktop Entry" is not present\n'
+    cmd = MagicMock(returncode=1, stdout=output.encode())
+
+    with patch("flatpak_builder_lint.checks.desktop.subprocess.run", return_value=cmd) as run:
+        for _ in range(2):
+            assert desktop.validate_desktop_file(path) == [
+                'error: required key "Type" in group "Desktop Entry" is not present'
+            ]
+
+    run.assert_called_once()
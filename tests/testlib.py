@@ -8,7 +8,7 @@ import subprocess
 import tempfile
 from typing import Any
 
-from flatpak_builder_lint import checks, cli
+from flatpak_builder_lint import cli
 
 
 def create_catalogue(test_dir: str, xml_fname: str) -> None:
@@ -219,24 +219,12 @@ def commit_to_repo(builddir: str, repo_path: str) -> None:
         )
 
 
-def _reset_check_state() -> None:
-    checks.Check.errors = set()
-    checks.Check.warnings = set()
-    checks.Check.jsonschema = set()
-    checks.Check.appstream = set()
-    checks.Check.desktopfile = set()
-    checks.Check.info = set()
-    checks.Check.repo_primary_refs = set()
-
-
 def run_checks(
     path: str,
     check_type: str = "manifest",
     tmp_root: str | None = None,
     enable_exceptions: bool = False,
 ) -> dict[str, Any]:
-    _reset_check_state()
-
     if check_type == "builddir":
         return cli.run_checks("builddir", path)
 
@@ -0,0 +1,104 @@
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import timeit
+from collections.abc import Callable
+from functools import partial
+from types import ModuleType
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+# The queries catalogue.MetainfoCheck ran on the same file, each of them
+# parsed the file again
+QUERIES = (
+    "/components/component",
+    "//component/@type",
+    "//component/id/text()",
+    "//releases/release[not(@timestamp)]",
+    "//custom/value[@key='flathub::manifest']/text()",
+    "//releases/release[@timestamp]/@timestamp",
+    "//releases/release[@timestamp]/@version",
+    "//developer[@id]/name/text()",
+    "//developer_name/text()",
+    "//project_license/text()",
+    "//screenshot[not(caption/text()) or not(caption)]",
+    "//url[@type='vcs-browser']/text()",
+    "//launchable[@type='desktop-id']/text()",
+    "//categories/category",
+    "//icon[@type='cached']/text()",
+    "//icon",
+    "//icon[not(@type)]",
+    "//icon[@type='remote']/text()",
+)
+
+
+def write_catalogue(path: str, releases: int, screenshots: int) -> None:
+    release_tags = "".join(
+        f'<release version="1.{i}" timestamp="{1700000000 + i}"><description>'
+        + "<p>Fixed a bug</p>" * 5
+        + "</description></release>"
+        for i in range(releases)
+    )
+    screenshot_tags = "".join(
+        f"<screenshot><image>https://dl.flathub.org/media/{i}.png</image>"
+        + f"<caption>Screenshot {i}</caption></screenshot>"
+        for i in range(screenshots)
+    )
+    xml = (
+        '<components version="0.16"><component type="desktop-application">'
+        + "<id>org.example.App</id><name>App</name>"
+        + '<developer id="org.example"><name>Example</name></developer>'
+        + "<project_license>GPL-2.0</project_license>"
+        + '<launchable type="desktop-id">org.example.App.desktop</launchable>'
+        + '<icon type="cached" width="128" height="128">org.example.App.png</icon>'
+        + "<categories><category>Utility</category></categories>"
+        + '<url type="vcs-browser">https://github.com/example/app</url>'
+        + f"<screenshots>{screenshot_tags}</screenshots>"
+        + f"<releases>{release_tags}</releases>"
+        + "</component></components>"
+    )
+    with gzip.open(path, "wb") as f:
+        f.write(xml.encode())
+
+
+def per_query(appstream: ModuleType, path: str) -> None:
+    for query in QUERIES:
+        appstream.xpath_list(path, query)
+
+
+def document(appstream: ModuleType, path: str) -> None:
+    # Cleared so every run includes the one parse
+    appstream._load_document.cache_clear()
+    appstream.get_document(path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare parsing per query with the parse-once AppStream document"
+    )
+    parser.add_argument("--number", type=int, default=20, help="Runs per measurement")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from flatpak_builder_lint import appstream  # noqa: PLC0415
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for releases, screenshots in ((5, 2), (50, 10), (500, 30)):
+            path = os.path.join(tmpdir, f"{releases}.xml.gz")
+            write_catalogue(path, releases, screenshots)
+
+            funcs: tuple[tuple[str, Callable[[], None]], ...] = (
+                ("per query", partial(per_query, appstream, path)),
+                ("document", partial(document, appstream, path)),
+            )
+            for name, func in funcs:
+                best = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+                print(f"{releases:4} releases {name:>10}: {best * 1e3:8.3f} ms")  # noqa: T201
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
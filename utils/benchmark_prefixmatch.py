@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+import timeit
+from functools import partial
+from types import ModuleType
+
+import package_modules
+
+
+def nested_filter(info: set[str], excepts: set[str]) -> list[str]:
+    final = set()
+    for i in info:
+        count = False
+        for j in excepts:
+            if i.startswith(j):
+                count = True
+                break
+        if not count:
+            final.add(i)
+    return list(final)
+
+
+def compiled_filter(prefixmatch: ModuleType, info: set[str], excepts: set[str]) -> list[str]:
+    matcher = prefixmatch.compile_prefixes(frozenset(excepts))
+    return [i for i in info if not matcher.match(i)]
+
+
+def load_codes() -> list[str]:
+    path = os.path.join(
+        package_modules.ROOT, "flatpak_builder_lint", "staticfiles", "exceptions.json"
+    )
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return sorted(
+        {
+            code
+            for entry in data.values()
+            if isinstance(entry, dict)
+            for repo_exceptions in entry.values()
+            if isinstance(repo_exceptions, dict)
+            for code in repo_exceptions
+        }
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare the nested startswith loop with the compiled prefix matcher"
+    )
+    parser.add_argument("--info", type=int, default=500, help="Number of info lines")
+    parser.add_argument("--number", type=int, default=200, help="Runs per measurement")
+    args = parser.parse_args()
+
+    prefixmatch = package_modules.load_module("prefixmatch")
+    codes = load_codes()
+    info = {f"{codes[i * 7 % len(codes)]}: detail {i}" for i in range(args.info)}
+
+    for count in (5, 50, min(300, len(codes))):
+        excepts = set(codes[:: len(codes) // count][:count])
+        nested = partial(nested_filter, info, excepts)
+        compiled = partial(compiled_filter, prefixmatch, info, excepts)
+
+        if set(compiled()) != set(nested()):
+            raise AssertionError("Matchers disagree")
+
+        for name, func in (("nested", nested), ("compiled", compiled)):
+            best = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+            print(f"{count:4} exceptions {name:>9}: {best * 1e6:9.1f} us")  # noqa: T201
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,6 +2,8 @@ import argparse
 import json
 from typing import Any
 
+import package_modules
+
 
 def merge_duplicates(pairs: list[tuple[str, Any]]) -> dict[str, Any]:
     d: dict[str, Any] = {}
@@ -31,10 +33,17 @@ def save_file(filename: str, data: dict[str, Any]) -> bool:
 def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("filenames", nargs="*", help="Input filenames")
+    parser.add_argument(
+        "--index",
+        metavar="PATH",
+        help="Exceptions index to update from the file, only changed app IDs are rewritten",
+    )
     args = parser.parse_args(argv)
 
     if not args.filenames:
         args.filenames = ["flatpak_builder_lint/staticfiles/exceptions.json"]
+    if args.index and len(args.filenames) > 1:
+        parser.error("--index needs exactly one filename")
 
     exit_code = 0
     for filename in args.filenames:
@@ -46,6 +55,9 @@ def main(argv: list[str] | None = None) -> int:
             else:
                 exit_code = 1
 
+    if args.index and not package_modules.update_exceptions_index(args.index, args.filenames[0]):
+        exit_code = 1
+
     return exit_code
 
 
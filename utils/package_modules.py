@@ -0,0 +1,27 @@
+import importlib.util
+import os
+from types import ModuleType
+
+# Modules of the package that only need the standard library, loaded
+# from their path because the package may not be installed here
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+def load_module(name: str) -> ModuleType:
+    path = os.path.join(ROOT, "flatpak_builder_lint", f"{name}.py")
+    spec = importlib.util.spec_from_file_location(name, path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Failed to load {path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def update_exceptions_index(index_path: str, filename: str) -> bool:
+    try:
+        load_module("exceptions_index").sync_file(index_path, filename)
+    except (OSError, ValueError) as err:
+        print(f"{filename}: Failed to update index {index_path}: {err}")  # noqa: T201
+        return False
+    return True
@@ -8,6 +8,8 @@ import sys
 from collections.abc import Sequence
 from typing import Any
 
+import package_modules
+
 
 def normalize_error_arg(s: str) -> str:
     s = re.sub(r'^[fFrR]{1,2}(?=[\'"])', "", s)
@@ -287,11 +289,29 @@ def main(argv: Sequence[str] | None = None) -> int:
         metavar="ISSUE_NUMBER",
         help="Parse GitHub issue and purge stale exceptions mentioned in it",
     )
+    parser.add_argument(
+        "--index",
+        metavar="PATH",
+        help="Exceptions index to update from the file, only changed app IDs are rewritten",
+    )
     args = parser.parse_args(argv)
 
     if not args.filenames:
         args.filenames = ["flatpak_builder_lint/staticfiles/exceptions.json"]
+    if args.index and len(args.filenames) > 1:
+        parser.error("--index needs exactly one filename")
+
+    exit_code = run(args)
+    if (
+        args.index
+        and os.path.isfile(args.filenames[0])
+        and not package_modules.update_exceptions_index(args.index, args.filenames[0])
+    ):
+        exit_code = 1
+    return exit_code
+
 
+def run(args: argparse.Namespace) -> int:
     if args.purge_from_issue:
         issue_number = args.purge_from_issue
         exceptions_map = parse_issue_for_exceptions(issue_number)